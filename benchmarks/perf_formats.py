@@ -0,0 +1,137 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmark of the performance query result formats
+
+Compares the time needed to deserialize and parse the result of a
+performance query in the 'normal' and 'csv' formats. The results
+are serialized to SOAP locally, so that no vSphere server is needed.
+
+Usage:
+    python benchmarks/perf_formats.py [--days 365] [--instances 16] [--rounds 5]
+
+"""
+
+import argparse
+import datetime
+import time
+
+import pyVmomi
+
+from pyVmomi import SoapAdapter
+
+import pvc.widget.series
+
+
+def create_results(days, instances):
+    """
+    Create the results of a query for daily samples in both formats
+
+    Args:
+        days      (int): Number of daily samples
+        instances (int): Number of counter instances
+
+    Returns:
+        A tuple of the serialized 'normal' and 'csv' results
+
+    """
+    start = datetime.datetime(2015, 1, 1, tzinfo=datetime.timezone.utc)
+    timestamps = [start + datetime.timedelta(days=day) for day in range(days)]
+    entity = pyVmomi.vim.VirtualMachine('vm-1')
+    metric_ids = [
+        pyVmomi.vim.PerformanceManager.MetricId(counterId=6, instance=str(index))
+        for index in range(instances)
+    ]
+    values = [[(day * 37 + index) % 10000 for day in range(days)] for index in range(instances)]
+
+    normal = pyVmomi.vim.PerformanceManager.EntityMetric(
+        entity=entity,
+        sampleInfo=[
+            pyVmomi.vim.PerformanceManager.SampleInfo(timestamp=t, interval=86400)
+            for t in timestamps
+        ],
+        value=[
+            pyVmomi.vim.PerformanceManager.IntSeries(id=metric_id, value=v)
+            for metric_id, v in zip(metric_ids, values)
+        ]
+    )
+
+    csv = pyVmomi.vim.PerformanceManager.EntityMetricCSV(
+        entity=entity,
+        sampleInfoCSV=','.join(
+            '86400,{}'.format(t.strftime('%Y-%m-%dT%H:%M:%SZ')) for t in timestamps
+        ),
+        value=[
+            pyVmomi.vim.PerformanceManager.MetricSeriesCSV(
+                id=metric_id,
+                value=','.join(str(x) for x in v)
+            ) for metric_id, v in zip(metric_ids, values)
+        ]
+    )
+
+    return SoapAdapter.Serialize(normal), SoapAdapter.Serialize(csv)
+
+
+def measure(payload, result_type, rounds):
+    """
+    Measure the best time to deserialize and parse a result
+
+    Returns:
+        A tuple of the best time in seconds and the parsed samples
+
+    """
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        data = SoapAdapter.Deserialize(payload, result_type)
+        samples = pvc.widget.series.parse_entity_metric(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=365, help='Number of daily samples')
+    parser.add_argument('--instances', type=int, default=16, help='Number of counter instances')
+    parser.add_argument('--rounds', type=int, default=5, help='Number of rounds per format')
+    args = parser.parse_args()
+
+    normal, csv = create_results(args.days, args.instances)
+    normal_time, normal_samples = measure(normal, pyVmomi.vim.PerformanceManager.EntityMetric, args.rounds)
+    csv_time, csv_samples = measure(csv, pyVmomi.vim.PerformanceManager.EntityMetricCSV, args.rounds)
+
+    if normal_samples != csv_samples:
+        raise SystemExit('Samples parsed from both formats differ')
+
+    print('{} days, {} instances'.format(args.days, args.instances))
+    print('normal: {:8.1f} ms, {} bytes'.format(normal_time * 1000, len(normal)))
+    print('csv:    {:8.1f} ms, {} bytes'.format(csv_time * 1000, len(csv)))
+    print('speedup: {:.1f}x'.format(normal_time / csv_time))
+
+
+if __name__ == '__main__':
+    main()
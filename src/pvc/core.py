@@ -43,8 +43,11 @@ import pyVmomi
 import requests
 requests.packages.urllib3.disable_warnings()
 
+import pvc.widget.cache
+import pvc.widget.collector
 import pvc.widget.form
 import pvc.widget.home
+import pvc.widget.pool
 
 from dialog import Dialog
 from vconnector.core import VConnector
@@ -66,6 +69,7 @@ class MainApp(object):
             'Python vSphere Client version {}'.format(__version__)
         )
         self.agent = None
+        self.pool = None
 
     def about(self):
         welcome = (
@@ -83,7 +87,11 @@ class MainApp(object):
 
     def login(self):
         """
-        Login to the VMware vSphere host
+        Login to the VMware vSphere hosts
+
+        Multiple hosts sharing the same credentials may be
+        specified separated by commas, in which case PVC
+        connects to all of them concurrently.
 
         Returns:
             True on successful connect, False otherwise
@@ -92,7 +100,9 @@ class MainApp(object):
         form_text = (
             'Enter IP address or DNS name '
             'of the VMware vSphere host you wish '
-            'to connect to.\n'
+            'to connect to.\n\n'
+            'Multiple hosts using the same credentials '
+            'can be separated by commas.\n'
         )
 
         elements = [
@@ -113,7 +123,8 @@ class MainApp(object):
             if code in (self.dialog.CANCEL, self.dialog.ESC):
                 return False
 
-            if not all(fields.values()):
+            hosts = [h.strip() for h in fields['Hostname'].split(',') if h.strip()]
+            if not hosts or not all(fields.values()):
                 self.dialog.msgbox(
                     title='Error',
                     text='Invalid login details, please try again.\n'
@@ -133,49 +144,75 @@ class MainApp(object):
 
             self.dialog.infobox(
                 title='Establishing Connection',
-                text='Connecting to {} ...'.format(fields['Hostname']),
+                text='Connecting to {} ...'.format(', '.join(hosts)),
             )
 
-            self.agent = VConnector(
-                host=fields['Hostname'],
-                user=fields['Username'],
-                pwd=password,
+            pool = pvc.widget.pool.AgentPool(
+                agents=[
+                    VConnector(host=host, user=fields['Username'], pwd=password)
+                    for host in hosts
+                ]
             )
 
-            try:
-                self.agent.connect()
-                text = '{} - {} - Python vSphere Client version {}'
-                background_title = text.format(
-                    self.agent.host,
-                    self.agent.si.content.about.fullName,
-                    __version__
-                )
-                self.dialog.set_background_title(background_title)
-                return True
-            except Exception as e:
+            errors = []
+            for agent, _, e in pool.map(lambda agent: agent.connect()):
+                if e is None:
+                    continue
+
                 if isinstance(e, pyVmomi.vim.MethodFault):
                     msg = e.msg
                 else:
                     msg = e
 
+                errors.append('Failed to login to {}\n\n{}\n'.format(agent.host, msg))
+                pool.remove(agent)
+
+            if errors:
                 self.dialog.msgbox(
                     title='Login failed',
-                    text='Failed to login to {}\n\n{}\n'.format(self.agent.host, msg)
+                    text='\n'.join(errors)
+                )
+
+            if not pool:
+                continue
+
+            self.pool = pool
+            self.agent = pool.agents[0]
+
+            if len(pool) == 1:
+                text = '{} - {} - Python vSphere Client version {}'
+                background_title = text.format(
+                    self.agent.host,
+                    self.agent.si.content.about.fullName,
+                    __version__
                 )
+            else:
+                text = '{} vSphere hosts - Python vSphere Client version {}'
+                background_title = text.format(len(pool), __version__)
+            self.dialog.set_background_title(background_title)
+
+            for agent in pool:
+                pvc.widget.cache.start_inventory_cache(agent)
+
+            return True
 
     def disconnect(self):
         """
-        Disconnect from the remote vSphere host
+        Disconnect from the remote vSphere hosts
 
         """
-        if not self.agent:
+        if not self.pool:
             return
 
         self.dialog.infobox(
             title='Disconnecting Connection',
-            text='Disconnecting from {} ...'.format(self.agent.host)
+            text='Disconnecting from {} ...'.format(', '.join(a.host for a in self.pool))
         )
-        self.agent.disconnect()
+
+        for agent in self.pool:
+            pvc.widget.collector.stop_performance_collector(agent)
+            pvc.widget.cache.stop_inventory_cache(agent)
+        self.pool.map(lambda agent: agent.disconnect())
 
     def run(self):
         try:
@@ -185,7 +222,8 @@ class MainApp(object):
 
             home = pvc.widget.home.HomeWidget(
                 agent=self.agent,
-                dialog=self.dialog
+                dialog=self.dialog,
+                pool=self.pool
             )
             home.display()
         except KeyboardInterrupt:
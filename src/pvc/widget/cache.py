@@ -0,0 +1,344 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Inventory Cache
+
+"""
+
+import time
+import threading
+
+import pyVmomi
+
+__all__ = [
+    'InventoryCache', 'start_inventory_cache',
+    'stop_inventory_cache', 'get_inventory_cache',
+]
+
+# Managed object types and the properties of each type,
+# which are being kept up-to-date by the inventory cache
+CACHED_PROPERTIES = {
+    pyVmomi.vim.Datacenter: ['name', 'overallStatus'],
+    pyVmomi.vim.ClusterComputeResource: ['name', 'overallStatus'],
+    pyVmomi.vim.HostSystem: ['name', 'runtime.connectionState'],
+    pyVmomi.vim.VirtualMachine: ['name', 'runtime.powerState'],
+    pyVmomi.vim.Datastore: ['name', 'summary.accessible'],
+    pyVmomi.vim.Network: ['name', 'summary.accessible'],
+    pyVmomi.vim.Folder: ['name'],
+}
+
+# Min number of seconds between restarts of a failed inventory cache
+RESTART_DELAY = 30
+
+# Inventory caches of the currently connected agents
+_caches = {}
+_lock = threading.Lock()
+
+
+class InventoryCache(threading.Thread):
+    def __init__(self, agent, properties=CACHED_PROPERTIES, max_wait=30):
+        """
+        Inventory Cache Thread
+
+        The inventory cache performs a single initial retrieval of
+        the managed objects for each cached type and then keeps
+        them up-to-date by waiting for incremental updates
+        from a dedicated property collector.
+
+        Args:
+            agent (VConnector): A VConnector instance
+            properties  (dict): A mapping of managed object types and
+                                the properties to be cached for them
+            max_wait     (int): Max number of seconds to wait for updates
+                                before checking whether the thread
+                                should be stopped
+
+        """
+        super().__init__()
+        self.daemon = True
+        self.time_to_die = threading.Event()
+        self.ready = threading.Event()
+
+        self.agent = agent
+        self.properties = properties
+        self.max_wait = max_wait
+        self.collector = None
+        self.error = None
+        self.created = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._views = []
+        self._filters = {}
+        self._objects = {obj_type: {} for obj_type in self.properties}
+
+    def run(self):
+        try:
+            self.create_filters()
+            self.wait_for_updates()
+        except pyVmomi.vmodl.fault.RequestCanceled:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            self.destroy_filters()
+
+    def signal_stop(self):
+        """
+        Signal the thread that it's time to die
+
+        """
+        self.time_to_die.set()
+        if self.collector is not None:
+            try:
+                self.collector.CancelWaitForUpdates()
+            except Exception:
+                pass
+
+    def create_filters(self):
+        """
+        Create a property filter for each of the cached types
+
+        """
+        pc = self.agent.si.content.propertyCollector
+        self.collector = pc.CreatePropertyCollector()
+
+        for obj_type, path_set in self.properties.items():
+            view = self.agent.get_container_view(obj_type=[obj_type])
+            self._views.append(view)
+
+            traversal_spec = pyVmomi.vmodl.query.PropertyCollector.TraversalSpec(
+                name='traverseEntities',
+                path='view',
+                skip=False,
+                type=view.__class__
+            )
+            obj_spec = pyVmomi.vmodl.query.PropertyCollector.ObjectSpec(
+                obj=view,
+                skip=True,
+                selectSet=[traversal_spec]
+            )
+            property_spec = pyVmomi.vmodl.query.PropertyCollector.PropertySpec(
+                type=obj_type,
+                pathSet=path_set
+            )
+            filter_spec = pyVmomi.vmodl.query.PropertyCollector.FilterSpec(
+                objectSet=[obj_spec],
+                propSet=[property_spec]
+            )
+
+            f = self.collector.CreateFilter(spec=filter_spec, partialUpdates=True)
+            self._filters[f._moId] = obj_type
+
+    def destroy_filters(self):
+        """
+        Destroy the property collector, its filters and the views
+
+        """
+        try:
+            if self.collector is not None:
+                self.collector.DestroyPropertyCollector()
+            for view in self._views:
+                view.DestroyView()
+        except Exception:
+            pass
+
+    def wait_for_updates(self):
+        """
+        Wait for updates and apply them to the cached objects
+
+        The first call returns the current state of all objects, which
+        may be split in several truncated updates. The cache is
+        considered ready once the whole initial state has been received.
+
+        """
+        version = ''
+        options = pyVmomi.vmodl.query.PropertyCollector.WaitOptions(
+            maxWaitSeconds=self.max_wait
+        )
+
+        while not self.time_to_die.is_set():
+            update = self.collector.WaitForUpdatesEx(
+                version=version,
+                options=options
+            )
+
+            # No changes within the max wait time
+            if update is None:
+                continue
+
+            self.apply_update(update)
+            version = update.version
+
+            if not update.truncated:
+                self.ready.set()
+
+    def apply_update(self, update):
+        """
+        Apply an update set to the cached objects
+
+        Args:
+            update (vmodl.query.PropertyCollector.UpdateSet): An update set
+
+        """
+        with self._lock:
+            for filter_update in update.filterSet:
+                objects = self._objects[self._filters[filter_update.filter._moId]]
+                for object_update in filter_update.objectSet:
+                    moid = object_update.obj._moId
+                    if object_update.kind == 'leave':
+                        objects.pop(moid, None)
+                        continue
+
+                    entry = objects.setdefault(moid, {'obj': object_update.obj})
+                    for change in object_update.changeSet:
+                        if change.op in ('remove', 'indirectRemove'):
+                            entry.pop(change.name, None)
+                        else:
+                            entry[change.name] = change.val
+
+    def covers(self, obj_type, path_set):
+        """
+        Check whether the cache can serve the given properties
+
+        Args:
+            obj_type (pyVmomi.vim.*): Type of managed object
+            path_set          (list): List of properties to retrieve
+
+        Returns:
+            True if the properties are cached, False otherwise
+
+        """
+        if obj_type not in self.properties:
+            return False
+
+        return set(path_set).issubset(self.properties[obj_type])
+
+    def is_usable(self):
+        """
+        Check whether the cache can serve properties
+
+        Returns:
+            True if the initial state has been received and
+            the cache is being kept up-to-date, False otherwise
+
+        """
+        return self.ready.is_set() and self.is_alive()
+
+    def get_properties(self, obj_type, objects=None):
+        """
+        Get the cached properties of managed objects
+
+        Args:
+            obj_type (pyVmomi.vim.*): Type of managed object
+            objects           (list): If specified return only the properties
+                                      of these managed objects
+
+        Returns:
+            A tuple of the cached properties, in the format returned
+            by VConnector.collect_properties(), and a list of the
+            managed objects, which were not found in the cache
+
+        """
+        with self._lock:
+            cached = self._objects[obj_type]
+            if objects is None:
+                return [dict(entry) for entry in cached.values()], []
+
+            properties = []
+            missing = []
+            for obj in objects:
+                entry = cached.get(obj._moId)
+                if entry is None:
+                    missing.append(obj)
+                else:
+                    properties.append(dict(entry))
+
+            return properties, missing
+
+
+def start_inventory_cache(agent):
+    """
+    Start the inventory cache of an agent
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    Returns:
+        The started InventoryCache instance
+
+    """
+    cache = InventoryCache(agent=agent)
+    cache.start()
+    _caches[agent] = cache
+
+    return cache
+
+
+def stop_inventory_cache(agent):
+    """
+    Stop the inventory cache of an agent
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    """
+    cache = _caches.pop(agent, None)
+    if cache is None:
+        return
+
+    cache.signal_stop()
+    cache.join(1)
+
+
+def get_inventory_cache(agent):
+    """
+    Get the inventory cache of an agent
+
+    The cache is not used while it is receiving the initial state,
+    so that lookups do not wait for it. A cache which thread has
+    failed is restarted, at most once every RESTART_DELAY seconds.
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    Returns:
+        The InventoryCache instance of the agent if it is usable,
+        None otherwise
+
+    """
+    with _lock:
+        cache = _caches.get(agent)
+        if cache is None:
+            return None
+
+        if not cache.is_alive() and not cache.time_to_die.is_set():
+            if time.monotonic() - cache.created >= RESTART_DELAY:
+                start_inventory_cache(agent)
+            return None
+
+    if not cache.is_usable():
+        return None
+
+    return cache
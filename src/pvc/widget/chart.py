@@ -0,0 +1,310 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Terminal Chart Module
+
+"""
+
+import math
+import collections
+
+__all__ = ['Chart', 'sparkline', 'resample']
+
+# Block elements used for drawing sparklines and block charts
+BLOCKS = ' ▁▂▃▄▅▆▇█'
+
+# Bits of the braille dots in a cell from the bottom to the top,
+# for the left and right column of the cell respectively
+BRAILLE_BASE = 0x2800
+BRAILLE_LEFT = (0x40, 0x04, 0x02, 0x01)
+BRAILLE_RIGHT = (0x80, 0x20, 0x10, 0x08)
+
+
+def nice_number(value):
+    """
+    Round a value up to 1, 2 or 5 times a power of ten
+
+    Used as the upper bound of autoscaled charts, so that the
+    scale does not change each time a new maximum is received.
+
+    Args:
+        value (float): The value to round
+
+    """
+    if value <= 0:
+        return 1
+
+    exponent = math.floor(math.log10(value))
+    for factor in (1, 2, 5, 10):
+        bound = factor * 10 ** exponent
+        if bound >= value:
+            return bound
+
+
+def level(value, minimum, maximum, levels):
+    """
+    Get the number of filled levels for a value
+
+    Args:
+        value   (float): The value
+        minimum (float): Value drawn as an empty cell
+        maximum (float): Value drawn as a full cell
+        levels    (int): Number of levels
+
+    """
+    if maximum <= minimum:
+        return 0
+
+    filled = round((value - minimum) / (maximum - minimum) * levels)
+
+    return min(max(filled, 0), levels)
+
+
+def sparkline(values, minimum=None, maximum=None):
+    """
+    Draw values as a single line of block elements
+
+    Args:
+        values   (list): The values to draw
+        minimum (float): Value drawn as the lowest block, defaults to the min value
+        maximum (float): Value drawn as the highest block, defaults to the max value
+
+    Returns:
+        A string with one character per value
+
+    """
+    if not values:
+        return ''
+
+    minimum = min(values) if minimum is None else minimum
+    maximum = max(values) if maximum is None else maximum
+    levels = len(BLOCKS) - 2
+
+    return ''.join(BLOCKS[level(v, minimum, maximum, levels) + 1] for v in values)
+
+
+def resample(values, count):
+    """
+    Reduce a sequence of values to a given number of averages
+
+    Args:
+        values (list): The values to resample
+        count   (int): Number of values to return
+
+    Returns:
+        A list of up to 'count' values
+
+    """
+    if len(values) <= count:
+        return list(values)
+
+    result = []
+    for index in range(count):
+        start = index * len(values) // count
+        end = (index + 1) * len(values) // count
+        bucket = values[start:end]
+        result.append(sum(bucket) / len(bucket))
+
+    return result
+
+
+class Chart(object):
+    BRAILLE = 'braille'
+    BLOCK = 'block'
+
+    def __init__(self, width=60, height=4, style=BRAILLE, minimum=0, maximum=None, unit='', factor=1.0):
+        """
+        Area chart of multiple series drawn with text characters
+
+        Each series is drawn in a separate panel of 'height' rows.
+        Braille charts draw two samples per column with four levels
+        per row, while block charts draw one sample per column with
+        eight levels per row.
+
+        Columns are kept between renderings and only the columns
+        of new samples are drawn, unless the scale of the series
+        changes. Old samples are discarded once the chart is full.
+
+        Samples are kept as they are received and multiplied by
+        the factor only for display. Panels are drawn by comparing
+        the samples to the scale of the panel divided by the factor.
+
+        Args:
+            width     (int): Number of columns of the panels
+            height    (int): Number of rows of the panels
+            style     (str): Either 'braille' or 'block'
+            minimum (float): Value at the bottom of the panels
+            maximum (float): Value at the top of the panels, if not
+                             specified each panel is scaled to its series
+            unit      (str): Unit of the values
+            factor  (float): Factor by which the samples are multiplied
+                             for display, e.g. to convert hundredths of
+                             a percent into percents
+
+        """
+        self.width = width
+        self.height = height
+        self.style = style
+        self.minimum = minimum
+        self.maximum = maximum
+        self.unit = unit
+        self.factor = factor
+
+        if self.style == self.BRAILLE:
+            self.samples_per_column = 2
+            self.levels_per_row = 4
+        else:
+            self.samples_per_column = 1
+            self.levels_per_row = len(BLOCKS) - 1
+
+        self.capacity = self.width * self.samples_per_column
+        self._samples = collections.OrderedDict()
+        self._columns = {}
+        self._scales = {}
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._samples)
+
+    def update(self, name, values):
+        """
+        Add new samples to a series
+
+        Args:
+            name   (str): Name of the series, e.g. the counter instance
+            values (list): The new samples
+
+        """
+        samples = self._samples.setdefault(name, [])
+        columns = self._columns.setdefault(name, collections.deque())
+
+        samples.extend(values)
+        if len(samples) > self.capacity:
+            # Drop whole columns, so that samples stay aligned
+            # with the columns which have already been drawn
+            drop = len(samples) - self.capacity
+            drop += -drop % self.samples_per_column
+            del samples[:drop]
+            for _ in range(drop // self.samples_per_column):
+                if columns:
+                    columns.popleft()
+
+        scale = self.scale(samples)
+        if scale != self._scales.get(name):
+            self._scales[name] = scale
+            columns.clear()
+
+        # Redraw the last column if it was partially filled
+        first = len(columns) * self.samples_per_column
+        if columns and first > len(samples) - len(values):
+            columns.pop()
+            first -= self.samples_per_column
+
+        for start in range(first, len(samples), self.samples_per_column):
+            columns.append(self.column(samples[start:start + self.samples_per_column], scale))
+
+    def read(self, name, series):
+        """
+        Add the samples appended to a series since it was last read
+
+        Args:
+            name                           (str): Name of the series in the chart
+            series (pvc.widget.series.Series): The series to read
+
+        """
+        _, values, self._positions[name] = series.since(self._positions.get(name, 0))
+        self.update(name, values)
+
+    def scale(self, samples):
+        """
+        Get the (minimum, maximum) displayed values of a panel
+
+        """
+        if self.maximum is not None:
+            return self.minimum, self.maximum
+
+        return self.minimum, nice_number(max(samples) * self.factor if samples else 0)
+
+    def column(self, samples, scale):
+        """
+        Draw a column of a panel
+
+        Args:
+            samples (list): The samples drawn in the column
+            scale  (tuple): The (minimum, maximum) displayed values of the panel
+
+        Returns:
+            A string with one character per row, from top to bottom
+
+        """
+        levels = self.height * self.levels_per_row
+        minimum, maximum = scale[0] / self.factor, scale[1] / self.factor
+        filled = [level(v, minimum, maximum, levels) for v in samples]
+
+        cells = []
+        for row in range(self.height - 1, -1, -1):
+            counts = [min(max(f - row * self.levels_per_row, 0), self.levels_per_row) for f in filled]
+            if self.style == self.BLOCK:
+                cells.append(BLOCKS[counts[0]])
+                continue
+
+            code = BRAILLE_BASE
+            for bits, count in zip((BRAILLE_LEFT, BRAILLE_RIGHT), counts):
+                for bit in bits[:count]:
+                    code |= bit
+            cells.append(chr(code))
+
+        return ''.join(cells)
+
+    def format_value(self, value):
+        return '{:.2f}'.format(value).rstrip('0').rstrip('.')
+
+    def render(self):
+        """
+        Render the panels of all series
+
+        Returns:
+            The chart as text
+
+        """
+        lines = []
+        for name, samples in self._samples.items():
+            columns = self._columns[name]
+            minimum, maximum = self._scales[name]
+            current = self.format_value(samples[-1] * self.factor) if samples else '-'
+            peak = self.format_value(max(samples) * self.factor) if samples else '-'
+
+            lines.append('{} - current: {} {}, max: {} {}'.format(
+                name, current, self.unit, peak, self.unit
+            ))
+
+            labels = [self.format_value(maximum)] + [''] * (self.height - 2) + [self.format_value(minimum)]
+            label_width = max(len(l) for l in labels)
+            for row in range(self.height):
+                cells = ''.join(column[row] for column in columns)
+                lines.append('{} |{}'.format(labels[row].rjust(label_width), cells))
+            lines.append('')
+
+        return '\n'.join(lines)
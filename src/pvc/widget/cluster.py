@@ -417,15 +417,11 @@ class ClusterHostWidget(object):
             return
 
         host_objects = [h for h in self.obj.host if h.name in selected]
-        for host_obj in host_objects:
-            task = host_obj.Disconnect()
-            gauge = pvc.widget.gauge.TaskGauge(
-                title=self.title,
-                text='Disconnecting {} from cluster ...'.format(host_obj.name),
-                dialog=self.dialog,
-                task=task
-            )
-            gauge.display()
+        self.run_host_tasks(
+            action='Disconnect',
+            host_objects=host_objects,
+            method='Disconnect'
+        )
 
     def reconnect_host(self):
         """
@@ -463,15 +459,41 @@ class ClusterHostWidget(object):
             return
 
         host_objects = [h for sh in selected_hosts for h in self.obj.host if sh == h.name]
-        for host_obj in host_objects:
-            task = host_obj.Reconnect()
-            gauge = pvc.widget.gauge.TaskGauge(
-                title=self.title,
-                text='Reconnecting {} to cluster ...'.format(host_obj.name),
-                dialog=self.dialog,
-                task=task
+        self.run_host_tasks(
+            action='Reconnect',
+            host_objects=host_objects,
+            method='Reconnect'
+        )
+
+    def run_host_tasks(self, action, host_objects, method):
+        """
+        Start a task for each host and wait for them to complete
+
+        Args:
+            action        (str): Name of the action
+            host_objects (list): A list of vim.HostSystem instances
+            method        (str): Name of the vim.HostSystem method to call
+
+        """
+        gauge = pvc.widget.gauge.MultiTaskGauge(
+            dialog=self.dialog,
+            tasks=[getattr(h, method) for h in host_objects],
+            labels=[h.name for h in host_objects],
+            title=self.title
+        )
+        results = gauge.display()
+
+        failed = [(label, error) for label, error in results if error is not None]
+        if not failed:
+            return
+
+        self.dialog.msgbox(
+            title=self.title,
+            text='{} failed for host(s):\n\n{}\n'.format(
+                action,
+                '\n'.join('{}: {}'.format(label, getattr(error, 'msg', None) or error) for label, error in failed)
             )
-            gauge.display()
+        )
 
 
 class ClusterVirtualMachineWidget(object):
@@ -499,11 +521,29 @@ class ClusterVirtualMachineWidget(object):
                 on_select=pvc.widget.virtualmachine.CreateVirtualMachineWidget,
                 on_select_args=(self.agent, self.dialog, self.obj.parent.parent, self.obj)
             ),
+            pvc.widget.menu.MenuItem(
+                tag='Deploy',
+                description='Deploy Virtual Machine from OVF/OVA template',
+                on_select=pvc.widget.virtualmachine.VirtualMachineImportWidget,
+                on_select_args=(self.agent, self.dialog, self.obj.parent.parent, self.obj)
+            ),
             pvc.widget.menu.MenuItem(
                 tag='View',
                 description='Virtual Machines in cluster',
                 on_select=self.virtual_machine_menu
             ),
+            pvc.widget.menu.MenuItem(
+                tag='Power',
+                description='Power operations on multiple Virtual Machines',
+                on_select=pvc.widget.virtualmachine.VirtualMachineBulkPowerWidget,
+                on_select_args=(self.agent, self.dialog, self.obj)
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Export',
+                description='Export multiple Virtual Machines',
+                on_select=pvc.widget.virtualmachine.VirtualMachineExportQueueWidget,
+                on_select_args=(self.agent, self.dialog, self.obj)
+            ),
         ]
 
         menu = pvc.widget.menu.Menu(
@@ -521,39 +561,38 @@ class ClusterVirtualMachineWidget(object):
             text='Retrieving information ...'
         )
 
-        view = self.agent.get_container_view(
-            obj_type=[pyVmomi.vim.VirtualMachine],
-            container=self.obj
-        )
-        properties = self.agent.collect_properties(
-            view_ref=view,
+        store = pvc.widget.common.inventory_store(
+            agent=self.agent,
             obj_type=pyVmomi.vim.VirtualMachine,
             path_set=['name', 'runtime.powerState'],
-            include_mors=True
+            container=self.obj
         )
-        view.DestroyView()
 
-        if not properties:
+        if not store:
             self.dialog.msgbox(
                 title=self.title,
                 text='No virtual machines found in cluster'
             )
             return
 
-        items = [
-            pvc.widget.menu.MenuItem(
-                tag=vm['name'],
+        items = store.items(
+            lambda vm: pvc.widget.menu.MenuItem(
+                tag=vm.tag,
                 description=vm['runtime.powerState'],
                 on_select=pvc.widget.virtualmachine.VirtualMachineWidget,
-                on_select_args=(self.agent, self.dialog, vm['obj'])
-            ) for vm in properties
-        ]
+                on_select_args=(self.agent, self.dialog, vm.obj)
+            )
+        )
 
         menu = pvc.widget.menu.Menu(
             items=items,
             dialog=self.dialog,
             title=self.title,
-            text='Select a virtual machine from the menu'
+            text='Select a virtual machine from the menu',
+            extra_label='Power',
+            on_extra=lambda: pvc.widget.virtualmachine.VirtualMachineBulkPowerWidget(
+                self.agent, self.dialog, self.obj, store
+            )
         )
 
         menu.display()
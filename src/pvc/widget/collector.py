@@ -0,0 +1,442 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Performance Collector Module
+
+"""
+
+import os
+import time
+import datetime
+import threading
+
+import pyVmomi
+
+import pvc.widget.common
+import pvc.widget.perfcache
+import pvc.widget.performance
+import pvc.widget.series
+
+__all__ = [
+    'PerformanceCollector', 'start_performance_collector',
+    'stop_performance_collector', 'get_performance_collector',
+]
+
+# Counters sampled by the performance collector, can be overriden by
+# the PVC_COLLECTOR_COUNTERS environment variable as a comma-separated
+# list of counter names
+DEFAULT_COLLECTOR_COUNTERS = os.environ.get(
+    'PVC_COLLECTOR_COUNTERS',
+    'cpu.usage.average,mem.usage.average,net.usage.average,disk.usage.average'
+).split(',')
+
+# Refresh rate of real-time statistics in seconds
+REALTIME_INTERVAL = 20
+
+# Min number of seconds between restarts of a failed collector
+RESTART_DELAY = 30
+
+# Performance collectors of the currently connected agents
+_collectors = {}
+_lock = threading.Lock()
+
+
+class PerformanceCollector(threading.Thread):
+    def __init__(self, agent, counters=DEFAULT_COLLECTOR_COUNTERS,
+                 interval=REALTIME_INTERVAL, capacity=pvc.widget.series.DEFAULT_CAPACITY):
+        """
+        Performance Collector Thread
+
+        The performance collector samples the real-time counters
+        of the hosts and powered on virtual machines of the watched
+        clusters and hosts. The entities are batched into as few
+        performance queries as possible on every tick and the samples
+        are added to a sample store, which can be read by any widget.
+
+        Each entity is queried for the samples newer than its
+        newest collected sample, so that no samples are lost when
+        a tick is missed or takes longer than the interval.
+
+        Errors of a tick are kept in the error attribute until a
+        later tick succeeds, while the collector keeps running.
+
+        Args:
+            agent (VConnector): A VConnector instance
+            counters    (list): Names of the counters to sample,
+                                e.g. 'cpu.usage.average'
+            interval     (int): Number of seconds between ticks
+            capacity     (int): Max number of samples kept per series
+
+        """
+        super().__init__()
+        self.daemon = True
+        self.time_to_die = threading.Event()
+
+        self.agent = agent
+        self.counter_names = counters
+        self.interval = interval
+        self.samples = pvc.widget.series.SampleStore(capacity=capacity)
+        self.counters = {}
+        self.updated = None
+        self.error = None
+        self.created = time.monotonic()
+        self._watched = {}
+        self._members = {}
+        self._start_times = {}
+        self._lock = threading.Lock()
+
+    def run(self):
+        while not self.time_to_die.is_set():
+            started = time.monotonic()
+            try:
+                if not self.counters:
+                    self.load_counters()
+                self.collect()
+                self.error = None
+            except Exception as e:
+                self.error = e
+
+            elapsed = time.monotonic() - started
+            self.time_to_die.wait(max(self.interval - elapsed, 0))
+
+    def signal_stop(self):
+        """
+        Signal the thread that it's time to die
+
+        """
+        self.time_to_die.set()
+
+    def load_counters(self):
+        """
+        Find the sampled counters in the performance counter catalog
+
+        """
+        catalog = pvc.widget.perfcache.get_counter_catalog(self.agent)
+        counters = {}
+        for name in self.counter_names:
+            counter = catalog.find(name.strip())
+            if counter is not None:
+                counters[counter.key] = counter
+
+        self.counters = counters
+
+    def error_message(self):
+        """
+        Returns the message of the error of the last tick,
+        or None if the last tick succeeded
+
+        """
+        error = self.error
+        if error is None:
+            return None
+
+        return getattr(error, 'msg', None) or str(error) or error.__class__.__name__
+
+    def watch(self, obj):
+        """
+        Start collecting samples for the entities of a cluster or host
+
+        Args:
+            obj (vim.ManagedEntity): A Cluster or Host managed entity
+
+        """
+        with self._lock:
+            self._watched[obj._moId] = obj
+
+    def unwatch(self, obj):
+        """
+        Stop collecting samples for the entities of a cluster or host
+
+        Args:
+            obj (vim.ManagedEntity): A Cluster or Host managed entity
+
+        """
+        with self._lock:
+            self._watched.pop(obj._moId, None)
+            self._members.pop(obj._moId, None)
+
+    def watched(self):
+        """
+        Get the watched clusters and hosts
+
+        Returns:
+            A list of managed entities
+
+        """
+        with self._lock:
+            return list(self._watched.values())
+
+    def watches(self, obj):
+        """
+        Returns True if samples are collected for a managed entity
+
+        Args:
+            obj (vim.ManagedEntity): A managed entity
+
+        """
+        with self._lock:
+            return obj._moId in self._watched or obj._moId in self._start_times
+
+    def collects(self, obj, metric_id):
+        """
+        Returns True if the given metrics of a managed entity are collected
+
+        Only the aggregated instance of the collected counters
+        is sampled for the entities. Samples of a collector whose
+        last tick failed are not considered up-to-date.
+
+        Args:
+            obj (vim.ManagedEntity): A managed entity
+            metric_id       (list): A list of vim.PerformanceManager.MetricId instances
+
+        """
+        if self.error is not None:
+            return False
+
+        with self._lock:
+            if obj._moId not in self._start_times:
+                return False
+
+        return all(m.counterId in self.counters and not m.instance for m in metric_id)
+
+    def members(self, obj):
+        """
+        Get the entities of a cluster or host sampled during the last tick
+
+        Args:
+            obj (vim.ManagedEntity): A watched Cluster or Host managed entity
+
+        Returns:
+            A list of (name, managed entity) tuples
+
+        """
+        with self._lock:
+            return list(self._members.get(obj._moId, ()))
+
+    def entities(self):
+        """
+        Get the running hosts and virtual machines of the watched entities
+
+        Returns:
+            A list of managed entities
+
+        """
+        watched = self.watched()
+
+        result = {}
+        members = {}
+        for obj in watched:
+            if isinstance(obj, pyVmomi.vim.HostSystem):
+                found = [(obj.name, obj)]
+                scopes = [
+                    (pyVmomi.vim.VirtualMachine, {'objects': obj.vm}),
+                ]
+            else:
+                found = []
+                scopes = [
+                    (pyVmomi.vim.HostSystem, {'container': obj}),
+                    (pyVmomi.vim.VirtualMachine, {'container': obj}),
+                ]
+
+            for obj_type, scope in scopes:
+                if obj_type == pyVmomi.vim.VirtualMachine:
+                    path, state = 'runtime.powerState', pyVmomi.vim.VirtualMachinePowerState.poweredOn
+                else:
+                    path, state = 'runtime.connectionState', pyVmomi.vim.HostSystemConnectionState.connected
+
+                store = pvc.widget.common.inventory_store(
+                    agent=self.agent,
+                    obj_type=obj_type,
+                    path_set=['name', path],
+                    **scope
+                )
+                found.extend((row.tag, row.obj) for row in store if row[path] == state)
+
+            members[obj._moId] = found
+            result.update((entity._moId, entity) for _, entity in found)
+
+        with self._lock:
+            self._members = members
+
+        return list(result.values())
+
+    def collect(self):
+        """
+        Collect the samples of the watched entities
+
+        Timestamps of the samples are aligned to the interval, so
+        that the samples of all entities collected at the same tick
+        share the same timestamps.
+
+        """
+        entities = self.entities()
+        if not entities or not self.counters:
+            return
+
+        metric_id = [
+            pyVmomi.vim.PerformanceManager.MetricId(counterId=key, instance='')
+            for key in self.counters
+        ]
+        with self._lock:
+            start_times = dict(self._start_times)
+
+        oldest = self.agent.si.CurrentTime() - datetime.timedelta(
+            seconds=self.samples.capacity * self.interval
+        )
+
+        query_specs = [
+            pyVmomi.vim.PerformanceManager.QuerySpec(
+                entity=entity,
+                metricId=metric_id,
+                intervalId=self.interval,
+                startTime=max(start_times.get(entity._moId, oldest), oldest),
+                format='csv'
+            ) for entity in entities
+        ]
+
+        results = pvc.widget.performance.query_perf(self.agent, query_specs)
+        for data in results:
+            timestamps, values = pvc.widget.series.parse_entity_metric(data)
+            if not timestamps:
+                continue
+
+            aligned = [t - t % self.interval for t in timestamps]
+            for counter_id, instance, series_values in values:
+                counter = self.counters.get(counter_id)
+                if counter is None:
+                    continue
+                series = self.samples.series(data.entity, counter, instance)
+                series.extend(aligned, series_values)
+
+            with self._lock:
+                self._start_times[data.entity._moId] = datetime.datetime.fromtimestamp(
+                    timestamps[-1],
+                    datetime.timezone.utc
+                )
+
+        live = {entity._moId for entity in entities}
+        with self._lock:
+            for moid in list(self._start_times):
+                if moid not in live:
+                    del self._start_times[moid]
+
+        self.updated = time.time()
+
+
+def _create_collector(agent, watched=()):
+    """
+    Create and start the performance collector of an agent
+
+    Must be called with the lock of the collectors held.
+
+    Args:
+        agent (VConnector): A VConnector instance
+        watched     (list): Clusters and hosts to watch
+
+    Returns:
+        The started PerformanceCollector instance
+
+    """
+    collector = PerformanceCollector(agent=agent)
+    for obj in watched:
+        collector.watch(obj)
+    collector.start()
+    _collectors[agent] = collector
+
+    return collector
+
+
+def start_performance_collector(agent, obj):
+    """
+    Start collecting samples for the entities of a cluster or host
+
+    The performance collector of the agent is started if it is
+    not running already. A collector which thread has failed is
+    replaced, keeping the clusters and hosts it was watching.
+
+    Args:
+        agent        (VConnector): A VConnector instance
+        obj   (vim.ManagedEntity): A Cluster or Host managed entity
+
+    Returns:
+        The PerformanceCollector instance of the agent
+
+    """
+    with _lock:
+        collector = _collectors.get(agent)
+        if collector is None:
+            collector = _create_collector(agent)
+        elif not collector.is_alive():
+            collector = _create_collector(agent, collector.watched())
+
+    collector.watch(obj)
+
+    return collector
+
+
+def stop_performance_collector(agent):
+    """
+    Stop the performance collector of an agent
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    """
+    with _lock:
+        collector = _collectors.pop(agent, None)
+
+    if collector is None:
+        return
+
+    collector.signal_stop()
+    collector.join(1)
+
+
+def get_performance_collector(agent):
+    """
+    Get the performance collector of an agent
+
+    A collector which thread has failed is restarted,
+    at most once every RESTART_DELAY seconds.
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    Returns:
+        The PerformanceCollector instance of the agent,
+        or None if it is not running
+
+    """
+    with _lock:
+        collector = _collectors.get(agent)
+        if collector is None:
+            return None
+
+        if not collector.is_alive():
+            if time.monotonic() - collector.created >= RESTART_DELAY:
+                _create_collector(agent, collector.watched())
+            return None
+
+    return collector
@@ -30,6 +30,7 @@ Common Widgets Module
 import pyVmomi
 
 import pvc.widget.alarm
+import pvc.widget.cache
 import pvc.widget.cluster
 import pvc.widget.datacenter
 import pvc.widget.menu
@@ -37,7 +38,9 @@ import pvc.widget.gauge
 import pvc.widget.datastore
 import pvc.widget.network
 import pvc.widget.hostsystem
+import pvc.widget.property
 import pvc.widget.session
+import pvc.widget.store
 import pvc.widget.radiolist
 import pvc.widget.virtualmachine
 
@@ -48,10 +51,117 @@ __all__ = [
     'choose_datacenter', 'choose_cluster', 'choose_datastore',
     'inventory_search_by_dns', 'inventory_search_by_ip',
     'inventory_search_by_uuid', 'datacenter_menu', 'remove',
-    'choose_network', 'host_service_menu',
+    'choose_network', 'host_service_menu', 'inventory_properties',
+    'iter_inventory_properties', 'inventory_store',
 ]
 
 
+def iter_inventory_properties(agent, obj_type, path_set, container=None, objects=None,
+                              page_size=pvc.widget.property.DEFAULT_PAGE_SIZE):
+    """
+    Collect properties for managed objects in pages
+
+    Properties are served from the inventory cache of the agent
+    when possible, otherwise they are retrieved from the
+    vSphere host using a container or list view, one page at a time.
+
+    Args:
+        agent             (VConnector): A VConnector instance
+        obj_type       (pyVmomi.vim.*): Type of managed object
+        path_set                (list): List of properties to retrieve
+        container  (vim.ManagedEntity): Starting point of inventory search
+        objects                 (list): If specified collect properties
+                                        only for these managed objects
+        page_size                (int): Max number of objects per page
+
+    Yields:
+        Lists of properties for the managed objects, including
+        the managed object refs
+
+    """
+    if container is None:
+        container = agent.si.content.rootFolder
+
+    cache = pvc.widget.cache.get_inventory_cache(agent)
+    if cache and cache.covers(obj_type, path_set):
+        if objects is not None:
+            properties, objects = cache.get_properties(obj_type, objects)
+            if properties:
+                yield properties
+            if not objects:
+                return
+        elif container == agent.si.content.rootFolder:
+            properties, _ = cache.get_properties(obj_type)
+            yield properties
+            return
+
+    if objects is not None:
+        view = agent.get_list_view(objects)
+    else:
+        view = agent.get_container_view(
+            obj_type=[obj_type],
+            container=container
+        )
+
+    try:
+        for page in pvc.widget.property.iter_properties(
+                agent=agent,
+                view_ref=view,
+                obj_type=obj_type,
+                path_set=path_set,
+                page_size=page_size):
+            yield page
+    finally:
+        view.DestroyView()
+
+
+def inventory_properties(agent, obj_type, path_set, container=None, objects=None):
+    """
+    Collect properties for managed objects
+
+    Args:
+        agent             (VConnector): A VConnector instance
+        obj_type       (pyVmomi.vim.*): Type of managed object
+        path_set                (list): List of properties to retrieve
+        container  (vim.ManagedEntity): Starting point of inventory search
+        objects                 (list): If specified collect properties
+                                        only for these managed objects
+
+    Returns:
+        A list of properties for the managed objects, including
+        the managed object refs
+
+    """
+    properties = []
+    for page in iter_inventory_properties(agent, obj_type, path_set, container, objects):
+        properties.extend(page)
+
+    return properties
+
+
+def inventory_store(agent, obj_type, path_set, container=None, objects=None):
+    """
+    Collect properties for managed objects into an inventory store
+
+    Args:
+        agent             (VConnector): A VConnector instance
+        obj_type       (pyVmomi.vim.*): Type of managed object
+        path_set                (list): List of properties to retrieve
+        container  (vim.ManagedEntity): Starting point of inventory search
+        objects                 (list): If specified collect properties
+                                        only for these managed objects
+
+    Returns:
+        A pvc.widget.store.InventoryStore instance
+
+    """
+    store = pvc.widget.store.InventoryStore(path_set=path_set)
+    for page in iter_inventory_properties(agent, obj_type, path_set, container, objects):
+        store.extend(page)
+
+    return store
+
+
 def rename(obj, dialog):
     """
     Rename a Managed Entity
@@ -133,33 +243,28 @@ def datacenter_menu(agent, dialog, folder=None):
     if not folder:
         folder = agent.si.content.rootFolder
 
-    view = agent.get_container_view(
-        obj_type=[pyVmomi.vim.Datacenter],
-        container=folder
-    )
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.Datacenter,
         path_set=['name', 'overallStatus'],
-        include_mors=True
+        container=folder
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         dialog.msgbox(
             title='No objects found',
             text='No datacenters managed entities found'
         )
         return
 
-    items = [
-        pvc.widget.menu.MenuItem(
-            tag=dc['name'],
+    items = store.items(
+        lambda dc: pvc.widget.menu.MenuItem(
+            tag=dc.tag,
             description=dc['overallStatus'],
             on_select=pvc.widget.datacenter.DatacenterWidget,
-            on_select_args=(agent, dialog, dc['obj'])
-        ) for dc in properties
-    ]
+            on_select_args=(agent, dialog, dc.obj)
+        )
+    )
 
     menu = pvc.widget.menu.Menu(
         items=items,
@@ -188,33 +293,28 @@ def cluster_menu(agent, dialog, folder=None):
     if not folder:
         folder = agent.si.content.rootFolder
 
-    view = agent.get_container_view(
-        obj_type=[pyVmomi.vim.ClusterComputeResource],
-        container=folder
-    )
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.ClusterComputeResource,
         path_set=['name', 'overallStatus'],
-        include_mors=True
+        container=folder
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         dialog.msgbox(
             title='No objects found',
             text='No cluster managed entities found'
         )
         return
 
-    items = [
-        pvc.widget.menu.MenuItem(
-            tag=cluster['name'],
+    items = store.items(
+        lambda cluster: pvc.widget.menu.MenuItem(
+            tag=cluster.tag,
             description=cluster['overallStatus'],
             on_select=pvc.widget.cluster.ClusterWidget,
-            on_select_args=(agent, dialog, cluster['obj'])
-        ) for cluster in properties
-    ]
+            on_select_args=(agent, dialog, cluster.obj)
+        )
+    )
 
     menu = pvc.widget.menu.Menu(
         items=items,
@@ -250,30 +350,28 @@ def host_menu(agent, dialog, obj):
         )
         return
 
-    view = agent.get_list_view(obj.host)
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.HostSystem,
         path_set=['name', 'runtime.connectionState'],
-        include_mors=True
+        objects=obj.host
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         dialog.msgbox(
             title=title,
             text='No hosts found on this managed entity'
         )
         return
 
-    items = [
-        pvc.widget.menu.MenuItem(
-            tag=host['name'],
+    items = store.items(
+        lambda host: pvc.widget.menu.MenuItem(
+            tag=host.tag,
             description=host['runtime.connectionState'],
             on_select=pvc.widget.hostsystem.HostSystemWidget,
-            on_select_args=(agent, dialog, host['obj'])
-        ) for host in properties
-    ]
+            on_select_args=(agent, dialog, host.obj)
+        )
+    )
 
     menu = pvc.widget.menu.Menu(
         items=items,
@@ -313,30 +411,28 @@ def hostmount_menu(agent, dialog, obj):
         return
 
     hosts = [h.key for h in obj.host]
-    view = agent.get_list_view(hosts)
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.HostSystem,
         path_set=['name', 'runtime.connectionState'],
-        include_mors=True
+        objects=hosts
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         dialog.msgbox(
             title=title,
             text='No hosts have mounted the datastore'
         )
         return
 
-    items = [
-        pvc.widget.menu.MenuItem(
-            tag=host['name'],
+    items = store.items(
+        lambda host: pvc.widget.menu.MenuItem(
+            tag=host.tag,
             description=host['runtime.connectionState'],
             on_select=pvc.widget.hostsystem.HostSystemWidget,
-            on_select_args=(agent, dialog, host['obj'])
-        ) for host in properties
-    ]
+            on_select_args=(agent, dialog, host.obj)
+        )
+    )
 
     menu = pvc.widget.menu.Menu(
         items=items,
@@ -408,30 +504,28 @@ def network_menu(agent, dialog, obj):
         )
         return
 
-    view = agent.get_list_view(obj.network)
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.Network,
         path_set=['name', 'summary.accessible'],
-        include_mors=True
+        objects=obj.network
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         dialog.msgbox(
             title=title,
             text='No networks found for this managed entity'
         )
         return
 
-    items = [
-        pvc.widget.menu.MenuItem(
-            tag=network['name'],
+    items = store.items(
+        lambda network: pvc.widget.menu.MenuItem(
+            tag=network.tag,
             description='Accessible' if network['summary.accessible'] else 'Not Accessible',
             on_select=pvc.widget.network.NetworkWidget,
-            on_select_args=(agent, dialog, network['obj'])
-        ) for network in properties
-    ]
+            on_select_args=(agent, dialog, network.obj)
+        )
+    )
 
     menu = pvc.widget.menu.Menu(
         items=items,
@@ -468,36 +562,46 @@ def virtual_machine_menu(agent, dialog, obj):
         )
         return
 
-    view = agent.get_list_view(obj.vm)
-    properties = agent.collect_properties(
-        view_ref=view,
+    path_set = ['name', 'runtime.powerState']
+    pages = iter_inventory_properties(
+        agent=agent,
         obj_type=pyVmomi.vim.VirtualMachine,
-        path_set=['name', 'runtime.powerState'],
-        include_mors=True
+        path_set=path_set,
+        objects=obj.vm
     )
-    view.DestroyView()
 
-    if not properties:
+    # Fill the store page by page as results arrive
+    store = pvc.widget.store.InventoryStore(path_set=path_set)
+    for page in pages:
+        store.extend(page)
+        dialog.infobox(
+            title=title,
+            text='Retrieving information ... ({} objects)'.format(len(store))
+        )
+
+    if not store:
         dialog.msgbox(
             title=title,
             text='No virtual machines found for this managed entity'
         )
         return
 
-    items = [
-        pvc.widget.menu.MenuItem(
-            tag=vm['name'],
+    items = store.items(
+        lambda vm: pvc.widget.menu.MenuItem(
+            tag=vm.tag,
             description=vm['runtime.powerState'],
             on_select=pvc.widget.virtualmachine.VirtualMachineWidget,
-            on_select_args=(agent, dialog, vm['obj'])
-        ) for vm in properties
-    ]
+            on_select_args=(agent, dialog, vm.obj)
+        )
+    )
 
     menu = pvc.widget.menu.Menu(
         items=items,
         dialog=dialog,
         title=title,
-        text=''
+        text='',
+        extra_label='Power',
+        on_extra=lambda: pvc.widget.virtualmachine.VirtualMachineBulkPowerWidget(agent, dialog, obj, store)
     )
 
     menu.display()
@@ -528,30 +632,28 @@ def datastore_menu(agent, dialog, obj):
         )
         return
 
-    view = agent.get_list_view(obj.datastore)
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.Datastore,
         path_set=['name', 'summary.accessible'],
-        include_mors=True
+        objects=obj.datastore
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         dialog.msgbox(
             title=title,
             text='No datastores found for this managed entity'
         )
         return
 
-    items = [
-        pvc.widget.menu.MenuItem(
-            tag=ds['name'],
+    items = store.items(
+        lambda ds: pvc.widget.menu.MenuItem(
+            tag=ds.tag,
             description='Accessible' if ds['summary.accessible'] else 'Not Accessible',
             on_select=pvc.widget.datastore.DatastoreWidget,
-            on_select_args=(agent, dialog, ds['obj'])
-        ) for ds in properties
-    ]
+            on_select_args=(agent, dialog, ds.obj)
+        )
+    )
 
     menu = pvc.widget.menu.Menu(
         items=items,
@@ -663,25 +765,22 @@ def choose_folder(agent, dialog):
         text='Retrieving information ...'
     )
 
-    view = agent.get_container_view(obj_type=[pyVmomi.vim.Folder])
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.Folder,
-        path_set=['name'],
-        include_mors=True
+        path_set=['name']
     )
-    view.DestroyView()
 
     # Remove all occurrencies of 'vm', 'host', 'datastore' and
     # 'network' from the collected folders as these ones are
     # reserved and we cannot create a datacenter there
-    folders = [f for f in properties if f['name'] not in ('vm', 'host', 'datastore', 'network')]
+    folders = [f for f in store if f['name'] not in ('vm', 'host', 'datastore', 'network')]
 
     if not folders:
         return agent.si.content.rootFolder
 
     items = [
-        pvc.widget.radiolist.RadioListItem(tag=folder['name'])
+        pvc.widget.radiolist.RadioListItem(tag=folder.tag)
         for folder in folders
     ]
     radiolist = pvc.widget.radiolist.RadioList(
@@ -696,7 +795,7 @@ def choose_folder(agent, dialog):
     if not tag:
         return agent.si.content.rootFolder
 
-    return [f['obj'] for f in properties if f['name'] == tag].pop()
+    return store.find(tag).obj
 
 
 def choose_datacenter(agent, dialog, all_datacenters_option=False):
@@ -724,16 +823,13 @@ def choose_datacenter(agent, dialog, all_datacenters_option=False):
         text='Retrieving information ...'
     )
 
-    view = agent.get_datacenter_view()
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.Datacenter,
-        path_set=['name'],
-        include_mors=True
+        path_set=['name']
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         return
 
     items = []
@@ -742,10 +838,9 @@ def choose_datacenter(agent, dialog, all_datacenters_option=False):
             pvc.widget.radiolist.RadioListItem(tag='All Datacenters')
         )
 
-    datacenters = [
-        pvc.widget.radiolist.RadioListItem(tag=datacenter['name'])
-        for datacenter in properties
-    ]
+    datacenters = store.items(
+        lambda datacenter: pvc.widget.radiolist.RadioListItem(tag=datacenter.tag)
+    )
     items.extend(datacenters)
 
     radiolist = pvc.widget.radiolist.RadioList(
@@ -762,7 +857,7 @@ def choose_datacenter(agent, dialog, all_datacenters_option=False):
     elif all_datacenters_option and tag == 'All Datacenters':
         return
 
-    return [d['obj'] for d in properties if d['name'] == tag].pop()
+    return store.find(tag).obj
 
 
 def choose_cluster(agent, dialog, folder=None):
@@ -789,28 +884,22 @@ def choose_cluster(agent, dialog, folder=None):
     if not folder:
         folder = agent.si.content.rootFolder
 
-    view = agent.get_container_view(
-        obj_type=[pyVmomi.vim.ClusterComputeResource],
-        container=folder
-    )
-
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.ClusterComputeResource,
         path_set=['name', 'overallStatus'],
-        include_mors=True
+        container=folder
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         return
 
-    items = [
-        pvc.widget.radiolist.RadioListItem(
-            tag=cluster['name'],
+    items = store.items(
+        lambda cluster: pvc.widget.radiolist.RadioListItem(
+            tag=cluster.tag,
             description=cluster['overallStatus'],
-        ) for cluster in properties
-    ]
+        )
+    )
 
     radiolist = pvc.widget.radiolist.RadioList(
         items=items,
@@ -824,7 +913,7 @@ def choose_cluster(agent, dialog, folder=None):
     if code in (dialog.CANCEL, dialog.ESC) or not tag:
         return
 
-    return [c['obj'] for c in properties if c['name'] == tag].pop()
+    return store.find(tag).obj
 
 
 def choose_host(agent, dialog, folder=None):
@@ -851,28 +940,22 @@ def choose_host(agent, dialog, folder=None):
     if not folder:
         folder = agent.si.content.rootFolder
 
-    view = agent.get_container_view(
-        obj_type=[pyVmomi.vim.HostSystem],
-        container=folder
-    )
-
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.HostSystem,
         path_set=['name', 'runtime.connectionState'],
-        include_mors=True
+        container=folder
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         return
 
-    items = [
-        pvc.widget.radiolist.RadioListItem(
-            tag=host['name'],
+    items = store.items(
+        lambda host: pvc.widget.radiolist.RadioListItem(
+            tag=host.tag,
             description=host['runtime.connectionState'],
-        ) for host in properties
-    ]
+        )
+    )
 
     radiolist = pvc.widget.radiolist.RadioList(
         items=items,
@@ -886,7 +969,7 @@ def choose_host(agent, dialog, folder=None):
     if code in (dialog.CANCEL, dialog.ESC) or not tag:
         return
 
-    return [h['obj'] for h in properties if h['name'] == tag].pop()
+    return store.find(tag).obj
 
 
 def choose_datastore(agent, dialog, obj):
@@ -916,24 +999,22 @@ def choose_datastore(agent, dialog, obj):
     if not hasattr(obj, 'datastore'):
         return
 
-    view = agent.get_list_view(obj.datastore)
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.Datastore,
         path_set=['name', 'summary.accessible'],
-        include_mors=True
+        objects=obj.datastore
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         return
 
-    items = [
-        pvc.widget.radiolist.RadioListItem(
-            tag=ds['name'],
+    items = store.items(
+        lambda ds: pvc.widget.radiolist.RadioListItem(
+            tag=ds.tag,
             description='Accessible' if ds['summary.accessible'] else 'Not Accessible',
-        ) for ds in properties
-    ]
+        )
+    )
 
     radiolist = pvc.widget.radiolist.RadioList(
         items=items,
@@ -947,7 +1028,7 @@ def choose_datastore(agent, dialog, obj):
     if code in (dialog.CANCEL, dialog.ESC) or not tag:
         return
 
-    return [ds['obj'] for ds in properties if ds['name'] == tag].pop()
+    return store.find(tag).obj
 
 
 def choose_network(agent, dialog, obj):
@@ -977,24 +1058,22 @@ def choose_network(agent, dialog, obj):
     if not hasattr(obj, 'network'):
         return
 
-    view = agent.get_list_view(obj.network)
-    properties = agent.collect_properties(
-        view_ref=view,
+    store = inventory_store(
+        agent=agent,
         obj_type=pyVmomi.vim.Network,
         path_set=['name', 'summary.accessible'],
-        include_mors=True
+        objects=obj.network
     )
-    view.DestroyView()
 
-    if not properties:
+    if not store:
         return
 
-    items = [
-        pvc.widget.radiolist.RadioListItem(
-            tag=network['name'],
+    items = store.items(
+        lambda network: pvc.widget.radiolist.RadioListItem(
+            tag=network.tag,
             description='Accessible' if network['summary.accessible'] else 'Not Accessible',
-        ) for network in properties
-    ]
+        )
+    )
 
     radiolist = pvc.widget.radiolist.RadioList(
         items=items,
@@ -1008,7 +1087,7 @@ def choose_network(agent, dialog, obj):
     if code in (dialog.CANCEL, dialog.ESC) or not tag:
         return
 
-    return [network['obj'] for network in properties if network['name'] == tag].pop()
+    return store.find(tag).obj
 
 
 def inventory_search_by_dns(agent, dialog, vm_search):
@@ -339,33 +339,28 @@ class DatacenterHostSystemWidget(object):
             text='Retrieving information ...'
         )
 
-        view = self.agent.get_container_view(
-            obj_type=[pyVmomi.vim.HostSystem],
-            container=self.obj
-        )
-        properties = self.agent.collect_properties(
-            view_ref=view,
+        store = pvc.widget.common.inventory_store(
+            agent=self.agent,
             obj_type=pyVmomi.vim.HostSystem,
             path_set=['name', 'runtime.connectionState'],
-            include_mors=True
+            container=self.obj
         )
-        view.DestroyView()
 
-        if not properties:
+        if not store:
             self.dialog.msgbox(
                 title=self.title,
                 text='No hosts found in datacenter'
             )
             return
 
-        items = [
-            pvc.widget.menu.MenuItem(
-                tag=host['name'],
+        items = store.items(
+            lambda host: pvc.widget.menu.MenuItem(
+                tag=host.tag,
                 description=host['runtime.connectionState'],
                 on_select=pvc.widget.hostsystem.HostSystemWidget,
-                on_select_args=(self.agent, self.dialog, host['obj'])
-            ) for host in properties
-        ]
+                on_select_args=(self.agent, self.dialog, host.obj)
+            )
+        )
 
         menu = pvc.widget.menu.Menu(
             items=items,
@@ -476,11 +471,23 @@ class DatacenterVirtualMachineWidget(object):
                 on_select=pvc.widget.virtualmachine.CreateVirtualMachineWidget,
                 on_select_args=(self.agent, self.dialog, self.obj)
             ),
+            pvc.widget.menu.MenuItem(
+                tag='Deploy',
+                description='Deploy Virtual Machine from OVF/OVA template',
+                on_select=pvc.widget.virtualmachine.VirtualMachineImportWidget,
+                on_select_args=(self.agent, self.dialog, self.obj)
+            ),
             pvc.widget.menu.MenuItem(
                 tag='View',
                 description='Virtual Machines in datacenter',
                 on_select=self.virtual_machine_menu
             ),
+            pvc.widget.menu.MenuItem(
+                tag='Export',
+                description='Export multiple Virtual Machines',
+                on_select=pvc.widget.virtualmachine.VirtualMachineExportQueueWidget,
+                on_select_args=(self.agent, self.dialog, self.obj)
+            ),
         ]
 
         menu = pvc.widget.menu.Menu(
@@ -498,33 +505,28 @@ class DatacenterVirtualMachineWidget(object):
             text='Retrieving information ...'
         )
 
-        view = self.agent.get_container_view(
-            obj_type=[pyVmomi.vim.VirtualMachine],
-            container=self.obj
-        )
-        properties = self.agent.collect_properties(
-            view_ref=view,
+        store = pvc.widget.common.inventory_store(
+            agent=self.agent,
             obj_type=pyVmomi.vim.VirtualMachine,
             path_set=['name', 'runtime.powerState'],
-            include_mors=True
+            container=self.obj
         )
-        view.DestroyView()
 
-        if not properties:
+        if not store:
             self.dialog.msgbox(
                 title=self.title,
                 text='No virtual machines found in datacenter'
             )
             return
 
-        items = [
-            pvc.widget.menu.MenuItem(
-                tag=vm['name'],
+        items = store.items(
+            lambda vm: pvc.widget.menu.MenuItem(
+                tag=vm.tag,
                 description=vm['runtime.powerState'],
                 on_select=pvc.widget.virtualmachine.VirtualMachineWidget,
-                on_select_args=(self.agent, self.dialog, vm['obj'])
-            ) for vm in properties
-        ]
+                on_select_args=(self.agent, self.dialog, vm.obj)
+            )
+        )
 
         menu = pvc.widget.menu.Menu(
             items=items,
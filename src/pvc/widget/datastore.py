@@ -27,9 +27,15 @@ Datastore Widgets
 
 """
 
+import os
+import functools
+
+import pyVmomi
 import humanize
+import requests
 
 import pvc.widget.alarm
+import pvc.widget.checklist
 import pvc.widget.common
 import pvc.widget.debug
 import pvc.widget.event
@@ -37,9 +43,10 @@ import pvc.widget.menu
 import pvc.widget.form
 import pvc.widget.gauge
 import pvc.widget.performance
+import pvc.widget.transfer
 import pvc.widget.virtualmachine
 
-__all__ = ['DatastoreWidget', 'DatastoreActionWidget']
+__all__ = ['DatastoreWidget', 'DatastoreActionWidget', 'DatastoreBrowserWidget']
 
 
 class DatastoreWidget(object):
@@ -71,6 +78,12 @@ class DatastoreWidget(object):
                 description='Datastore Capacity ',
                 on_select=self.capacity
             ),
+            pvc.widget.menu.MenuItem(
+                tag='Browse',
+                description='Browse and transfer files',
+                on_select=DatastoreBrowserWidget,
+                on_select_args=(self.agent, self.dialog, self.obj)
+            ),
             pvc.widget.menu.MenuItem(
                 tag='Actions',
                 description='Available Actions',
@@ -264,3 +277,451 @@ class DatastoreActionWidget(object):
         )
 
         self.obj.RefreshDatastoreStorageInfo()
+
+
+class DatastoreBrowserWidget(object):
+    UPLOAD_TAG = '[Upload]'
+    DOWNLOAD_TAG = '[Download]'
+    REFRESH_TAG = '[Refresh]'
+
+    def __init__(self, agent, dialog, obj):
+        """
+        Datastore Browser Widget
+
+        The folders of the datastore are searched once and the
+        listings are cached until they are refreshed. Files are
+        transferred over the /folder HTTP endpoint of the host
+        using a single session, so that connections are reused.
+        Multiple files are transferred concurrently.
+
+        Args:
+            agent     (VConnector): A VConnector instance
+            dialog (dialog.Dialog): A Dialog instance
+            obj    (vim.Datastore): A Datastore managed entity
+
+        """
+        self.agent = agent
+        self.dialog = dialog
+        self.obj = obj
+        self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
+        self.listing = None
+        self.session = None
+        self.datacenter = None
+        self.display()
+
+    def display(self):
+        if not self.refresh():
+            return
+
+        try:
+            self.browse(folder='')
+        finally:
+            if self.session is not None:
+                self.session.close()
+
+    def datastore_path(self, folder):
+        """
+        Get the datastore path of a folder, e.g. '[datastore1] iso'
+
+        """
+        return '[{}] {}'.format(self.obj.name, folder).rstrip()
+
+    def datacenter_path(self):
+        """
+        Get the inventory path of the datacenter of the datastore
+
+        """
+        obj = self.obj.parent
+        while not isinstance(obj, pyVmomi.vim.Datacenter):
+            obj = obj.parent
+
+        names = []
+        while obj.parent is not None:
+            names.insert(0, obj.name)
+            obj = obj.parent
+
+        return '/'.join(names)
+
+    def refresh(self):
+        """
+        Search the folders of the datastore and cache their listings
+
+        Returns:
+            True if the datastore has been searched, False otherwise
+
+        """
+        self.dialog.infobox(
+            title=self.title,
+            text='Retrieving information ...'
+        )
+
+        details = pyVmomi.vim.host.DatastoreBrowser.FileInfo.Details(
+            fileType=True,
+            fileSize=True,
+            modification=True
+        )
+        spec = pyVmomi.vim.host.DatastoreBrowser.SearchSpec(details=details)
+
+        task = self.obj.browser.SearchDatastoreSubFolders_Task(
+            datastorePath=self.datastore_path(''),
+            searchSpec=spec
+        )
+
+        gauge = pvc.widget.gauge.TaskGauge(
+            dialog=self.dialog,
+            task=task,
+            title=self.title,
+            text='Searching datastore folders ...'
+        )
+
+        gauge.display()
+
+        if task.info.state != pyVmomi.vim.TaskInfoState.success:
+            return False
+
+        prefix = self.datastore_path('')
+        self.listing = {}
+        for result in task.info.result:
+            folder = result.folderPath[len(prefix):].strip().strip('/')
+            self.listing[folder] = sorted(result.file or [], key=lambda f: f.path)
+
+        return True
+
+    def browse(self, folder):
+        """
+        Browse a folder of the datastore
+
+        Args:
+            folder (str): Path to the folder relative to the datastore
+
+        """
+        while True:
+            items = [
+                pvc.widget.menu.MenuItem(
+                    tag=self.UPLOAD_TAG,
+                    description='Upload files to this folder',
+                    on_select=self.upload,
+                    on_select_args=(folder,)
+                ),
+                pvc.widget.menu.MenuItem(
+                    tag=self.DOWNLOAD_TAG,
+                    description='Download files from this folder',
+                    on_select=self.download,
+                    on_select_args=(folder,)
+                ),
+                pvc.widget.menu.MenuItem(
+                    tag=self.REFRESH_TAG,
+                    description='Search the datastore folders again',
+                    on_select=self.refresh
+                ),
+            ]
+
+            for info in self.listing.get(folder, []):
+                path = '/'.join(p for p in (folder, info.path) if p)
+                if isinstance(info, pyVmomi.vim.host.DatastoreBrowser.FolderInfo):
+                    items.append(
+                        pvc.widget.menu.MenuItem(
+                            tag=info.path + '/',
+                            description='Folder',
+                            on_select=self.browse,
+                            on_select_args=(path,)
+                        )
+                    )
+                else:
+                    items.append(
+                        pvc.widget.menu.MenuItem(
+                            tag=info.path,
+                            description=humanize.naturalsize(info.fileSize or 0, binary=True),
+                            on_select=self.file_info,
+                            on_select_args=(info,)
+                        )
+                    )
+
+            menu = pvc.widget.menu.Menu(
+                items=items,
+                dialog=self.dialog,
+                return_selected=True,
+                title=self.title,
+                text=self.datastore_path(folder)
+            )
+
+            item = menu.display()
+            if item in (self.dialog.CANCEL, self.dialog.ESC):
+                return
+
+            # The listing may have changed, so the menu is rebuilt
+            item.selected()
+
+    def file_info(self, info):
+        """
+        Display information about a file
+
+        Args:
+            info (vim.host.DatastoreBrowser.FileInfo): The file information
+
+        """
+        elements = [
+            pvc.widget.form.FormElement(
+                label='Name',
+                item=info.path
+            ),
+            pvc.widget.form.FormElement(
+                label='Type',
+                item=info.__class__.__name__.split('.')[-1]
+            ),
+            pvc.widget.form.FormElement(
+                label='Size',
+                item=humanize.naturalsize(info.fileSize or 0, binary=True)
+            ),
+            pvc.widget.form.FormElement(
+                label='Modified',
+                item=str(info.modification)
+            ),
+        ]
+
+        form = pvc.widget.form.Form(
+            dialog=self.dialog,
+            form_elements=elements,
+            title=self.title,
+            text='File information'
+        )
+
+        form.display()
+
+    def url(self, path):
+        """
+        Get the URL of a file on the datastore
+
+        Args:
+            path (str): Path to the file relative to the datastore
+
+        """
+        if self.datacenter is None:
+            self.datacenter = self.datacenter_path()
+
+        return pvc.widget.transfer.datastore_url(
+            agent=self.agent,
+            datacenter=self.datacenter,
+            datastore=self.obj.name,
+            path=path
+        )
+
+    def download(self, folder):
+        """
+        Download files from a folder of the datastore
+
+        Args:
+            folder (str): Path to the folder relative to the datastore
+
+        """
+        files = [
+            info for info in self.listing.get(folder, [])
+            if not isinstance(info, pyVmomi.vim.host.DatastoreBrowser.FolderInfo)
+        ]
+
+        if not files:
+            self.dialog.msgbox(
+                title=self.title,
+                text='No files found in this folder'
+            )
+            return
+
+        items = [
+            pvc.widget.checklist.CheckListItem(
+                tag=info.path,
+                description=humanize.naturalsize(info.fileSize or 0, binary=True)
+            ) for info in files
+        ]
+
+        checklist = pvc.widget.checklist.CheckList(
+            items=items,
+            dialog=self.dialog,
+            title=self.title,
+            text='Select file(s) to download'
+        )
+
+        checklist.display()
+        selected = set(checklist.selected())
+
+        if not selected:
+            return
+
+        code, path = self.dialog.dselect(
+            title='Directory to save files',
+            filepath=''
+        )
+
+        if code in (self.dialog.ESC, self.dialog.CANCEL):
+            return
+
+        session = self.get_session()
+        downloads = []
+        total = 0
+        calls = []
+        try:
+            for info in files:
+                if info.path not in selected:
+                    continue
+                url = self.url('/'.join(p for p in (folder, info.path) if p))
+                writer = pvc.widget.transfer.FileWriter(path=os.path.join(path, info.path))
+                downloads.append(pvc.widget.transfer.Download(session=session, url=url, writer=writer))
+                total += info.fileSize or 0
+
+            for d in downloads:
+                calls.extend(functools.partial(d.fetch, part) for part in d.parts())
+            self.transfer(
+                text='Downloading {} file(s) ...'.format(len(downloads)),
+                calls=calls,
+                transferred=lambda: sum(d.transferred for d in downloads),
+                total=total
+            )
+            for d in downloads:
+                d.finish()
+        except (requests.RequestException, IOError) as e:
+            self.dialog.msgbox(
+                title=self.title,
+                text='Download failed:\n\n{}\n'.format(e)
+            )
+            return
+        finally:
+            for d in downloads:
+                d.close()
+
+        self.dialog.msgbox(
+            title=self.title,
+            text='Downloaded {} file(s) to:\n\n{}\n'.format(len(downloads), path)
+        )
+
+    def upload(self, folder):
+        """
+        Upload files to a folder of the datastore
+
+        Args:
+            folder (str): Path to the folder relative to the datastore
+
+        """
+        code, path = self.dialog.dselect(
+            title='Directory containing files to upload',
+            filepath=''
+        )
+
+        if code in (self.dialog.ESC, self.dialog.CANCEL):
+            return
+
+        try:
+            names = sorted(
+                name for name in os.listdir(path)
+                if os.path.isfile(os.path.join(path, name))
+            )
+            sizes = {name: os.path.getsize(os.path.join(path, name)) for name in names}
+        except OSError as e:
+            self.dialog.msgbox(
+                title=self.title,
+                text='Cannot read directory {}:\n\n{}\n'.format(path, e)
+            )
+            return
+
+        if not names:
+            self.dialog.msgbox(
+                title=self.title,
+                text='No files found in directory {}'.format(path)
+            )
+            return
+
+        items = [
+            pvc.widget.checklist.CheckListItem(
+                tag=name,
+                description=humanize.naturalsize(sizes[name], binary=True)
+            ) for name in names
+        ]
+
+        checklist = pvc.widget.checklist.CheckList(
+            items=items,
+            dialog=self.dialog,
+            title=self.title,
+            text='Select file(s) to upload to {}'.format(self.datastore_path(folder))
+        )
+
+        checklist.display()
+        selected = checklist.selected()
+
+        if not selected:
+            return
+
+        session = self.get_session()
+        uploads = []
+        try:
+            for name in selected:
+                url = self.url('/'.join(p for p in (folder, name) if p))
+                reader = pvc.widget.transfer.FileReader(path=os.path.join(path, name))
+                uploads.append(pvc.widget.transfer.Upload(session=session, url=url, reader=reader))
+
+            self.transfer(
+                text='Uploading {} file(s) ...'.format(len(uploads)),
+                calls=[u.run for u in uploads],
+                transferred=lambda: sum(u.transferred for u in uploads),
+                total=sum(len(u.reader) for u in uploads)
+            )
+        except (requests.RequestException, IOError) as e:
+            self.dialog.msgbox(
+                title=self.title,
+                text='Upload failed:\n\n{}\n'.format(e)
+            )
+            return
+        finally:
+            for u in uploads:
+                u.reader.close()
+
+        self.dialog.msgbox(
+            title=self.title,
+            text='Uploaded {} file(s) to {}'.format(len(uploads), self.datastore_path(folder))
+        )
+
+        self.refresh()
+
+    def get_session(self):
+        """
+        Get the HTTP session shared by the transfers of the browser
+
+        """
+        if self.session is None:
+            self.session = pvc.widget.transfer.create_session(agent=self.agent)
+
+        return self.session
+
+    def transfer(self, text, calls, transferred, total):
+        """
+        Run transfers concurrently and display their progress
+
+        Args:
+            text             (str): Text to display in the gauge
+            calls           (list): A list of callables performing the transfers
+            transferred (callable): A callable returning the number of transferred bytes
+            total            (int): Total number of bytes to transfer
+
+        """
+        self.dialog.gauge_start(
+            title=self.title,
+            text=text
+        )
+
+        def on_poll():
+            done = transferred()
+            self.dialog.gauge_update(
+                percent=min(done * 100 // total, 100) if total else 0,
+                text='{}\n({} of {})\n'.format(
+                    text,
+                    humanize.naturalsize(done, binary=True),
+                    humanize.naturalsize(total, binary=True)
+                ),
+                update_text=True
+            )
+
+        try:
+            pvc.widget.transfer.run_concurrently(
+                calls=calls,
+                max_workers=pvc.widget.transfer.DEFAULT_WORKERS,
+                on_poll=on_poll
+            )
+        finally:
+            self.dialog.gauge_stop()
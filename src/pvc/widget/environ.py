@@ -0,0 +1,84 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Environment Module
+
+"""
+
+import os
+
+__all__ = ['getint', 'getchoice']
+
+
+def getint(name, default, minimum=1):
+    """
+    Get an integer option from an environment variable
+
+    Values which are not integers or are smaller than the
+    minimum are ignored, so that a malformed variable does
+    not prevent the application from starting.
+
+    Args:
+        name     (str): Name of the environment variable
+        default  (int): Value used if the variable is not set or invalid
+        minimum  (int): Smallest valid value
+
+    Returns:
+        The value of the option
+
+    """
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+    if value < minimum:
+        return default
+
+    return value
+
+
+def getchoice(name, default, choices):
+    """
+    Get an option with a fixed set of values from an environment variable
+
+    Values are case-insensitive. Values which are not one of
+    the choices are ignored, so that a malformed variable does
+    not prevent the application from starting.
+
+    Args:
+        name     (str): Name of the environment variable
+        default  (str): Value used if the variable is not set or invalid
+        choices (list): Valid values in lower case
+
+    Returns:
+        The value of the option
+
+    """
+    value = os.environ.get(name, default).strip().lower()
+    if value not in choices:
+        return default
+
+    return value
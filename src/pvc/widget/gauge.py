@@ -27,51 +27,401 @@ Gauge Widgets
 
 """
 
+import time
+
 import pyVmomi
 
-from time import sleep
+__all__ = ['TaskGauge', 'MultiTaskGauge', 'TaskUpdateFeed']
+
+
+class TaskUpdateFeed(object):
+    # Task properties being tracked by the feed
+    PATH_SET = ['info.state', 'info.progress', 'info.error', 'info.entityName']
+
+    def __init__(self, tasks, max_wait=30):
+        """
+        A feed of updates for the state and progress of tasks
+
+        Creates a dedicated property collector with a filter for
+        the given tasks. Updates are received by waiting on the
+        collector with WaitForUpdatesEx(), so no requests are being
+        made while the tasks are not changing.
+
+        Args:
+            tasks     (list): A list of vim.Task instances
+            max_wait   (int): Max number of seconds to wait for updates
+
+        """
+        self.tasks = []
+        self.max_wait = max_wait
+        self.version = ''
+        self.info = {}
+
+        pc = pyVmomi.vmodl.query.PropertyCollector(
+            'propertyCollector',
+            tasks[0]._stub
+        )
+        self.collector = pc.CreatePropertyCollector()
+        self.add(tasks)
+
+    def add(self, tasks):
+        """
+        Add tasks to the feed
+
+        Args:
+            tasks (list): A list of vim.Task instances
+
+        """
+        self.tasks.extend(tasks)
+        for task in tasks:
+            self.info[task._moId] = {}
+
+        obj_set = [
+            pyVmomi.vmodl.query.PropertyCollector.ObjectSpec(obj=task, skip=False)
+            for task in tasks
+        ]
+        property_spec = pyVmomi.vmodl.query.PropertyCollector.PropertySpec(
+            type=pyVmomi.vim.Task,
+            pathSet=self.PATH_SET
+        )
+        filter_spec = pyVmomi.vmodl.query.PropertyCollector.FilterSpec(
+            objectSet=obj_set,
+            propSet=[property_spec]
+        )
+        self.collector.CreateFilter(spec=filter_spec, partialUpdates=True)
+
+    def wait(self):
+        """
+        Wait for the next update of the tasks
+
+        Returns:
+            A list of the tasks which have changed, or an empty
+            list if no updates arrived within the max wait time
+
+        """
+        update = self.collector.WaitForUpdatesEx(
+            version=self.version,
+            options=pyVmomi.vmodl.query.PropertyCollector.WaitOptions(
+                maxWaitSeconds=self.max_wait
+            )
+        )
+
+        if update is None:
+            return []
+
+        self.version = update.version
+        changed = []
+        for filter_update in update.filterSet:
+            for object_update in filter_update.objectSet:
+                info = self.info[object_update.obj._moId]
+                for change in object_update.changeSet:
+                    info[change.name] = change.val
+                changed.append(object_update.obj)
 
-__all__ = ['TaskGauge']
+        return changed
+
+    def state(self, task):
+        return self.info[task._moId].get('info.state')
+
+    def entity_name(self, task):
+        return self.info[task._moId].get('info.entityName')
+
+    def progress(self, task):
+        return self.info[task._moId].get('info.progress') or 0
+
+    def error(self, task):
+        return self.info[task._moId].get('info.error')
+
+    def is_done(self, task):
+        """
+        Returns True if the task has completed, either successfully or not
+
+        """
+        return self.state(task) in (
+            pyVmomi.vim.TaskInfoState.success,
+            pyVmomi.vim.TaskInfoState.error
+        )
+
+    def destroy(self):
+        """
+        Destroy the property collector used by the feed
+
+        """
+        self.collector.DestroyPropertyCollector()
 
 
 class TaskGauge(object):
-    def __init__(self, dialog, task, interval=0.5, **kwargs):
+    def __init__(self, dialog, task, max_wait=30, **kwargs):
         """
         A gauge for displaying progress of a task
 
+        The gauge is redrawn only when the task progress changes.
+
         Args:
            dialog   (dialog.Dialog): A Dialog instance
            task          (vim.Task): A Task instance
-           interval         (float): Check task state each 'interval' seconds
+           max_wait           (int): Max number of seconds to wait for task updates
            kwargs            (dict): Additional args to be passed to dialog(1)
 
         """
         self.dialog = dialog
         self.task = task
-        self.interval = interval
+        self.max_wait = max_wait
         self.kwargs = kwargs
 
     def display(self):
         """
-        docstring
+        Display the gauge until the task completes
 
         """
         self.dialog.gauge_start(
             **self.kwargs
         )
 
-        while True:
-            if self.task.info.state in (pyVmomi.vim.TaskInfoState.queued, pyVmomi.vim.TaskInfoState.running):
-                progress = self.task.info.progress if self.task.info.progress else 0
-                self.dialog.gauge_update(progress)
-            elif self.task.info.state == pyVmomi.vim.TaskInfoState.success:
-                break
-            elif self.task.info.state == pyVmomi.vim.TaskInfoState.error:
-                self.dialog.msgbox(
-                    title='Task Error',
-                    text=self.task.info.error.msg
-                )
-                break
-            sleep(self.interval)
+        feed = TaskUpdateFeed(tasks=[self.task], max_wait=self.max_wait)
+        progress = None
+
+        try:
+            while True:
+                feed.wait()
+                state = feed.state(self.task)
+
+                if state in (pyVmomi.vim.TaskInfoState.queued, pyVmomi.vim.TaskInfoState.running):
+                    if feed.progress(self.task) != progress:
+                        progress = feed.progress(self.task)
+                        self.dialog.gauge_update(progress)
+                elif state == pyVmomi.vim.TaskInfoState.success:
+                    break
+                elif state == pyVmomi.vim.TaskInfoState.error:
+                    self.dialog.msgbox(
+                        title='Task Error',
+                        text=feed.error(self.task).msg
+                    )
+                    break
+        finally:
+            feed.destroy()
 
         self.dialog.gauge_stop()
+
+
+class MultiTaskGauge(object):
+    # Status values understood by dialog(1) mixed gauges
+    STATUS_SUCCEEDED = 0
+    STATUS_FAILED = 1
+    STATUS_IN_PROGRESS = 7
+
+    def __init__(self, dialog, tasks, labels=None, max_concurrent=0,
+                 max_elements=20, redraw_interval=1.0, max_wait=30, **kwargs):
+        """
+        A mixed gauge for displaying progress of multiple tasks
+
+        All tasks are tracked through a single TaskUpdateFeed.
+
+        Tasks may also be given as callables, which start a task
+        and return it. Callables are called as slots become
+        available, so that no more than 'max_concurrent' tasks are
+        running at a time.
+
+        Args:
+           dialog   (dialog.Dialog): A Dialog instance
+           tasks             (list): A list of vim.Task instances or callables
+                                     returning a vim.Task instance
+           labels            (list): Labels of the tasks. If not specified the
+                                     name of the task entity is used instead
+           max_concurrent     (int): Max number of tasks started by callables
+                                     running at a time, 0 means no limit
+           max_elements       (int): Max number of tasks shown at once
+           redraw_interval  (float): Min number of seconds between redraws
+           max_wait           (int): Max number of seconds to wait for task updates
+           kwargs            (dict): Additional args to be passed to dialog(1)
+
+        """
+        self.dialog = dialog
+        self.jobs = list(tasks)
+        self.labels = labels if labels else [None] * len(self.jobs)
+        self.max_concurrent = max_concurrent
+        self.max_elements = max_elements
+        self.redraw_interval = redraw_interval
+        self.max_wait = max_wait
+        self.kwargs = kwargs
+
+        self.tasks = [None] * len(self.jobs)
+        self.errors = [None] * len(self.jobs)
+        self.feed = None
+        self._next = 0
+
+    def label(self, index):
+        if self.labels[index]:
+            return self.labels[index]
+
+        task = self.tasks[index]
+        if task is not None and self.feed is not None:
+            return self.feed.entity_name(task) or task._moId
+
+        return 'Task {}'.format(index + 1)
+
+    def running(self):
+        """
+        Returns the number of started tasks which are not done yet
+
+        """
+        return sum(
+            1 for task in self.tasks
+            if task is not None and not self.feed.is_done(task)
+        )
+
+    def start_tasks(self):
+        """
+        Start pending tasks while there are available slots
+
+        """
+        started = []
+        running = self.running() if self.feed else 0
+
+        while self._next < len(self.jobs):
+            if self.max_concurrent and running >= self.max_concurrent:
+                break
+
+            index = self._next
+            self._next += 1
+            job = self.jobs[index]
+
+            try:
+                task = job() if callable(job) else job
+            except pyVmomi.vmodl.MethodFault as e:
+                self.errors[index] = e
+                continue
+
+            self.tasks[index] = task
+            started.append(task)
+            running += 1
+
+        if not started:
+            return
+
+        if self.feed is None:
+            self.feed = TaskUpdateFeed(tasks=started, max_wait=self.max_wait)
+        else:
+            self.feed.add(started)
+
+    def status(self, index):
+        """
+        Get the status of a task as a dialog(1) mixed gauge value
+
+        """
+        task = self.tasks[index]
+        if self.errors[index] is not None:
+            return self.STATUS_FAILED
+        if task is None:
+            return 'Pending'
+
+        state = self.feed.state(task)
+        if state == pyVmomi.vim.TaskInfoState.success:
+            return self.STATUS_SUCCEEDED
+        elif state == pyVmomi.vim.TaskInfoState.error:
+            return self.STATUS_FAILED
+        elif state == pyVmomi.vim.TaskInfoState.running and self.feed.progress(task):
+            return -self.feed.progress(task)
+        elif state == pyVmomi.vim.TaskInfoState.running:
+            return self.STATUS_IN_PROGRESS
+
+        return 'Queued'
+
+    def is_done(self, index):
+        if self.errors[index] is not None:
+            return True
+
+        task = self.tasks[index]
+        return task is not None and self.feed.is_done(task)
+
+    def redraw(self):
+        """
+        Redraw the mixed gauge
+
+        Running tasks are shown first followed by failed, pending
+        and succeeded tasks, up to 'max_elements' tasks.
+
+        """
+        statuses = [self.status(index) for index in range(len(self.jobs))]
+
+        def order(index):
+            status = statuses[index]
+            if status == self.STATUS_SUCCEEDED:
+                return 3
+            if status == self.STATUS_FAILED:
+                return 1
+            if status in ('Pending', 'Queued'):
+                return 2
+            return 0
+
+        shown = sorted(range(len(self.jobs)), key=order)[:self.max_elements]
+        elements = [(self.label(index), statuses[index]) for index in shown]
+
+        succeeded = statuses.count(self.STATUS_SUCCEEDED)
+        failed = statuses.count(self.STATUS_FAILED)
+        pending = sum(1 for status in statuses if status in ('Pending', 'Queued'))
+        running = len(statuses) - succeeded - failed - pending
+
+        total = 0
+        for index, status in enumerate(statuses):
+            if self.is_done(index):
+                total += 100
+            elif isinstance(status, int) and status < 0:
+                total += -status
+        percent = total // len(statuses) if statuses else 100
+
+        text = '{} tasks: {} running, {} pending, {} succeeded, {} failed'.format(
+            len(statuses), running, pending, succeeded, failed
+        )
+
+        self.dialog.mixedgauge(
+            text=text,
+            percent=percent,
+            elements=elements,
+            **self.kwargs
+        )
+
+    def display(self):
+        """
+        Display the gauge until all tasks complete
+
+        Returns:
+            A list of (label, error) tuples for each task, where error
+            is None if the task completed successfully, otherwise it
+            is a vmodl.MethodFault instance
+
+        """
+        if not self.jobs:
+            return []
+
+        self.start_tasks()
+        try:
+            self.redraw()
+            while not all(self.is_done(index) for index in range(len(self.jobs))):
+                last_redraw = time.time()
+                if self.feed is not None and self.running():
+                    changed = self.feed.wait()
+                else:
+                    changed = []
+
+                self.start_tasks()
+                if changed or self.feed is None or not self.running():
+                    self.redraw()
+                    # Let updates pile up between redraws, so that
+                    # they are received at once by the next wait
+                    delay = self.redraw_interval - (time.time() - last_redraw)
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            if self.feed is not None:
+                self.feed.destroy()
+
+        results = []
+        for index in range(len(self.jobs)):
+            error = self.errors[index]
+            task = self.tasks[index]
+            if error is None and self.feed.state(task) == pyVmomi.vim.TaskInfoState.error:
+                error = self.feed.error(task)
+            results.append((self.label(index), error))
+
+        return results
@@ -35,22 +35,37 @@ __all__ = ['HomeWidget']
 
 
 class HomeWidget(object):
-    def __init__(self, agent, dialog):
+    def __init__(self, agent, dialog, pool=None):
         """
         Home widget
 
         Args:
-            agent (VConnector): A VConnector instance
-            dialog    (Dialog): A Dialog instance
+            agent     (VConnector): A VConnector instance
+            dialog        (Dialog): A Dialog instance
+            pool       (AgentPool): A pool of all connected agents
 
         """
         self.agent = agent
         self.dialog = dialog
+        self.pool = pool
 
     def display(self):
+        if self.pool is not None and len(self.pool) > 1:
+            self.pool_menu()
+            return
+
         self.warn_if_not_vcenter()
         self.show_motd()
+        self.home_menu(title='Home', cancel_label='Logout')
+
+    def home_menu(self, **kwargs):
+        """
+        Home menu of a single vSphere host
+
+        Args:
+            kwargs (dict): Additional args to be passed to dialog(1)
 
+        """
         items = [
             pvc.widget.menu.MenuItem(
                 tag='Inventory',
@@ -66,6 +81,34 @@ class HomeWidget(object):
             ),
         ]
 
+        menu = pvc.widget.menu.Menu(
+            items=items,
+            dialog=self.dialog,
+            text='Select an item from the menu',
+            **kwargs
+        )
+
+        menu.display()
+
+    def pool_menu(self):
+        """
+        Home menu when connected to multiple vSphere hosts
+
+        """
+        items = [
+            pvc.widget.menu.MenuItem(
+                tag='Inventory',
+                description='Inventory of all vSphere hosts',
+                on_select=pvc.widget.inventory.AggregatedInventoryWidget,
+                on_select_args=(self.pool, self.dialog)
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='vSphere Hosts',
+                description='Manage a single vSphere host',
+                on_select=self.agent_menu
+            ),
+        ]
+
         menu = pvc.widget.menu.Menu(
             items=items,
             dialog=self.dialog,
@@ -76,6 +119,29 @@ class HomeWidget(object):
 
         menu.display()
 
+    def agent_menu(self):
+        """
+        Menu of the connected vSphere hosts
+
+        """
+        items = [
+            pvc.widget.menu.MenuItem(
+                tag=agent.host,
+                description=agent.si.content.about.fullName,
+                on_select=HomeWidget(agent, self.dialog).home_menu,
+                on_select_kwargs={'title': agent.host}
+            ) for agent in self.pool
+        ]
+
+        menu = pvc.widget.menu.Menu(
+            items=items,
+            dialog=self.dialog,
+            title='vSphere Hosts',
+            text='Select a vSphere host to manage'
+        )
+
+        menu.display()
+
     def warn_if_not_vcenter(self):
         about = self.agent.si.content.about
 
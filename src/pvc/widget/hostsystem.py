@@ -260,12 +260,30 @@ class HostSystemVirtualMachineWidget(object):
                 on_select=pvc.widget.virtualmachine.CreateVirtualMachineWidget,
                 on_select_args=(self.agent, self.dialog, self.obj.parent.parent.parent, self.obj.parent, self.obj)
             ),
+            pvc.widget.menu.MenuItem(
+                tag='Deploy',
+                description='Deploy Virtual Machine from OVF/OVA template',
+                on_select=pvc.widget.virtualmachine.VirtualMachineImportWidget,
+                on_select_args=(self.agent, self.dialog, self.obj.parent.parent.parent, self.obj.parent, self.obj)
+            ),
             pvc.widget.menu.MenuItem(
                 tag='View',
                 description='View Virtual Machines on host',
                 on_select=pvc.widget.common.virtual_machine_menu,
                 on_select_args=(self.agent, self.dialog, self.obj)
             ),
+            pvc.widget.menu.MenuItem(
+                tag='Power',
+                description='Power operations on multiple Virtual Machines',
+                on_select=pvc.widget.virtualmachine.VirtualMachineBulkPowerWidget,
+                on_select_args=(self.agent, self.dialog, self.obj)
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Export',
+                description='Export multiple Virtual Machines',
+                on_select=pvc.widget.virtualmachine.VirtualMachineExportQueueWidget,
+                on_select_args=(self.agent, self.dialog, self.obj)
+            ),
         ]
 
         menu = pvc.widget.menu.Menu(
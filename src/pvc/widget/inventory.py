@@ -29,18 +29,22 @@ Inventory Widgets
 
 import pyVmomi
 
+import pvc.widget.cluster
 import pvc.widget.common
+import pvc.widget.datacenter
 import pvc.widget.menu
 import pvc.widget.datastore
 import pvc.widget.hostsystem
 import pvc.widget.network
+import pvc.widget.pool
 import pvc.widget.radiolist
+import pvc.widget.store
 import pvc.widget.virtualmachine
 
 __all__ = [
     'InventoryWidget', 'InventorySearchWidget',
     'InventorySearchHostWidget', 'InventorySearchVirtualMachineWidget',
-    'InventoryDatacenterWidget',
+    'InventoryDatacenterWidget', 'AggregatedInventoryWidget',
 ]
 
 
@@ -114,23 +118,20 @@ class InventoryWidget(object):
             text='Retrieving information ...'
         )
 
-        view = self.agent.get_host_view()
-        properties = self.agent.collect_properties(
-            view_ref=view,
+        store = pvc.widget.common.inventory_store(
+            agent=self.agent,
             obj_type=pyVmomi.vim.HostSystem,
-            path_set=['name', 'runtime.connectionState'],
-            include_mors=True
+            path_set=['name', 'runtime.connectionState']
         )
-        view.DestroyView()
 
-        items = [
-            pvc.widget.menu.MenuItem(
-                tag=host['name'],
+        items = store.items(
+            lambda host: pvc.widget.menu.MenuItem(
+                tag=host.tag,
                 description=host['runtime.connectionState'],
                 on_select=pvc.widget.hostsystem.HostSystemWidget,
-                on_select_args=(self.agent, self.dialog, host['obj'])
-            ) for host in properties
-        ]
+                on_select_args=(self.agent, self.dialog, host.obj)
+            )
+        )
 
         menu = pvc.widget.menu.Menu(
             items=items,
@@ -146,23 +147,20 @@ class InventoryWidget(object):
             text='Retrieving information ...'
         )
 
-        view = self.agent.get_datastore_view()
-        properties = self.agent.collect_properties(
-            view_ref=view,
+        store = pvc.widget.common.inventory_store(
+            agent=self.agent,
             obj_type=pyVmomi.vim.Datastore,
-            path_set=['name', 'summary.accessible'],
-            include_mors=True
+            path_set=['name', 'summary.accessible']
         )
-        view.DestroyView()
 
-        items = [
-            pvc.widget.menu.MenuItem(
-                tag=ds['name'],
+        items = store.items(
+            lambda ds: pvc.widget.menu.MenuItem(
+                tag=ds.tag,
                 description='Accessible' if ds['summary.accessible'] else 'Not Accessible',
                 on_select=pvc.widget.datastore.DatastoreWidget,
-                on_select_args=(self.agent, self.dialog, ds['obj'])
-            ) for ds in properties
-        ]
+                on_select_args=(self.agent, self.dialog, ds.obj)
+            )
+        )
 
         menu = pvc.widget.menu.Menu(
             items=items,
@@ -178,23 +176,29 @@ class InventoryWidget(object):
             text='Retrieving information ...'
         )
 
-        view = self.agent.get_vm_view()
-        properties = self.agent.collect_properties(
-            view_ref=view,
+        path_set = ['name', 'runtime.powerState']
+        pages = pvc.widget.common.iter_inventory_properties(
+            agent=self.agent,
             obj_type=pyVmomi.vim.VirtualMachine,
-            path_set=['name', 'runtime.powerState'],
-            include_mors=True
+            path_set=path_set
         )
-        view.DestroyView()
 
-        items = [
-            pvc.widget.menu.MenuItem(
-                tag=vm['name'],
+        # Fill the store page by page as results arrive
+        store = pvc.widget.store.InventoryStore(path_set=path_set)
+        for page in pages:
+            store.extend(page)
+            self.dialog.infobox(
+                text='Retrieving information ... ({} objects)'.format(len(store))
+            )
+
+        items = store.items(
+            lambda vm: pvc.widget.menu.MenuItem(
+                tag=vm.tag,
                 description=vm['runtime.powerState'],
                 on_select=pvc.widget.virtualmachine.VirtualMachineWidget,
-                on_select_args=(self.agent, self.dialog, vm['obj'])
-            ) for vm in properties
-        ]
+                on_select_args=(self.agent, self.dialog, vm.obj)
+            )
+        )
 
         menu = pvc.widget.menu.Menu(
             items=items,
@@ -210,26 +214,20 @@ class InventoryWidget(object):
             text='Retrieving information ...'
         )
 
-        view = self.agent.get_container_view(
-            obj_type=[pyVmomi.vim.Network]
-        )
-
-        properties = self.agent.collect_properties(
-            view_ref=view,
+        store = pvc.widget.common.inventory_store(
+            agent=self.agent,
             obj_type=pyVmomi.vim.Network,
-            path_set=['name', 'summary.accessible'],
-            include_mors=True
+            path_set=['name', 'summary.accessible']
         )
-        view.DestroyView()
 
-        items = [
-            pvc.widget.menu.MenuItem(
-                tag=network['name'],
+        items = store.items(
+            lambda network: pvc.widget.menu.MenuItem(
+                tag=network.tag,
                 description='Accessible' if network['summary.accessible'] else 'Not Accessible',
                 on_select=pvc.widget.network.NetworkWidget,
-                on_select_args=(self.agent, self.dialog, network['obj'])
-            ) for network in properties
-        ]
+                on_select_args=(self.agent, self.dialog, network.obj)
+            )
+        )
 
         menu = pvc.widget.menu.Menu(
             items=items,
@@ -726,3 +724,178 @@ class InventoryDatacenterWidget(object):
                 title='Error',
                 text=e.msg
             )
+
+
+class AggregatedInventoryWidget(object):
+    def __init__(self, pool, dialog):
+        """
+        Inventory widget for all agents in a pool
+
+        Inventory menus query all vSphere hosts concurrently
+        and display the merged results.
+
+        Args:
+            pool (AgentPool): An AgentPool instance
+            dialog  (Dialog): A Dialog instance
+
+        """
+        self.pool = pool
+        self.dialog = dialog
+        self.display()
+
+    def display(self):
+        items = [
+            pvc.widget.menu.MenuItem(
+                tag='Datacenters',
+                description='Datacenters on all vSphere hosts',
+                on_select=self.entity_menu,
+                on_select_args=(
+                    pyVmomi.vim.Datacenter,
+                    'overallStatus',
+                    pvc.widget.datacenter.DatacenterWidget,
+                    'Datacenters'
+                )
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Clusters',
+                description='Clusters on all vSphere hosts',
+                on_select=self.entity_menu,
+                on_select_args=(
+                    pyVmomi.vim.ClusterComputeResource,
+                    'overallStatus',
+                    pvc.widget.cluster.ClusterWidget,
+                    'Clusters'
+                )
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Hosts',
+                description='Hosts on all vSphere hosts',
+                on_select=self.entity_menu,
+                on_select_args=(
+                    pyVmomi.vim.HostSystem,
+                    'runtime.connectionState',
+                    pvc.widget.hostsystem.HostSystemWidget,
+                    'Hosts'
+                )
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='VMs & Templates',
+                description='VMs & Templates on all vSphere hosts',
+                on_select=self.entity_menu,
+                on_select_args=(
+                    pyVmomi.vim.VirtualMachine,
+                    'runtime.powerState',
+                    pvc.widget.virtualmachine.VirtualMachineWidget,
+                    'Virtual Machines'
+                )
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Datastores',
+                description='Datastores on all vSphere hosts',
+                on_select=self.entity_menu,
+                on_select_args=(
+                    pyVmomi.vim.Datastore,
+                    'summary.accessible',
+                    pvc.widget.datastore.DatastoreWidget,
+                    'Datastores'
+                )
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Networking',
+                description='Networks on all vSphere hosts',
+                on_select=self.entity_menu,
+                on_select_args=(
+                    pyVmomi.vim.Network,
+                    'summary.accessible',
+                    pvc.widget.network.NetworkWidget,
+                    'Networks'
+                )
+            ),
+        ]
+
+        menu = pvc.widget.menu.Menu(
+            items=items,
+            dialog=self.dialog,
+            title='Inventory Menu',
+            text='Select an item from the inventory of all vSphere hosts'
+        )
+
+        menu.display()
+
+    def entity_menu(self, obj_type, status_path, widget, title):
+        """
+        Display a merged menu of managed entities from all agents
+
+        Args:
+            obj_type  (pyVmomi.vim.*): Type of managed object
+            status_path         (str): Property used as the item description
+            widget         (callable): Widget to display for a selected entity
+            title               (str): Title of the menu
+
+        """
+        self.dialog.infobox(
+            text='Retrieving information from {} vSphere hosts ...'.format(len(self.pool))
+        )
+
+        results = self.pool.map(
+            pvc.widget.common.inventory_store,
+            obj_type=obj_type,
+            path_set=['name', status_path]
+        )
+
+        errors = [
+            '{}: {}'.format(agent.host, getattr(e, 'msg', e))
+            for agent, _, e in results if e is not None
+        ]
+        if errors:
+            self.dialog.msgbox(
+                title='Error',
+                text='Failed to retrieve information from:\n\n{}\n'.format('\n'.join(errors))
+            )
+
+        items = pvc.widget.pool.ChainedItems([
+            store.items(self.item_factory(agent, status_path, widget), prefix='{}/'.format(agent.host))
+            for agent, store, e in results if e is None
+        ])
+
+        if not items:
+            self.dialog.msgbox(
+                title=title,
+                text='No objects found'
+            )
+            return
+
+        menu = pvc.widget.menu.Menu(
+            items=items,
+            dialog=self.dialog,
+            title=title,
+            text='Select an item from the menu'
+        )
+
+        menu.display()
+
+    def item_factory(self, agent, status_path, widget):
+        """
+        Create a factory of menu items for the store rows of an agent
+
+        Args:
+            agent (VConnector): The agent from which rows were retrieved
+            status_path  (str): Property used as the item description
+            widget  (callable): Widget to display for a selected entity
+
+        Returns:
+            A callable which creates a MenuItem from an InventoryRow
+
+        """
+        def describe(row):
+            value = row[status_path]
+            if status_path == 'summary.accessible':
+                return 'Accessible' if value else 'Not Accessible'
+            return value
+
+        return lambda row: pvc.widget.menu.MenuItem(
+            tag='{}/{}'.format(agent.host, row.tag),
+            description=describe(row),
+            on_select=widget,
+            on_select_args=(agent, self.dialog, row.obj)
+        )
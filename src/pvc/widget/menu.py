@@ -27,7 +27,36 @@ Menu Widgets
 
 """
 
-__all__ = ['Menu', 'MenuItem']
+from bisect import bisect_left
+
+import pvc.widget.environ
+
+__all__ = ['Menu', 'MenuItem', 'MenuIndex', 'item_tags']
+
+# Max number of choices passed to dialog(1) at once, can be
+# overriden by the PVC_MENU_PAGE_SIZE environment variable
+DEFAULT_PAGE_SIZE = pvc.widget.environ.getint('PVC_MENU_PAGE_SIZE', 500)
+
+
+def item_tags(items):
+    """
+    Get the tags of a sequence of items
+
+    Sequences which create their items on demand, e.g.
+    InventoryItems provide the tags through a tags() method,
+    so that the items do not have to be created.
+
+    Args:
+        items (list): A sequence of items
+
+    Returns:
+        A list of the item tags
+
+    """
+    if hasattr(items, 'tags'):
+        return items.tags()
+
+    return [item.tag for item in items]
 
 
 class MenuItem(object):
@@ -55,38 +84,255 @@ class MenuItem(object):
         return self.on_select(*self.on_select_args, **self.on_select_kwargs)
 
 
+class MenuIndex(object):
+    def __init__(self, tags):
+        """
+        Prefix and substring index of menu choices
+
+        Filters shorter than three characters are matched against
+        the beginning of the choice tags using a sorted list of
+        the tags. Longer filters are matched anywhere in the tags
+        using an index of the tag trigrams.
+
+        Args:
+            tags (list): The tags of the choices
+
+        """
+        self._tags = [tag.lower() for tag in tags]
+        self._sorted = sorted((tag, index) for index, tag in enumerate(self._tags))
+        self._trigrams = {}
+
+        for index, tag in enumerate(self._tags):
+            for i in range(len(tag) - 2):
+                self._trigrams.setdefault(tag[i:i+3], set()).add(index)
+
+    def prefix(self, text):
+        """
+        Find the choices which tags start with the given text
+
+        Args:
+            text (str): Text to search for
+
+        Returns:
+            A sorted list of the matching choice indexes
+
+        """
+        text = text.lower()
+        result = []
+        for tag, index in self._sorted[bisect_left(self._sorted, (text, -1)):]:
+            if not tag.startswith(text):
+                break
+            result.append(index)
+
+        return sorted(result)
+
+    def search(self, text):
+        """
+        Find the choices which tags contain the given text
+
+        Args:
+            text (str): Text to search for
+
+        Returns:
+            A sorted list of the matching choice indexes
+
+        """
+        text = text.lower()
+        if len(text) < 3:
+            return self.prefix(text)
+
+        trigrams = [text[i:i+3] for i in range(len(text) - 2)]
+        candidates = set(self._trigrams.get(trigrams[0], ()))
+        for trigram in trigrams[1:]:
+            candidates &= self._trigrams.get(trigram, set())
+            if not candidates:
+                break
+
+        return sorted(index for index in candidates if text in self._tags[index])
+
+
 class Menu(object):
-    def __init__(self, items, dialog, return_selected=False, **kwargs):
+    FILTER_TAG = '[Filter]'
+    PREVIOUS_TAG = '[Previous]'
+    NEXT_TAG = '[Next]'
+
+    def __init__(self, items, dialog, return_selected=False, page_size=DEFAULT_PAGE_SIZE,
+                 on_extra=None, extra_label='Extra', **kwargs):
         """
         Menu class
 
+        Menus with more than 'page_size' items are displayed one page
+        at a time and provide choices for moving between pages and
+        for filtering the items by their tags, so that dialog(1)
+        never receives more than 'page_size' item choices at once.
+        Only the items of the displayed page are accessed, so items
+        created on demand, e.g. from an inventory store are not
+        created for every row.
+
         Args:
-            items                    (list): A list of MenuItem instances
+            items                    (list): A sequence of MenuItem instances
             dialog          (dialog.Dialog): A Dialog instance
             return_selected          (bool): If True them just return the selected item
+            page_size                 (int): Max number of items displayed at once
+            on_extra             (callable): If specified an extra button is displayed,
+                                             which executes the callable when pressed
+            extra_label               (str): Label of the extra button
             kwargs                   (dict): Additional args to be passed to dialog(1)
 
         """
         self.items = items
         self.dialog = dialog
         self.return_selected = return_selected
+        self.page_size = page_size
+        self.on_extra = on_extra
+        self.extra_label = extra_label
         self.kwargs = kwargs
-        self.choices = [(item.tag, item.description) for item in self.items]
-        self._registry = {item.tag: item for item in items}
+        self._displayed = {}
+        self._index = None
+        self._filter = ''
+        self._matches = None
+        self._page = 0
+
+    def paginated(self):
+        """
+        Returns True if choices are displayed one page at a time
+
+        """
+        return len(self.items) > self.page_size or bool(self._filter)
+
+    def set_filter(self, text):
+        """
+        Restrict the displayed choices to the ones matching a filter
+
+        Args:
+            text (str): Text to search for in the tags. An empty
+                        text removes the current filter
+
+        """
+        self._filter = text
+        self._page = 0
+
+        if not text:
+            self._matches = None
+            return
+
+        if self._index is None:
+            self._index = MenuIndex(item_tags(self.items))
+
+        self._matches = self._index.search(text)
+
+    def page_choices(self):
+        """
+        Get the choices and text to display for the current page
+
+        Returns:
+            A tuple of the choices and the text to display
+
+        """
+        text = self.kwargs.get('text', '')
+        if not self.paginated():
+            return self.display_choices(range(len(self.items))), text
+
+        if self._matches is None:
+            total = len(self.items)
+        else:
+            total = len(self._matches)
+
+        pages = max(1, (total + self.page_size - 1) // self.page_size)
+        self._page = min(self._page, pages - 1)
+        start = self._page * self.page_size
+        end = min(start + self.page_size, total)
+
+        if self._matches is None:
+            choices = self.display_choices(range(start, end))
+        else:
+            choices = self.display_choices(self._matches[start:end])
+
+        navigation = [(self.FILTER_TAG, 'Filter items by tag')]
+        if self._page > 0:
+            navigation.append((self.PREVIOUS_TAG, 'Previous page'))
+        choices = navigation + choices
+        if self._page < pages - 1:
+            choices.append((self.NEXT_TAG, 'Next page'))
+
+        info = 'Items {}-{} of {}'.format(start + 1 if total else 0, end, total)
+        if self._filter:
+            info += " matching '{}'".format(self._filter)
+        text = '{}\n\n{}'.format(text, info) if text else info
+
+        return choices, text
+
+    def display_choices(self, indexes):
+        """
+        Get the choices for the items which are displayed
+
+        Args:
+            indexes (iterable): Indexes of the displayed items
+
+        Returns:
+            A list of (tag, description) tuples
+
+        """
+        self._displayed = {}
+        choices = []
+        for index in indexes:
+            item = self.items[index]
+            self._displayed[item.tag] = item
+            choices.append((item.tag, item.description))
+
+        return choices
+
+    def prompt_filter(self):
+        """
+        Prompts the user for a filter
+
+        """
+        code, text = self.dialog.inputbox(
+            title='Filter',
+            text='Display items which tags contain the given text.\n'
+                 'Leave empty in order to display all items.',
+            init=self._filter
+        )
+
+        if code in (self.dialog.CANCEL, self.dialog.ESC):
+            return
+
+        self.set_filter(text.strip())
 
     def display(self):
         default_item = ''
+        kwargs = {k: v for k, v in self.kwargs.items() if k != 'text'}
+        if self.on_extra:
+            kwargs['extra_button'] = True
+            kwargs['extra_label'] = self.extra_label
+
         while True:
+            choices, text = self.page_choices()
             code, tag = self.dialog.menu(
-                choices=self.choices,
+                choices=choices,
                 default_item=default_item,
-                **self.kwargs
+                text=text,
+                **kwargs
             )
 
             if code in (self.dialog.CANCEL, self.dialog.ESC):
                 return code
 
-            item = self._registry.get(tag)
+            if code == self.dialog.EXTRA:
+                self.on_extra()
+                continue
+
+            if self.paginated() and tag in (self.FILTER_TAG, self.PREVIOUS_TAG, self.NEXT_TAG):
+                if tag == self.FILTER_TAG:
+                    self.prompt_filter()
+                elif tag == self.PREVIOUS_TAG:
+                    self._page -= 1
+                else:
+                    self._page += 1
+                default_item = ''
+                continue
+
+            item = self._displayed[tag]
             default_item = tag
 
             if self.return_selected:
@@ -0,0 +1,1164 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+OVF Module
+
+"""
+
+import os
+import time
+import hashlib
+import tarfile
+import threading
+import functools
+import itertools
+import collections
+import multiprocessing
+import concurrent.futures
+
+import pyVmomi
+import requests
+
+import pvc.widget.environ
+import pvc.widget.transfer
+
+__all__ = [
+    'OvfExport', 'OvfImport', 'OvfPackage', 'OvaWriter',
+    'ExportJob', 'ExportQueue', 'export_jobs'
+]
+
+# Hash algorithms supported in manifests of OVF templates
+MANIFEST_HASHES = ('sha1', 'sha256', 'sha512')
+
+# Hash algorithm used in the manifest of exported templates
+DEFAULT_MANIFEST_HASH = pvc.widget.environ.getchoice('PVC_MANIFEST_HASH', 'sha1', MANIFEST_HASHES)
+
+# Limits of the export queue
+DEFAULT_EXPORT_JOBS = pvc.widget.environ.getint('PVC_EXPORT_JOBS', 2)
+DEFAULT_EXPORT_JOBS_PER_DATASTORE = pvc.widget.environ.getint('PVC_EXPORT_JOBS_PER_DATASTORE', 1)
+DEFAULT_EXPORT_JOBS_PER_HOST = pvc.widget.environ.getint('PVC_EXPORT_JOBS_PER_HOST', 2)
+DEFAULT_EXPORT_BANDWIDTH = pvc.widget.environ.getint('PVC_EXPORT_BANDWIDTH', 0, minimum=0) * 1024 * 1024
+
+
+def abort_lease(lease):
+    """
+    Abort an HttpNfcLease after a failed transfer
+
+    Errors while aborting the lease, e.g. because the lease has
+    already failed or timed out are ignored, so that they do not
+    hide the error which caused the transfer to fail.
+
+    Args:
+        lease (vim.HttpNfcLease): The lease to abort
+
+    """
+    try:
+        lease.HttpNfcLeaseAbort()
+    except (pyVmomi.vmodl.MethodFault, requests.RequestException):
+        pass
+
+
+def wait_for_lease(lease):
+    """
+    Wait for an HttpNfcLease to become ready
+
+    Args:
+        lease (vim.HttpNfcLease): The lease to wait for
+
+    Raises:
+        vmodl.MethodFault if the lease could not be acquired
+
+    """
+    while True:
+        if lease.state == pyVmomi.vim.HttpNfcLeaseState.initializing:
+            lease.HttpNfcLeaseProgress(percent=0)
+        elif lease.state == pyVmomi.vim.HttpNfcLeaseState.error:
+            error = lease.error
+            abort_lease(lease)
+            raise error
+        elif lease.state == pyVmomi.vim.HttpNfcLeaseState.ready:
+            return
+        time.sleep(0.5)
+
+
+class OvfExport(object):
+    def __init__(self, agent, obj, path, create_ova=False,
+                 workers=pvc.widget.transfer.DEFAULT_WORKERS,
+                 manifest_hash=DEFAULT_MANIFEST_HASH, verify_retries=2, sparse=True,
+                 compress=False, throttle=None):
+        """
+        Export of a Virtual Machine into an OVF/OVA template
+
+        Disks are downloaded concurrently over a pool of HTTP
+        connections. Disks served with a known size are split into
+        byte ranges fetched in parallel, which are resumed if the
+        export is started again after a failure.
+
+        Digests of the disks are computed while they are downloaded
+        and verified against the manifest of the export lease. Disks
+        which do not match the manifest are downloaded again.
+
+        Args:
+            agent          (VConnector): A VConnector instance
+            obj    (vim.VirtualMachine): A VirtualMachine managed entity
+            path                  (str): Directory to save the OVF/OVA template
+            create_ova           (bool): If True then export VM into a single OVA file
+                                         Otherwise create a folder of files (OVF)
+            workers               (int): Max number of concurrent HTTP requests
+            manifest_hash         (str): Hash algorithm used in the manifest,
+                                         one of MANIFEST_HASHES
+            verify_retries        (int): Max number of times to download again
+                                         disks failing verification
+            sparse               (bool): If True then blocks of zeros are not
+                                         written, leaving holes in the files
+            compress             (bool): If True then compress the disks with gzip
+                                         using a pool of processes
+            throttle      (TokenBucket): Limits the download bandwidth
+
+        """
+        self.agent = agent
+        self.obj = obj
+        self.path = path
+        self.create_ova = create_ova
+        self.workers = workers
+        self.manifest_hash = manifest_hash
+        self.verify_retries = verify_retries
+        self.sparse = sparse
+        self.compress = compress
+        self.throttle = throttle
+        self.name = obj.name
+        self.executor = None
+
+        # SHA1 digests are always needed for verification
+        self.algorithms = ['sha1']
+        if manifest_hash != 'sha1':
+            self.algorithms.append(manifest_hash)
+
+        self.lease = None
+        self.device_urls = []
+        self.total_bytes = 0
+        self.downloads = {}
+        self.warnings = []
+
+    def disk_file(self, url):
+        return os.path.join(self.path, '{}-{}'.format(self.name, url.targetId))
+
+    def transferred(self):
+        """
+        Returns the number of bytes downloaded so far
+
+        """
+        return sum(d.transferred for d in self.downloads.values())
+
+    def create_writer(self, path, offset=0, size=None):
+        """
+        Create a writer for a disk
+
+        Args:
+            path   (str): Path to the file
+            offset (int): Offset in the file where the disk begins
+            size   (int): If specified the disk is written only within
+                          a region of this size
+
+        """
+        if self.compress:
+            return pvc.widget.transfer.CompressingWriter(
+                path,
+                executor=self.executor,
+                offset=offset,
+                size=size,
+                algorithms=[self.manifest_hash]
+            )
+
+        return pvc.widget.transfer.FileWriter(
+            path,
+            offset=offset,
+            size=size,
+            sparse=self.sparse
+        )
+
+    def file_size(self, download):
+        """
+        Returns the size of a downloaded disk as saved in the template
+
+        """
+        if self.compress:
+            return download.writer.physical
+
+        return download.size
+
+    def written(self):
+        """
+        Returns the number of bytes received and the number of
+        bytes actually written, which excludes skipped zero blocks
+
+        """
+        logical = sum(d.writer.logical for d in self.downloads.values())
+        physical = sum(d.writer.physical for d in self.downloads.values())
+
+        return logical, physical
+
+    def progress(self):
+        """
+        Returns the percentage of completion of the export
+
+        """
+        if not self.total_bytes:
+            return 0
+
+        percent = self.transferred() * 100 // self.total_bytes
+
+        return min(percent, 99)
+
+    def wait_for_lease(self):
+        """
+        Wait for the export lease to become ready
+
+        Raises:
+            vmodl.MethodFault if the lease could not be acquired
+
+        """
+        lease = self.obj.ExportVm()
+        wait_for_lease(lease)
+
+        self.lease = lease
+        info = lease.info
+        self.device_urls = info.deviceUrl
+        self.total_bytes = info.totalDiskCapacityInKB * 1024
+
+    def run(self, on_progress=None):
+        """
+        Export the Virtual Machine
+
+        Args:
+            on_progress (callable): A callable receiving the percentage of
+                                    completion and the number of downloaded
+                                    bytes, called periodically during the export
+
+        """
+        self.wait_for_lease()
+
+        keepalive = pvc.widget.transfer.LeaseKeepAlive(
+            lease=self.lease,
+            progress=self.progress
+        )
+        keepalive.start()
+
+        session = pvc.widget.transfer.create_session(
+            agent=self.agent,
+            pool_size=self.workers
+        )
+
+        if self.compress:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+
+        try:
+            if self.create_ova:
+                self.export_ova(session, on_progress)
+            else:
+                self.export_ovf(session, on_progress)
+        except Exception:
+            keepalive.signal_stop()
+            abort_lease(self.lease)
+            raise
+        finally:
+            session.close()
+            if self.executor:
+                self.executor.shutdown()
+
+        keepalive.signal_stop()
+        self.lease.HttpNfcLeaseProgress(percent=100)
+        self.lease.HttpNfcLeaseComplete()
+
+    def disk_urls(self):
+        return [url for url in self.device_urls if url.disk]  # skip non-vmdk disks
+
+    def export_ovf(self, session, on_progress=None):
+        """
+        Export the Virtual Machine into a folder of files
+
+        Args:
+            session (requests.Session): The HTTP session to use
+            on_progress     (callable): A callable receiving the percentage of
+                                        completion and the number of downloaded bytes
+
+        """
+        for url in self.disk_urls():
+            disk_file = self.disk_file(url)
+            self.downloads[url.key] = pvc.widget.transfer.Download(
+                session=session,
+                url=pvc.widget.transfer.device_url(self.agent, url.url),
+                writer=self.create_writer(disk_file),
+                state_path='{}.pvc-state'.format(disk_file),
+                algorithms=self.algorithms,
+                throttle=self.throttle
+            )
+
+        self.download_disks(list(self.downloads.values()), on_progress)
+
+        manifest = self.lease.HttpNfcLeaseGetManifest()
+        self.verify(session, manifest, on_progress)
+        ovf_files = self.create_ovf_files(manifest)
+
+        with open(os.path.join(self.path, '{}.mf'.format(self.name)), 'w') as f:
+            f.write(self.create_manifest(self.digests()))
+
+        with open(os.path.join(self.path, '{}.ovf'.format(self.name)), 'w') as f:
+            f.write(self.create_descriptor(ovf_files))
+
+    def export_ova(self, session, on_progress=None):
+        """
+        Export the Virtual Machine into a single OVA file
+
+        The disks are streamed directly into the OVA archive, one
+        after another. Space for the descriptor and the manifest is
+        reserved at the beginning of the archive and they are
+        written in place once all disks have been downloaded.
+
+        Args:
+            session (requests.Session): The HTTP session to use
+            on_progress     (callable): A callable receiving the percentage of
+                                        completion and the number of downloaded bytes
+
+        """
+        urls = self.disk_urls()
+        ova = OvaWriter(os.path.join(self.path, '{}.ova'.format(self.name)))
+
+        try:
+            descriptor_size = self.descriptor_size(urls)
+            descriptor_offset = ova.reserve('{}.ovf'.format(self.name), descriptor_size)
+
+            digest_size = hashlib.new(self.manifest_hash).digest_size * 2
+            manifest_size = len(self.create_manifest(
+                {url.key: '0' * digest_size for url in urls}
+            ))
+            manifest_offset = ova.reserve('{}.mf'.format(self.name), manifest_size)
+
+            for url in urls:
+                offset = ova.begin(os.path.basename(self.disk_file(url)))
+                download = pvc.widget.transfer.Download(
+                    session=session,
+                    url=pvc.widget.transfer.device_url(self.agent, url.url),
+                    writer=self.create_writer(ova.path, offset=offset),
+                    algorithms=self.algorithms,
+                    throttle=self.throttle
+                )
+                self.downloads[url.key] = download
+                self.download_disks([download], on_progress)
+                ova.end(self.file_size(download))
+
+            manifest = self.lease.HttpNfcLeaseGetManifest()
+            self.verify(session, manifest, on_progress)
+            ovf_files = self.create_ovf_files(manifest)
+
+            descriptor = self.create_descriptor(ovf_files).encode()
+            if len(descriptor) > descriptor_size:
+                raise IOError('OVF descriptor exceeds the space reserved for it')
+
+            manifest_data = self.create_manifest(self.digests()).encode()
+            if len(manifest_data) > manifest_size:
+                raise IOError('OVF manifest exceeds the space reserved for it')
+
+            # Whitespace after the root element is allowed by XML
+            ova.fill(descriptor_offset, descriptor.ljust(descriptor_size, b'\n'))
+            ova.fill(manifest_offset, manifest_data.ljust(manifest_size, b'\n'))
+        finally:
+            ova.close()
+
+    def descriptor_size(self, urls):
+        """
+        Estimate the size of the OVF descriptor
+
+        The descriptor is created once without the final sizes of the
+        disks, with room left for the disk sizes to be filled in.
+
+        Args:
+            urls (list): A list of vim.HttpNfcLease.DeviceUrl instances
+
+        Returns:
+            The number of bytes to reserve for the descriptor
+
+        """
+        ovf_files = [
+            pyVmomi.vim.OvfManager.OvfFile(
+                capacity=0,
+                deviceId=url.key,
+                path=os.path.basename(self.disk_file(url)),
+                populatedSize=0,
+                size=0,
+                compressionMethod='gzip' if self.compress else None
+            )
+            for url in urls
+        ]
+        cdp = pyVmomi.vim.OvfManager.CreateDescriptorParams(
+            ovfFiles=ovf_files
+        )
+
+        dr = self.agent.si.content.ovfManager.CreateDescriptor(
+            obj=self.obj,
+            cdp=cdp
+        )
+
+        return len(dr.ovfDescriptor.encode()) + 128 * len(urls) + 1024
+
+    def download_disks(self, downloads, on_progress=None):
+        """
+        Download disks of the Virtual Machine
+
+        Args:
+            downloads       (list): A list of Download instances
+            on_progress (callable): A callable receiving the percentage of
+                                    completion and the number of downloaded bytes
+
+        """
+        # Interleave the parts of the disks, so that all disks
+        # are being downloaded at the same time
+        parts = [[(download, part) for part in download.parts()] for download in downloads]
+        calls = [
+            functools.partial(p[0].fetch, p[1])
+            for p in itertools.chain(*itertools.zip_longest(*parts)) if p is not None
+        ]
+
+        def on_poll():
+            if on_progress:
+                on_progress(self.progress(), self.transferred())
+
+        try:
+            pvc.widget.transfer.run_concurrently(
+                calls=calls,
+                max_workers=self.workers,
+                on_poll=on_poll
+            )
+        except Exception:
+            for download in downloads:
+                download.close()
+            raise
+
+        for download in downloads:
+            download.finish()
+
+    def create_ovf_files(self, manifest):
+        """
+        Create the OVF file entries of the exported disks
+
+        Args:
+            manifest (list): A list of vim.HttpNfcLease.ManifestEntry instances
+
+        Returns:
+            A list of vim.OvfManager.OvfFile instances
+
+        """
+        urls = {url.key: url for url in self.device_urls}
+        ovf_files = []
+
+        for entry in manifest:
+            if entry.key not in self.downloads:
+                continue
+
+            of = pyVmomi.vim.OvfManager.OvfFile(
+                capacity=entry.capacity,
+                deviceId=entry.key,
+                path=os.path.basename(self.disk_file(urls[entry.key])),
+                populatedSize=entry.populatedSize,
+                size=self.file_size(self.downloads[entry.key]),
+                compressionMethod='gzip' if self.compress else None
+            )
+            ovf_files.append(of)
+
+        return ovf_files
+
+    def digests(self):
+        """
+        Returns the manifest digests of the downloaded disks
+
+        """
+        return {
+            key: (download.writer if self.compress else download).digests[self.manifest_hash]
+            for key, download in self.downloads.items()
+        }
+
+    def verify(self, session, manifest, on_progress=None):
+        """
+        Verify the downloaded disks against the lease manifest
+
+        Disks which do not match their manifest entry are downloaded
+        again. Disks of a folder of files are rewritten from scratch,
+        so a compressed disk may change its size, which is picked up
+        by the manifest and descriptor created afterwards. Disks of an
+        OVA archive are downloaded again within their region of the
+        archive, which is not possible for compressed disks.
+
+        Args:
+            session (requests.Session): The HTTP session to use
+            manifest            (list): A list of vim.HttpNfcLease.ManifestEntry instances
+            on_progress     (callable): A callable receiving the percentage of
+                                        completion and the number of downloaded bytes
+
+        Raises:
+            IOError if disks still do not match after all retries
+
+        """
+        urls = {url.key: url for url in self.device_urls}
+        attempt = 0
+
+        while True:
+            mismatched = [
+                entry.key for entry in manifest
+                if entry.key in self.downloads and entry.sha1 and
+                entry.sha1.lower() != self.downloads[entry.key].digests['sha1']
+            ]
+
+            if not mismatched:
+                return
+
+            attempt += 1
+            if attempt > self.verify_retries:
+                raise IOError('Checksum mismatch for disk(s): {}'.format(
+                    ', '.join(urls[key].targetId for key in mismatched))
+                )
+
+            if self.create_ova and self.compress:
+                raise IOError(
+                    'Checksum mismatch for disk(s): {}. Compressed disks cannot be '
+                    'downloaded again into an OVA archive, export the VM again'.format(
+                        ', '.join(urls[key].targetId for key in mismatched)
+                    )
+                )
+
+            downloads = []
+            for key in mismatched:
+                previous = self.downloads[key]
+                if self.create_ova:
+                    writer = self.create_writer(
+                        previous.writer.path,
+                        offset=previous.writer.offset,
+                        size=self.file_size(previous)
+                    )
+                else:
+                    writer = self.create_writer(previous.writer.path)
+
+                download = pvc.widget.transfer.Download(
+                    session=session,
+                    url=previous.url,
+                    writer=writer,
+                    algorithms=self.algorithms,
+                    throttle=self.throttle
+                )
+                self.downloads[key] = download
+                downloads.append(download)
+
+            self.download_disks(downloads, on_progress)
+
+            for download in downloads:
+                if self.create_ova and self.file_size(download) != download.writer.size:
+                    raise IOError('Size of disk changed when downloading it again')
+
+    def create_manifest(self, digests):
+        """
+        Creates the contents of the OVF manifest file
+
+        Args:
+            digests (dict): A mapping of the disk keys and their digests
+
+        Returns:
+            The contents of the manifest file
+
+        """
+        urls = {url.key: url for url in self.device_urls}
+
+        lines = [
+            '{}({})= {}\n'.format(
+                self.manifest_hash.upper(),
+                os.path.basename(self.disk_file(urls[key])),
+                digests[key]
+            )
+            for key in [url.key for url in self.disk_urls()] if key in digests
+        ]
+
+        return ''.join(lines)
+
+    def create_descriptor(self, ovf_files):
+        """
+        Creates the contents of the OVF descriptor file
+
+        Args:
+            ovf_files (list): A list of vim.OvfManager.OvfFile instances
+
+        Returns:
+            The OVF descriptor
+
+        """
+        cdp = pyVmomi.vim.OvfManager.CreateDescriptorParams(
+            ovfFiles=ovf_files
+        )
+
+        dr = self.agent.si.content.ovfManager.CreateDescriptor(
+            obj=self.obj,
+            cdp=cdp
+        )
+
+        if dr.warning:
+            self.warnings.append('Warning: {}'.format(dr.warning))
+
+        if dr.error:
+            self.warnings.append('Error: {}'.format(dr.error))
+
+        return dr.ovfDescriptor
+
+
+class ExportJob(object):
+    QUEUED = 'Queued'
+    RUNNING = 'Running'
+    DONE = 'Done'
+    FAILED = 'Failed'
+
+    def __init__(self, agent, obj, name, path, host=None, datastores=(),
+                 create_ova=False, compress=False):
+        """
+        An export of a Virtual Machine run by an ExportQueue
+
+        Args:
+            agent          (VConnector): A VConnector instance
+            obj    (vim.VirtualMachine): A VirtualMachine managed entity
+            name                  (str): Name of the Virtual Machine
+            path                  (str): Directory to save the OVF/OVA template
+            host       (vim.HostSystem): Host of the Virtual Machine
+            datastores           (list): Datastores used by the Virtual Machine
+            create_ova           (bool): If True then export VM into a single OVA file
+            compress             (bool): If True then compress the disks with gzip
+
+        """
+        self.agent = agent
+        self.obj = obj
+        self.name = name
+        self.path = path
+        self.host = host._moId if host else None
+        self.datastores = [d._moId for d in datastores]
+        self.create_ova = create_ova
+        self.compress = compress
+
+        self.state = self.QUEUED
+        self.attempts = 0
+        self.error = None
+        self.export = None
+
+    def progress(self):
+        if self.state == self.DONE:
+            return 100
+        if self.export is None:
+            return 0
+
+        return self.export.progress()
+
+    def run(self, throttle=None):
+        """
+        Run the export
+
+        Args:
+            throttle (TokenBucket): Limits the download bandwidth
+
+        """
+        os.makedirs(self.path, exist_ok=True)
+
+        self.export = OvfExport(
+            agent=self.agent,
+            obj=self.obj,
+            path=self.path,
+            create_ova=self.create_ova,
+            compress=self.compress,
+            throttle=throttle
+        )
+        self.export.run()
+
+
+def export_jobs(agent, rows, path, create_ova=False, compress=False):
+    """
+    Create the export jobs of Virtual Machines
+
+    Names of Virtual Machines are not unique, so each job exports
+    into a directory named after the unique tag of its row, e.g.
+    'web (vm-42)' for Virtual Machines sharing the name 'web'.
+
+    Args:
+        agent  (VConnector): A VConnector instance
+        rows         (list): A list of InventoryRow instances with the
+                             'runtime.host' and 'datastore' properties
+        path          (str): Directory containing the exported templates
+        create_ova   (bool): If True then export VMs into single OVA files
+        compress     (bool): If True then compress the disks with gzip
+
+    Returns:
+        A list of ExportJob instances
+
+    """
+    jobs = []
+    directories = set()
+    for row in rows:
+        directory = row.tag.replace(os.sep, '_')
+        if directory in directories:
+            directory = '{} ({})'.format(directory, row.obj._moId)
+        directories.add(directory)
+
+        jobs.append(
+            ExportJob(
+                agent=agent,
+                obj=row.obj,
+                name=row.tag,
+                path=os.path.join(path, directory),
+                host=row['runtime.host'],
+                datastores=row['datastore'] or [],
+                create_ova=create_ova,
+                compress=compress
+            )
+        )
+
+    return jobs
+
+
+class ExportQueue(threading.Thread):
+    def __init__(self, jobs, max_jobs=DEFAULT_EXPORT_JOBS,
+                 max_per_datastore=DEFAULT_EXPORT_JOBS_PER_DATASTORE,
+                 max_per_host=DEFAULT_EXPORT_JOBS_PER_HOST,
+                 bandwidth=DEFAULT_EXPORT_BANDWIDTH, retries=2):
+        """
+        Export Queue Thread
+
+        Runs multiple export jobs at once. Jobs are started in order
+        as long as the number of running jobs, including the ones
+        using the same datastore or host, stays within the limits.
+        Jobs waiting for a busy datastore or host do not hold back
+        the jobs after them. Failed jobs are queued again.
+
+        Args:
+            jobs              (list): A list of ExportJob instances
+            max_jobs           (int): Max number of jobs running at once
+            max_per_datastore  (int): Max number of running jobs using a datastore
+            max_per_host       (int): Max number of running jobs on a host
+            bandwidth          (int): Max number of bytes per second downloaded
+                                      by all jobs, 0 means no limit
+            retries            (int): Max number of times a failed job is retried
+
+        """
+        super().__init__()
+        self.daemon = True
+        self.time_to_die = threading.Event()
+
+        self.jobs = list(jobs)
+        self.max_jobs = max_jobs
+        self.max_per_datastore = max_per_datastore
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.throttle = pvc.widget.transfer.TokenBucket(bandwidth) if bandwidth else None
+
+        self.queue = collections.deque(self.jobs)
+        self.running = set()
+        self.datastores = collections.Counter()
+        self.hosts = collections.Counter()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def can_start(self, job):
+        if len(self.running) >= self.max_jobs:
+            return False
+        if job.host and self.hosts[job.host] >= self.max_per_host:
+            return False
+
+        return all(self.datastores[d] < self.max_per_datastore for d in job.datastores)
+
+    def run(self):
+        while not self.time_to_die.is_set():
+            with self.lock:
+                if not self.queue and not self.running:
+                    return
+
+                for job in list(self.queue):
+                    if not self.can_start(job):
+                        continue
+                    self.queue.remove(job)
+                    self.running.add(job)
+                    self.hosts[job.host] += 1
+                    self.datastores.update(job.datastores)
+                    job.state = ExportJob.RUNNING
+                    job.attempts += 1
+                    threading.Thread(target=self.run_job, args=(job,), daemon=True).start()
+
+            self.wakeup.wait(1)
+            self.wakeup.clear()
+
+    def run_job(self, job):
+        try:
+            job.run(throttle=self.throttle)
+            job.error = None
+        except Exception as e:
+            job.error = e
+
+        with self.lock:
+            self.running.discard(job)
+            self.hosts[job.host] -= 1
+            self.datastores.subtract(job.datastores)
+
+            if job.error is None:
+                job.state = ExportJob.DONE
+            elif job.attempts <= self.retries and not self.time_to_die.is_set():
+                job.state = ExportJob.QUEUED
+                self.queue.append(job)
+            else:
+                job.state = ExportJob.FAILED
+
+        self.wakeup.set()
+
+    def is_done(self):
+        return all(job.state in (ExportJob.DONE, ExportJob.FAILED) for job in self.jobs)
+
+    def signal_stop(self):
+        self.time_to_die.set()
+        self.wakeup.set()
+
+
+class OvfPackage(object):
+    def __init__(self, path):
+        """
+        An OVF template to be imported
+
+        The template is either an OVF descriptor with the files it
+        references in the same directory or an OVA archive. Files
+        of an OVA archive are read in place, without extracting them.
+
+        Args:
+            path (str): Path to the OVF descriptor or OVA archive
+
+        """
+        self.path = path
+        self.members = {}
+
+        if path.lower().endswith('.ova'):
+            with tarfile.open(path) as tar:
+                for member in tar.getmembers():
+                    if member.isfile():
+                        self.members[member.name] = (member.offset_data, member.size)
+            self.descriptor_name = [n for n in self.members if n.lower().endswith('.ovf')][0]
+        else:
+            self.descriptor_name = os.path.basename(path)
+
+    def reader(self, name):
+        """
+        Get a reader of a file in the template
+
+        Args:
+            name (str): Name of the file
+
+        Returns:
+            A FileReader instance
+
+        """
+        if self.members:
+            offset, size = self.members[name]
+            return pvc.widget.transfer.FileReader(self.path, offset=offset, size=size)
+
+        return pvc.widget.transfer.FileReader(os.path.join(os.path.dirname(self.path), name))
+
+    def descriptor(self):
+        """
+        Returns the OVF descriptor of the template
+
+        """
+        reader = self.reader(self.descriptor_name)
+        try:
+            return b''.join(reader).decode()
+        finally:
+            reader.close()
+
+
+class OvfImport(object):
+    def __init__(self, agent, package, name, pool, datastore, folder, host=None,
+                 network_mapping=None, workers=pvc.widget.transfer.DEFAULT_WORKERS):
+        """
+        Import of an OVF template as a new Virtual Machine
+
+        All files of the template are uploaded concurrently over a
+        pool of HTTP connections.
+
+        Args:
+            agent              (VConnector): A VConnector instance
+            package            (OvfPackage): The OVF template to import
+            name                      (str): Name of the new Virtual Machine
+            pool         (vim.ResourcePool): Resource pool of the Virtual Machine
+            datastore       (vim.Datastore): Datastore of the Virtual Machine
+            folder             (vim.Folder): Folder of the Virtual Machine
+            host           (vim.HostSystem): Host of the Virtual Machine. If not
+                                             specified it is chosen by DRS
+            network_mapping          (dict): A mapping of the OVF network names
+                                             and vim.Network instances
+            workers                   (int): Max number of concurrent uploads
+
+        """
+        self.agent = agent
+        self.package = package
+        self.name = name
+        self.pool = pool
+        self.datastore = datastore
+        self.folder = folder
+        self.host = host
+        self.network_mapping = network_mapping or {}
+        self.workers = workers
+
+        self.lease = None
+        self.entity = None
+        self.uploads = []
+        self.total_bytes = 0
+        self.warnings = []
+
+    def transferred(self):
+        """
+        Returns the number of bytes uploaded so far
+
+        """
+        return sum(u.transferred for u in self.uploads)
+
+    def progress(self):
+        """
+        Returns the percentage of completion of the import
+
+        """
+        if not self.total_bytes:
+            return 0
+
+        return min(self.transferred() * 100 // self.total_bytes, 99)
+
+    def create_import_spec(self):
+        """
+        Create the import spec of the template
+
+        Returns:
+            A vim.OvfManager.CreateImportSpecResult instance
+
+        Raises:
+            vmodl.MethodFault if the template cannot be imported
+
+        """
+        network_mapping = [
+            pyVmomi.vim.OvfManager.NetworkMapping(name=name, network=network)
+            for name, network in self.network_mapping.items()
+        ]
+
+        cisp = pyVmomi.vim.OvfManager.CreateImportSpecParams(
+            entityName=self.name,
+            hostSystem=self.host,
+            networkMapping=network_mapping
+        )
+
+        result = self.agent.si.content.ovfManager.CreateImportSpec(
+            ovfDescriptor=self.package.descriptor(),
+            resourcePool=self.pool,
+            datastore=self.datastore,
+            cisp=cisp
+        )
+
+        if result.error:
+            raise result.error[0]
+
+        for warning in result.warning:
+            self.warnings.append('Warning: {}'.format(warning.msg))
+
+        return result
+
+    def run(self, on_progress=None):
+        """
+        Import the template
+
+        Args:
+            on_progress (callable): A callable receiving the percentage of
+                                    completion and the number of uploaded
+                                    bytes, called periodically during the import
+
+        Returns:
+            The imported vim.VirtualMachine instance
+
+        """
+        result = self.create_import_spec()
+
+        self.lease = self.pool.ImportVApp(
+            spec=result.importSpec,
+            folder=self.folder,
+            host=self.host
+        )
+        wait_for_lease(self.lease)
+        info = self.lease.info
+
+        keepalive = pvc.widget.transfer.LeaseKeepAlive(
+            lease=self.lease,
+            progress=self.progress
+        )
+        keepalive.start()
+
+        session = pvc.widget.transfer.create_session(
+            agent=self.agent,
+            pool_size=self.workers
+        )
+
+        try:
+            urls = {url.importKey: url for url in info.deviceUrl}
+            for item in result.fileItem:
+                if item.path.lower().endswith('.vmdk'):
+                    content_type = 'application/x-vnd.vmware-streamVmdk'
+                else:
+                    content_type = 'application/octet-stream'
+
+                upload = pvc.widget.transfer.Upload(
+                    session=session,
+                    url=pvc.widget.transfer.device_url(self.agent, urls[item.deviceId].url),
+                    reader=self.package.reader(item.path),
+                    method='PUT' if item.create else 'POST',
+                    content_type=content_type
+                )
+                self.uploads.append(upload)
+
+            self.total_bytes = sum(len(u.reader) for u in self.uploads)
+
+            def on_poll():
+                if on_progress:
+                    on_progress(self.progress(), self.transferred())
+
+            pvc.widget.transfer.run_concurrently(
+                calls=[u.run for u in self.uploads],
+                max_workers=self.workers,
+                on_poll=on_poll
+            )
+        except Exception:
+            keepalive.signal_stop()
+            abort_lease(self.lease)
+            for upload in self.uploads:
+                upload.reader.close()
+            raise
+        finally:
+            session.close()
+
+        keepalive.signal_stop()
+        self.lease.HttpNfcLeaseProgress(percent=100)
+        self.lease.HttpNfcLeaseComplete()
+        self.entity = info.entity
+
+        return self.entity
+
+
+class OvaWriter(object):
+    def __init__(self, path):
+        """
+        Writes an OVA archive in a single pass
+
+        Members of the archive are written in place. The header
+        of a member is written once its size is known, so that
+        data can be streamed into the archive without knowing
+        its size in advance.
+
+        Args:
+            path (str): Path to the OVA file
+
+        """
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self.position = 0
+        self.member = None
+
+    def header(self, name, size):
+        info = tarfile.TarInfo(name=name)
+        info.size = size
+        info.mode = 0o644
+        info.mtime = int(time.time())
+
+        return info.tobuf(format=tarfile.GNU_FORMAT)
+
+    def write(self, position, data):
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self.fd, view, position)
+            view = view[written:]
+            position += written
+
+    def reserve(self, name, size):
+        """
+        Reserve space for a member of a known size
+
+        Args:
+            name (str): Name of the member
+            size (int): Size of the member
+
+        Returns:
+            The offset where the member data begins
+
+        """
+        header = self.header(name, size)
+        self.write(self.position, header)
+        offset = self.position + len(header)
+        self.position = offset + self.padded(size)
+
+        return offset
+
+    def begin(self, name):
+        """
+        Begin a member of a yet unknown size
+
+        Args:
+            name (str): Name of the member
+
+        Returns:
+            The offset where the member data begins
+
+        """
+        # The header has the same length regardless of the member size
+        self.member = (name, self.position)
+        return self.position + len(self.header(name, 0))
+
+    def end(self, size):
+        """
+        End the current member
+
+        Args:
+            size (int): Size of the member data
+
+        """
+        name, position = self.member
+        header = self.header(name, size)
+        self.write(position, header)
+        self.position = position + len(header) + self.padded(size)
+        self.member = None
+
+    def fill(self, offset, data):
+        """
+        Fill in the data of a reserved member
+
+        """
+        self.write(offset, data)
+
+    def padded(self, size):
+        return (size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+
+    def close(self):
+        # End of archive marker and padding of the last member
+        # are written as zero blocks
+        os.ftruncate(self.fd, self.position + 2 * tarfile.BLOCKSIZE)
+        os.close(self.fd)
@@ -0,0 +1,429 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Performance Counter Cache
+
+"""
+
+import os
+import json
+import time
+import threading
+
+import pyVmomi
+
+import pvc.widget.environ
+
+__all__ = ['CounterCatalog', 'MetricCache', 'get_counter_catalog', 'get_metric_cache']
+
+# Directory where the counter catalogs of vCenter servers are kept,
+# can be overriden by the PVC_CACHE_DIR environment variable
+DEFAULT_CACHE_DIR = os.environ.get(
+    'PVC_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'pvc')
+)
+
+# Number of seconds for which provider summaries and available
+# metrics of entities are cached, can be overriden by the
+# PVC_PERF_CACHE_TTL environment variable
+DEFAULT_METRIC_TTL = pvc.widget.environ.getint('PVC_PERF_CACHE_TTL', 300, minimum=0)
+
+# Counter catalogs and metric caches of the currently connected agents
+_catalogs = {}
+_metric_caches = {}
+_lock = threading.Lock()
+
+
+class CounterCatalog(object):
+    def __init__(self, counters):
+        """
+        Indexed catalog of performance counters
+
+        Counters can be looked up by their key, by their name
+        in the 'group.name.rollup' format, e.g. 'cpu.usage.average'
+        and by the label of their group.
+
+        Args:
+            counters (list): A list of vim.PerformanceManager.CounterInfo instances
+
+        """
+        self.counters = counters
+        self._keys = {}
+        self._names = {}
+        self._groups = {}
+
+        for c in self.counters:
+            self._keys[c.key] = c
+            self._names[self.name(c)] = c
+            self._groups.setdefault(c.groupInfo.label, []).append(c)
+
+    def __len__(self):
+        return len(self.counters)
+
+    @staticmethod
+    def name(counter):
+        """
+        Get the name of a counter, e.g. 'cpu.usage.average'
+
+        Args:
+            counter (vim.PerformanceManager.CounterInfo): A CounterInfo instance
+
+        """
+        return '{0}.{1}.{2}'.format(
+            counter.groupInfo.key,
+            counter.nameInfo.key,
+            counter.rollupType
+        )
+
+    def get(self, key):
+        """
+        Get a counter by its key
+
+        Args:
+            key (int): Key of the counter
+
+        Returns:
+            A vim.PerformanceManager.CounterInfo instance, or None if not found
+
+        """
+        return self._keys.get(key)
+
+    def find(self, name):
+        """
+        Get a counter by its name
+
+        Args:
+            name (str): Name of the counter, e.g. 'cpu.usage.average'
+
+        Returns:
+            A vim.PerformanceManager.CounterInfo instance, or None if not found
+
+        """
+        return self._names.get(name)
+
+    def groups(self, keys):
+        """
+        Get the groups of counters
+
+        Args:
+            keys (iterable): Keys of the counters
+
+        Returns:
+            A set of (group key, group label) tuples
+
+        """
+        counters = [self._keys.get(key) for key in keys]
+
+        return set((c.groupInfo.key, c.groupInfo.label) for c in counters if c is not None)
+
+    def group(self, label, keys=None):
+        """
+        Get the counters in a group
+
+        Args:
+            label  (str): Label of the group
+            keys  (set): If specified return only the counters with these keys
+
+        Returns:
+            A list of vim.PerformanceManager.CounterInfo instances
+
+        """
+        counters = self._groups.get(label, [])
+        if keys is None:
+            return list(counters)
+
+        return [c for c in counters if c.key in keys]
+
+    def dump(self):
+        """
+        Serialize the counters to a JSON compatible object
+
+        """
+        def description(d):
+            return {'key': d.key, 'label': d.label, 'summary': d.summary}
+
+        return [
+            {
+                'key': c.key,
+                'nameInfo': description(c.nameInfo),
+                'groupInfo': description(c.groupInfo),
+                'unitInfo': description(c.unitInfo),
+                'rollupType': c.rollupType,
+                'statsType': c.statsType,
+                'level': c.level,
+                'perDeviceLevel': c.perDeviceLevel,
+            } for c in self.counters
+        ]
+
+    @classmethod
+    def load(cls, data):
+        """
+        Create a catalog from counters serialized by dump()
+
+        Args:
+            data (list): The serialized counters
+
+        Returns:
+            A CounterCatalog instance
+
+        """
+        description = pyVmomi.vim.ElementDescription
+        counters = [
+            pyVmomi.vim.PerformanceManager.CounterInfo(
+                key=c['key'],
+                nameInfo=description(**c['nameInfo']),
+                groupInfo=description(**c['groupInfo']),
+                unitInfo=description(**c['unitInfo']),
+                rollupType=c['rollupType'],
+                statsType=c['statsType'],
+                level=c['level'],
+                perDeviceLevel=c['perDeviceLevel']
+            ) for c in data
+        ]
+
+        return cls(counters)
+
+
+class MetricCache(object):
+    def __init__(self, pm, ttl=DEFAULT_METRIC_TTL):
+        """
+        Cache of performance provider summaries and available metrics
+
+        Results are cached per entity and interval for 'ttl' seconds,
+        so that widgets navigating the counters of an entity do not
+        query the server again for the same information.
+
+        Args:
+            pm (vim.PerformanceManager): A PerformanceManager instance
+            ttl                   (int): Number of seconds to keep results
+
+        """
+        self.pm = pm
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, fetch):
+        """
+        Get a cached result, fetching it if missing or expired
+
+        Args:
+            key     (tuple): Key of the result
+            fetch (callable): A callable retrieving the result
+
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        value = fetch()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+
+        return value
+
+    def provider_summary(self, entity):
+        """
+        Get the performance provider summary of an entity
+
+        Args:
+            entity (vim.ManagedEntity): A managed entity
+
+        Returns:
+            A vim.PerformanceManager.ProviderSummary instance
+
+        """
+        return self._get(
+            ('summary', entity._moId),
+            lambda: self.pm.QueryPerfProviderSummary(entity=entity)
+        )
+
+    def available_metrics(self, entity, interval_id=None):
+        """
+        Get the available metrics of an entity
+
+        Args:
+            entity (vim.ManagedEntity): A managed entity
+            interval_id          (int): Interval of the metrics, if not specified
+                                        the historical metrics are returned
+
+        Returns:
+            A list of vim.PerformanceManager.MetricId instances
+
+        """
+        return self._get(
+            ('metrics', entity._moId, interval_id),
+            lambda: self.pm.QueryAvailablePerfMetric(entity=entity, intervalId=interval_id)
+        )
+
+    def historical_intervals(self):
+        """
+        Get the historical intervals of the performance manager
+
+        Returns:
+            A list of vim.HistoricalInterval instances
+
+        """
+        return self._get(('intervals',), lambda: self.pm.historicalInterval)
+
+    def invalidate(self, entity=None):
+        """
+        Discard cached results
+
+        Args:
+            entity (vim.ManagedEntity): If specified discard only the results of this entity
+
+        """
+        with self._lock:
+            if entity is None:
+                self._entries.clear()
+                return
+
+            for key in [k for k in self._entries if k[1:2] == (entity._moId,)]:
+                del self._entries[key]
+
+
+def cache_path(agent, template='counters-{}.json', cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Get the path to a cache file of an agent
+
+    Cache files are kept per vCenter server, identified by its
+    instance UUID. Hosts without one are identified by their name.
+
+    Args:
+        agent (VConnector): A VConnector instance
+        template     (str): Name of the file, '{}' is replaced
+                            with the server identifier
+        cache_dir    (str): Directory where cache files are kept
+
+    """
+    about = agent.si.content.about
+    name = about.instanceUuid or agent.host
+
+    return os.path.join(cache_dir, template.format(name.replace(os.sep, '_')))
+
+
+def read_catalog(path, build):
+    """
+    Read a cached counter catalog
+
+    Args:
+        path  (str): Path to the cached catalog
+        build (str): Build of the server, catalogs of other builds are discarded
+
+    Returns:
+        A CounterCatalog instance, or None if not cached
+
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(data, dict) or data.get('build') != build:
+        return None
+
+    try:
+        return CounterCatalog.load(data['counters'])
+    except (KeyError, TypeError):
+        return None
+
+
+def write_catalog(path, build, catalog):
+    """
+    Save a counter catalog
+
+    Errors are ignored, as the catalog is retrieved from
+    the server again when it is not cached.
+
+    Args:
+        path              (str): Path to the cached catalog
+        build             (str): Build of the server
+        catalog (CounterCatalog): The catalog to save
+
+    """
+    tmp = '{}.tmp'.format(path)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, 'w') as f:
+            json.dump({'build': build, 'counters': catalog.dump()}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def get_counter_catalog(agent):
+    """
+    Get the performance counter catalog of an agent
+
+    The catalog is retrieved once per session and kept on disk,
+    so that it is not retrieved again by the following sessions
+    to the same server, unless the server has been upgraded.
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    Returns:
+        A CounterCatalog instance
+
+    """
+    with _lock:
+        catalog = _catalogs.get(agent)
+        if catalog is not None:
+            return catalog
+
+        build = agent.si.content.about.build
+        path = cache_path(agent)
+        catalog = read_catalog(path, build)
+        if catalog is None:
+            catalog = CounterCatalog(agent.si.content.perfManager.perfCounter)
+            write_catalog(path, build, catalog)
+
+        _catalogs[agent] = catalog
+
+        return catalog
+
+
+def get_metric_cache(agent):
+    """
+    Get the cache of provider summaries and available metrics of an agent
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    Returns:
+        A MetricCache instance
+
+    """
+    with _lock:
+        cache = _metric_caches.get(agent)
+        if cache is None:
+            cache = MetricCache(agent.si.content.perfManager)
+            _metric_caches[agent] = cache
+
+        return cache
@@ -29,22 +29,135 @@ Performance Metrics Widgets
 
 import os
 import datetime
+import operator
+import functools
 import tempfile
 import subprocess
+import concurrent.futures
 
 import pyVmomi
 
+import pvc.widget.chart
+import pvc.widget.collector
+import pvc.widget.common
+import pvc.widget.environ
 import pvc.widget.menu
 import pvc.widget.form
 import pvc.widget.checklist
+import pvc.widget.perfcache
+import pvc.widget.perfstore
 import pvc.widget.radiolist
+import pvc.widget.series
 
 __all__ = [
     'PerformanceProviderWidget', 'PerformanceGroupWidget',
     'PerformanceCounterInGroupWidget', 'PerformanceCounterWidget',
-    'PerformanceCounterGraphWidget',
+    'PerformanceCounterGraphWidget', 'PerformanceTopWidget',
+    'PerformanceCollectorWidget', 'query_perf',
 ]
 
+# Max number of metrics in a single performance query to a vCenter
+# server, which is used when the 'config.vpxd.stats.maxQueryMetrics'
+# setting of the server is not set
+DEFAULT_MAX_QUERY_METRICS = 64
+
+# Max number of performance queries sent at the same time,
+# can be overriden by the PVC_PERF_WORKERS environment variable
+DEFAULT_PERF_WORKERS = pvc.widget.environ.getint('PVC_PERF_WORKERS', 4)
+
+# Backend used for plotting graphs, either 'builtin' for graphs drawn
+# with text characters or 'gnuplot' for graphs plotted by gnuplot(1),
+# can be overriden by the PVC_GRAPH_BACKEND environment variable
+DEFAULT_GRAPH_BACKEND = os.environ.get('PVC_GRAPH_BACKEND', 'builtin')
+
+# Style of the graphs drawn by the builtin backend, either
+# 'braille' or 'block', can be overriden by the PVC_GRAPH_STYLE
+# environment variable
+DEFAULT_GRAPH_STYLE = os.environ.get('PVC_GRAPH_STYLE', 'braille')
+
+# Counters offered for ranking entities by the top view
+TOP_COUNTERS = (
+    'cpu.usage.average',
+    'cpu.usagemhz.average',
+    'cpu.ready.summation',
+    'mem.usage.average',
+    'mem.active.average',
+    'mem.swapinRate.average',
+    'disk.usage.average',
+    'disk.maxTotalLatency.latest',
+    'net.usage.average',
+)
+
+
+def max_query_metrics(agent):
+    """
+    Get the max number of metrics in a single performance query
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    Returns:
+        The max number of metrics, or 0 if there is no limit
+
+    """
+    if agent.si.content.about.apiType != 'VirtualCenter':
+        return 0
+
+    try:
+        options = agent.si.content.setting.QueryOptions(
+            name='config.vpxd.stats.maxQueryMetrics'
+        )
+    except pyVmomi.vim.fault.InvalidName:
+        return DEFAULT_MAX_QUERY_METRICS
+
+    try:
+        value = int(options[0].value)
+    except (IndexError, ValueError):
+        return DEFAULT_MAX_QUERY_METRICS
+
+    return max(value, 0)
+
+
+def query_perf(agent, query_specs, max_workers=DEFAULT_PERF_WORKERS):
+    """
+    Query performance data in batches sent in parallel
+
+    The query specs are split into batches, so that the number of
+    metrics in a single query does not exceed the limit of the server.
+
+    Args:
+        agent     (VConnector): A VConnector instance
+        query_specs     (list): A list of vim.PerformanceManager.QuerySpec instances
+        max_workers      (int): Max number of queries sent at the same time
+
+    Returns:
+        A list of vim.PerformanceManager.EntityMetricBase instances
+
+    """
+    pm = agent.si.content.perfManager
+    limit = max_query_metrics(agent)
+
+    batches = []
+    batch = []
+    count = 0
+    for spec in query_specs:
+        metrics = max(len(spec.metricId or []), 1)
+        if batch and limit and count + metrics > limit:
+            batches.append(batch)
+            batch = []
+            count = 0
+        batch.append(spec)
+        count += metrics
+    if batch:
+        batches.append(batch)
+
+    if len(batches) < 2:
+        return [r for b in batches for r in pm.QueryPerf(querySpec=b)]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda b: pm.QueryPerf(querySpec=b), batches)
+        return [r for result in results for r in result]
+
 
 class PerformanceProviderWidget(object):
     def __init__(self, agent, dialog, obj):
@@ -61,6 +174,7 @@ class PerformanceProviderWidget(object):
         self.dialog = dialog
         self.obj = obj
         self.pm = self.agent.si.content.perfManager
+        self.cache = pvc.widget.perfcache.get_metric_cache(self.agent)
         self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
         self.display()
 
@@ -79,6 +193,26 @@ class PerformanceProviderWidget(object):
             ),
         ]
 
+        if isinstance(self.obj, PerformanceTopWidget.ENTITY_TYPES):
+            items.append(
+                pvc.widget.menu.MenuItem(
+                    tag='Top',
+                    description='Top entities by counter',
+                    on_select=PerformanceTopWidget,
+                    on_select_args=(self.agent, self.dialog, self.obj)
+                )
+            )
+
+        if isinstance(self.obj, PerformanceCollectorWidget.ENTITY_TYPES):
+            items.append(
+                pvc.widget.menu.MenuItem(
+                    tag='Collector',
+                    description='Collect samples in the background',
+                    on_select=PerformanceCollectorWidget,
+                    on_select_args=(self.agent, self.dialog, self.obj)
+                )
+            )
+
         menu = pvc.widget.menu.Menu(
             items=items,
             dialog=self.dialog,
@@ -98,9 +232,7 @@ class PerformanceProviderWidget(object):
             text='Retrieving information ...'
         )
 
-        provider_summary = self.pm.QueryPerfProviderSummary(
-            entity=self.obj
-        )
+        provider_summary = self.cache.provider_summary(self.obj)
 
         elements = [
             pvc.widget.form.FormElement(
@@ -142,6 +274,7 @@ class PerformanceGroupWidget(object):
         self.dialog = dialog
         self.obj = obj
         self.pm = self.agent.si.content.perfManager
+        self.cache = pvc.widget.perfcache.get_metric_cache(self.agent)
         self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
         self.display()
 
@@ -178,9 +311,7 @@ class PerformanceGroupWidget(object):
             text='Retrieving information ...'
         )
 
-        provider_summary = self.pm.QueryPerfProviderSummary(
-            entity=self.obj
-        )
+        provider_summary = self.cache.provider_summary(self.obj)
 
         if not provider_summary.currentSupported:
             self.dialog.msgbox(
@@ -189,10 +320,7 @@ class PerformanceGroupWidget(object):
             )
             return
 
-        metric_id = self.pm.QueryAvailablePerfMetric(
-            entity=self.obj,
-            intervalId=provider_summary.refreshRate
-        )
+        metric_id = self.cache.available_metrics(self.obj, interval_id=provider_summary.refreshRate)
 
         if not metric_id:
             self.dialog.msgbox(
@@ -201,9 +329,8 @@ class PerformanceGroupWidget(object):
             )
             return
 
-        perf_counter = self.pm.perfCounter
-        counters = [c for c in perf_counter for m in metric_id if c.key == m.counterId]
-        groups = set([(c.groupInfo.key, c.groupInfo.label) for c in counters])
+        catalog = pvc.widget.perfcache.get_counter_catalog(self.agent)
+        groups = catalog.groups(m.counterId for m in metric_id)
 
         items = [
             pvc.widget.menu.MenuItem(
@@ -233,9 +360,7 @@ class PerformanceGroupWidget(object):
             text='Retrieving information ...'
         )
 
-        provider_summary = self.pm.QueryPerfProviderSummary(
-            entity=self.obj
-        )
+        provider_summary = self.cache.provider_summary(self.obj)
 
         if not provider_summary.summarySupported:
             self.dialog.msgbox(
@@ -244,9 +369,7 @@ class PerformanceGroupWidget(object):
             )
             return
 
-        metric_id = self.pm.QueryAvailablePerfMetric(
-            entity=self.obj
-        )
+        metric_id = self.cache.available_metrics(self.obj)
 
         if not metric_id:
             self.dialog.msgbox(
@@ -255,9 +378,8 @@ class PerformanceGroupWidget(object):
             )
             return
 
-        perf_counter = self.pm.perfCounter
-        counters = [c for c in perf_counter for m in metric_id if c.key == m.counterId]
-        groups = set([(c.groupInfo.key, c.groupInfo.label) for c in counters])
+        catalog = pvc.widget.perfcache.get_counter_catalog(self.agent)
+        groups = catalog.groups(m.counterId for m in metric_id)
 
         items = [
             pvc.widget.menu.MenuItem(
@@ -301,6 +423,7 @@ class PerformanceCounterInGroupWidget(object):
         self.dialog = dialog
         self.obj = obj
         self.pm = self.agent.si.content.perfManager
+        self.cache = pvc.widget.perfcache.get_metric_cache(self.agent)
         self.metric_id = metric_id
         self.label = label
         self.realtime = realtime
@@ -319,8 +442,8 @@ class PerformanceCounterInGroupWidget(object):
         # object instance, e.g. vmnic0, vmnic1, etc.
         unique_metrics = set([m.counterId for m in self.metric_id])
 
-        perf_counter = self.pm.perfCounter
-        counters = [c for c in perf_counter for m in unique_metrics if c.key == m and c.groupInfo.label == self.label]
+        catalog = pvc.widget.perfcache.get_counter_catalog(self.agent)
+        counters = catalog.group(self.label, keys=unique_metrics)
 
         items = [
             pvc.widget.menu.MenuItem(
@@ -365,6 +488,7 @@ class PerformanceCounterWidget(object):
         self.counter = counter
         self.realtime = realtime
         self.pm = self.agent.si.content.perfManager
+        self.cache = pvc.widget.perfcache.get_metric_cache(self.agent)
         self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
         self.display()
 
@@ -413,7 +537,7 @@ class PerformanceCounterWidget(object):
             self.counter.nameInfo.key,
             self.counter.unitInfo.key
         )
-        intervals = [i.name for i in self.pm.historicalInterval if self.counter.level == i.level]
+        intervals = [i.name for i in self.cache.historical_intervals() if self.counter.level == i.level]
 
         elements = [
             pvc.widget.form.FormElement(
@@ -459,7 +583,11 @@ class PerformanceCounterWidget(object):
 class PerformanceCounterGraphWidget(object):
     def __init__(self, agent, dialog, obj, counter, realtime):
         """
-        Widget to plot a gnuplot(1) graph of a performance counter
+        Widget to plot a graph of a performance counter
+
+        Graphs are drawn with text characters by default. Graphs are
+        plotted by gnuplot(1) if the PVC_GRAPH_BACKEND environment
+        variable is set to 'gnuplot'.
 
         Args:
             agent                           (VConnector): A VConnector instance
@@ -480,10 +608,214 @@ class PerformanceCounterGraphWidget(object):
         self.counter = counter
         self.realtime = realtime
         self.pm = self.agent.si.content.perfManager
+        self.cache = pvc.widget.perfcache.get_metric_cache(self.agent)
+        self.samples = pvc.widget.series.SampleStore()
+        self.saved = {}
+
         self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
         self.display()
 
     def display(self):
+        if DEFAULT_GRAPH_BACKEND == 'gnuplot':
+            self.gnuplot_graph()
+        else:
+            self.chart_graph()
+
+    def selected_metric_id(self):
+        """
+        Prompts the user for the counter instances to plot
+
+        Returns:
+            A list of vim.PerformanceManager.MetricId instances
+
+        """
+        selected_instances = self.select_counter_instances()
+        if not selected_instances:
+            self.dialog.msgbox(
+                title=self.title,
+                text='No counter instances selected'
+            )
+            return []
+
+        return [
+            pyVmomi.vim.PerformanceManager.MetricId(
+                counterId=self.counter.key,
+                instance='' if instance == self.obj.name else instance
+            ) for instance in selected_instances
+        ]
+
+    def chart_graph(self):
+        """
+        Draw a graph with text characters
+
+        """
+        metric_id = self.selected_metric_id()
+        if not metric_id:
+            return
+
+        percent = self.counter.unitInfo.key == 'percent'
+        chart = pvc.widget.chart.Chart(
+            style=DEFAULT_GRAPH_STYLE,
+            maximum=100 if percent else None,
+            unit='%' if percent else self.counter.unitInfo.label,
+            factor=pvc.widget.series.unit_scale(self.counter)
+        )
+
+        collector = pvc.widget.collector.get_performance_collector(self.agent)
+        if self.realtime and collector and collector.collects(self.obj, metric_id):
+            self.collected_chart(metric_id, chart, collector)
+        elif self.realtime:
+            self.realtime_chart(metric_id, chart)
+        else:
+            self.historical_chart(metric_id, chart)
+
+    def realtime_chart(self, metric_id, chart):
+        """
+        Draw a real-time graph with text characters
+
+        The graph is updated with the samples received since
+        the last update, so that no samples are lost if an
+        update takes longer than the refresh rate.
+
+        Args:
+            metric_id               (list): A list of vim.PerformanceManager.MetricId instances
+            chart (pvc.widget.chart.Chart): The chart to draw the samples in
+
+        """
+        self.dialog.infobox(
+            title=self.title,
+            text='Retrieving information ...'
+        )
+
+        interval_id = self.cache.provider_summary(self.obj).refreshRate
+        start_time = self.agent.si.CurrentTime() - datetime.timedelta(seconds=chart.capacity * interval_id)
+
+        text = (
+            '{chart}\n'
+            'Graph updates every {interval} seconds.\n'
+            'Press CANCEL in order to stop plotting the graph and exit.'
+        )
+
+        while True:
+            query_spec = pyVmomi.vim.PerformanceManager.QuerySpec(
+                entity=self.obj,
+                metricId=metric_id,
+                intervalId=interval_id,
+                startTime=start_time,
+                format='csv'
+            )
+            for data in self.pm.QueryPerf(querySpec=[query_spec]):
+                for series in self.samples.add(data, {self.counter.key: self.counter}):
+                    chart.read(series.name or self.obj.name, series)
+                    start_time = datetime.datetime.fromtimestamp(
+                        series.timestamps.last(),
+                        datetime.timezone.utc
+                    )
+
+            rendered = chart.render()
+            code = self.dialog.pause(
+                title=self.title,
+                text=text.format(chart=rendered, interval=interval_id),
+                height=rendered.count('\n') + 10,
+                width=chart.width + 20,
+                seconds=interval_id
+            )
+            if code == self.dialog.CANCEL:
+                break
+
+    def collected_chart(self, metric_id, chart, collector):
+        """
+        Draw a real-time graph from the samples of the performance collector
+
+        The samples are only read from the collector, which
+        retrieves them from the server on every tick.
+
+        Args:
+            metric_id                                    (list): A list of vim.PerformanceManager.MetricId instances
+            chart                      (pvc.widget.chart.Chart): The chart to draw the samples in
+            collector (pvc.widget.collector.PerformanceCollector): The collector sampling the entity
+
+        """
+        text = (
+            '{chart}\n'
+            'Graph updates every {interval} seconds.\n'
+            'Press CANCEL in order to stop plotting the graph and exit.'
+        )
+
+        while True:
+            for m in metric_id:
+                series = collector.samples.get(self.obj, m.counterId, m.instance)
+                if series:
+                    chart.read(m.instance or self.obj.name, series)
+
+            rendered = chart.render()
+            code = self.dialog.pause(
+                title=self.title,
+                text=text.format(chart=rendered, interval=collector.interval),
+                height=rendered.count('\n') + 10,
+                width=chart.width + 20,
+                seconds=collector.interval
+            )
+            if code == self.dialog.CANCEL:
+                break
+
+    def historical_chart(self, metric_id, chart):
+        """
+        Draw a historical graph with text characters
+
+        Samples are averaged to fit in the width of the graph.
+
+        Args:
+            metric_id               (list): A list of vim.PerformanceManager.MetricId instances
+            chart (pvc.widget.chart.Chart): The chart to draw the samples in
+
+        """
+        interval = self.select_historical_interval_info()
+        if not interval:
+            return
+
+        period = max(interval.length // chart.capacity, interval.samplingPeriod)
+        store, oldest = pvc.widget.perfstore.fetch_historical(self.agent, self.obj, metric_id, interval)
+        first, last = None, None
+        for m in metric_id:
+            timestamps, values = store.rollup(
+                entity=self.obj._moId,
+                counter=m.counterId,
+                instance=m.instance,
+                interval=interval.samplingPeriod,
+                period=period,
+                start=oldest
+            )
+            if not timestamps:
+                continue
+            chart.update(
+                m.instance or self.obj.name,
+                pvc.widget.chart.resample(values, chart.capacity)
+            )
+            first = timestamps[0] if first is None else min(first, timestamps[0])
+            last = timestamps[-1] if last is None else max(last, timestamps[-1])
+
+        if first is None:
+            self.dialog.msgbox(
+                title=self.title,
+                text='Performance data is currently not available for entity'
+            )
+            return
+
+        self.dialog.scrollbox(
+            title=self.title,
+            text='{} - {}\n\n{}'.format(
+                datetime.datetime.fromtimestamp(first, datetime.timezone.utc),
+                datetime.datetime.fromtimestamp(last, datetime.timezone.utc),
+                chart.render()
+            )
+        )
+
+    def gnuplot_graph(self):
+        """
+        Plot a graph using gnuplot(1)
+
+        """
         try:
             subprocess.Popen(
                 args=['gnuplot', '--version'],
@@ -497,21 +829,11 @@ class PerformanceCounterGraphWidget(object):
             )
             return
 
-        selected_instances = self.select_counter_instances()
-        if not selected_instances:
-            self.dialog.msgbox(
-                title=self.title,
-                text='No counter instances selected'
-            )
+        metric_id = self.selected_metric_id()
+        if not metric_id:
             return
 
-        metric_id = [
-            pyVmomi.vim.PerformanceManager.MetricId(
-                counterId=self.counter.key,
-                instance='' if instance == self.obj.name else instance
-            ) for instance in selected_instances
-        ]
-
+        selected_instances = [m.instance or self.obj.name for m in metric_id]
         fd, datafile = tempfile.mkstemp(prefix='pvcgnuplot-data-')
         script = self.create_gnuplot_script(
             datafile=datafile,
@@ -530,28 +852,62 @@ class PerformanceCounterGraphWidget(object):
         """
         Save performance samples to a file
 
-        New samples are appended to the file
-
-        NOTE: If the performance counter unit is percentage we need
-              to make sure that the sample value is divided by
-              a hundred, as the returned sample value
-              represents a 1/100th of the percent.
+        The samples are added to the sample store of the widget
+        and the samples which have not been saved to the file
+        yet are appended to it. The position up to which samples
+        are saved is kept per series and the series are joined on
+        their timestamps, so that samples missing from a series do
+        not shift the other series.
 
         Args:
             path                                      (str): Path to the datafile
             data  (vim.PerformanceManager.EntityMetricBase): The data to be saved
 
         """
-        all_values = [v.value for v in data.value]
-        samples = zip(data.sampleInfo, *all_values)
+        series = self.samples.add(data, {self.counter.key: self.counter})
+        if not series:
+            return
+
+        samples = [s.since(self.saved.get(s.name, 0)) for s in series]
+        joined = [dict(zip(timestamps, values)) for timestamps, values, _ in samples]
+        timestamps = sorted(set.intersection(*[set(s) for s in joined]))
+        if not timestamps:
+            return
+
+        # Samples newer than the last saved row are kept for the next
+        # call, as the other series may not have received them yet
+        for s, (series_timestamps, _, total) in zip(series, samples):
+            self.saved[s.name] = total - sum(1 for t in series_timestamps if t > timestamps[-1])
+
+        self.write_performance_samples(
+            path=path,
+            timestamps=timestamps,
+            columns=[[s[t] for t in timestamps] for s in joined],
+            scale=series[0].scale
+        )
+
+    def write_performance_samples(self, path, timestamps, columns, scale=1.0):
+        """
+        Append performance samples to a file
+
+        Each column is scaled and formatted at once with map(),
+        so that no Python code runs for the individual values.
+
+        Args:
+            path        (str): Path to the datafile
+            timestamps (list): Timestamps of the samples as seconds since the epoch
+            columns    (list): A list of sample values for each counter instance
+            scale     (float): Factor by which the values are scaled
+
+        """
+        if scale != 1:
+            columns = [map(functools.partial(operator.mul, scale), column) for column in columns]
+        columns = [map(str, column) for column in columns]
 
         with open(path, 'a') as f:
-            for sample in samples:
-                timestamp, values = sample[0].timestamp, sample[1:]
-                if self.counter.unitInfo.key == 'percent':
-                    f.write('{},{}\n'.format(str(timestamp), ','.join([str(v / 100) for v in values])))
-                else:
-                    f.write('{},{}\n'.format(str(timestamp), ','.join([str(v) for v in values])))
+            for timestamp, *values in zip(timestamps, *columns):
+                timestamp = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+                f.write('{},{}\n'.format(timestamp, ','.join(values)))
 
     def create_gnuplot_script(self, datafile, instances):
         """
@@ -599,9 +955,7 @@ class PerformanceCounterGraphWidget(object):
         # Append any additional gnuplot(1) commands here
         # for real-time counters
         if self.realtime:
-            provider_summary = self.pm.QueryPerfProviderSummary(
-                entity=self.obj
-            )
+            provider_summary = self.cache.provider_summary(self.obj)
             pause = provider_summary.refreshRate
 
             # Append the 'reread' gnuplot(1) command
@@ -640,17 +994,12 @@ class PerformanceCounterGraphWidget(object):
         )
 
         if self.realtime:
-            provider_summary = self.pm.QueryPerfProviderSummary(
-                entity=self.obj
-            )
+            provider_summary = self.cache.provider_summary(self.obj)
             interval_id = provider_summary.refreshRate
         else:
             interval_id = None
 
-        metric_id = self.pm.QueryAvailablePerfMetric(
-            entity=self.obj,
-            intervalId=interval_id
-        )
+        metric_id = self.cache.available_metrics(self.obj, interval_id=interval_id)
         metrics = [m for m in metric_id if m.counterId == self.counter.key]
         instances = [m.instance if m.instance else self.obj.name for m in metrics]
         items = [
@@ -683,7 +1032,7 @@ class PerformanceCounterGraphWidget(object):
             text='Retrieving information ...'
         )
 
-        intervals = [i.name for i in self.pm.historicalInterval]
+        intervals = [i.name for i in self.cache.historical_intervals()]
         items = [
             pvc.widget.radiolist.RadioListItem(tag=interval) for interval in intervals
         ]
@@ -697,6 +1046,25 @@ class PerformanceCounterGraphWidget(object):
 
         return radiolist.display()
 
+    def select_historical_interval_info(self):
+        """
+        Prompts the user to select an existing historical interval
+
+        Returns:
+            A vim.HistoricalInterval instance, or None if no interval was selected
+
+        """
+        code, interval = self.select_historical_interval()
+        if code in (self.dialog.CANCEL, self.dialog.ESC) or not interval:
+            return None
+
+        self.dialog.infobox(
+            title=self.title,
+            text='Retrieving information ...'
+        )
+
+        return [i for i in self.cache.historical_intervals() if i.name == interval].pop()
+
     def realtime_graph(self, metric_id, datafile, script):
         """
         Plot a real-time graph
@@ -712,9 +1080,7 @@ class PerformanceCounterGraphWidget(object):
             text='Retrieving information ...'
         )
 
-        provider_summary = self.pm.QueryPerfProviderSummary(
-            entity=self.obj
-        )
+        provider_summary = self.cache.provider_summary(self.obj)
         interval_id = provider_summary.refreshRate
 
         # Query spec to get data from the past hour
@@ -723,7 +1089,8 @@ class PerformanceCounterGraphWidget(object):
             entity=self.obj,
             metricId=metric_id,
             intervalId=interval_id,
-            startTime=one_hour_ago
+            startTime=one_hour_ago,
+            format='csv'
         )
         data = self.pm.QueryPerf(querySpec=[query_spec_last_hour]).pop()
         self.save_performance_samples(
@@ -777,8 +1144,95 @@ class PerformanceCounterGraphWidget(object):
             script     (str): Path to a gnuplot(1) script used to plot the graph
 
         """
-        code, interval = self.select_historical_interval()
-        if code in (self.dialog.CANCEL, self.dialog.ESC) or not interval:
+        interval = self.select_historical_interval_info()
+        if not interval:
+            return
+
+        store, oldest = pvc.widget.perfstore.fetch_historical(self.agent, self.obj, metric_id, interval)
+        samples = []
+        for m in metric_id:
+            timestamps, values = store.samples(
+                entity=self.obj._moId,
+                counter=m.counterId,
+                instance=m.instance,
+                interval=interval.samplingPeriod,
+                start=oldest
+            )
+            samples.append(dict(zip(timestamps, values)))
+
+        timestamps = sorted(set.intersection(*[set(s) for s in samples]))
+        self.write_performance_samples(
+            path=datafile,
+            timestamps=timestamps,
+            columns=[[s[t] for t in timestamps] for s in samples],
+            scale=pvc.widget.series.unit_scale(self.counter)
+        )
+
+        p = subprocess.Popen(
+            args=['gnuplot', script]
+        )
+
+        p.wait()
+
+
+class PerformanceTopWidget(object):
+    # Managed entities containing the ranked entities
+    ENTITY_TYPES = (
+        pyVmomi.vim.Datacenter,
+        pyVmomi.vim.ClusterComputeResource,
+        pyVmomi.vim.HostSystem,
+    )
+
+    # Number of real-time samples averaged for ranking the entities
+    SAMPLES = 15
+
+    def __init__(self, agent, dialog, obj):
+        """
+        Widget ranking the entities by the value of a counter
+
+        The real-time samples of a counter are retrieved for all
+        virtual machines or hosts of a managed entity at once and
+        the entities are ranked by the average of their samples.
+
+        Args:
+            agent         (VConnector): A VConnector instance
+            dialog     (dialog.Dialog): A Dialog instance
+            obj    (vim.ManagedEntity): A Datacenter, Cluster or Host
+                                        managed entity
+
+        """
+        self.agent = agent
+        self.dialog = dialog
+        self.obj = obj
+        self.cache = pvc.widget.perfcache.get_metric_cache(self.agent)
+        self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
+        self.display()
+
+    def display(self):
+        obj_type = self.select_entity_type()
+        if obj_type is None:
+            return
+
+        counter = self.select_counter()
+        if counter is None:
+            return
+
+        code, count = self.dialog.inputbox(
+            title=self.title,
+            text='Number of entities to display',
+            init='10'
+        )
+
+        if code in (self.dialog.CANCEL, self.dialog.ESC):
+            return
+
+        try:
+            count = int(count)
+        except ValueError:
+            self.dialog.msgbox(
+                title=self.title,
+                text='Invalid number of entities'
+            )
             return
 
         self.dialog.infobox(
@@ -786,20 +1240,358 @@ class PerformanceCounterGraphWidget(object):
             text='Retrieving information ...'
         )
 
-        interval_id = [i.samplingPeriod for i in self.pm.historicalInterval if i.name == interval].pop()
-        query_spec = pyVmomi.vim.PerformanceManager.QuerySpec(
-            entity=self.obj,
-            metricId=metric_id,
-            intervalId=interval_id
+        rows = self.entities(obj_type)
+        if not rows:
+            self.dialog.msgbox(
+                title=self.title,
+                text='No running entities found'
+            )
+            return
+
+        try:
+            ranking = self.rank(rows, counter)[:count]
+        except pyVmomi.vmodl.MethodFault as e:
+            self.dialog.msgbox(
+                title=self.title,
+                text='Unable to retrieve performance data:\n\n{}\n'.format(e.msg)
+            )
+            return
+
+        if not ranking:
+            self.dialog.msgbox(
+                title=self.title,
+                text='Performance data is currently not available for the entities'
+            )
+            return
+
+        items = [
+            pvc.widget.menu.MenuItem(
+                tag=row.tag,
+                description=self.format_value(counter, value),
+                on_select=PerformanceProviderWidget,
+                on_select_args=(self.agent, self.dialog, row.obj)
+            ) for row, value in ranking
+        ]
+
+        menu = pvc.widget.menu.Menu(
+            items=items,
+            dialog=self.dialog,
+            title=self.title,
+            text="Top {} entities by '{}'".format(
+                len(items),
+                pvc.widget.perfcache.CounterCatalog.name(counter)
+            )
         )
-        data = self.pm.QueryPerf(querySpec=[query_spec]).pop()
-        self.save_performance_samples(
-            path=datafile,
-            data=data
+
+        menu.display()
+
+    def select_entity_type(self):
+        """
+        Prompts the user for the type of entities to rank
+
+        """
+        if isinstance(self.obj, pyVmomi.vim.HostSystem):
+            return pyVmomi.vim.VirtualMachine
+
+        items = [
+            pvc.widget.radiolist.RadioListItem(tag='Virtual Machines', status='on'),
+            pvc.widget.radiolist.RadioListItem(tag='Hosts'),
+        ]
+
+        radiolist = pvc.widget.radiolist.RadioList(
+            items=items,
+            dialog=self.dialog,
+            title=self.title,
+            text='Select the type of entities to rank'
         )
 
-        p = subprocess.Popen(
-            args=['gnuplot', script]
+        code, tag = radiolist.display()
+        if code in (self.dialog.CANCEL, self.dialog.ESC) or not tag:
+            return
+
+        if tag == 'Hosts':
+            return pyVmomi.vim.HostSystem
+
+        return pyVmomi.vim.VirtualMachine
+
+    def select_counter(self):
+        """
+        Prompts the user for the counter to rank the entities by
+
+        Returns:
+            A vim.PerformanceManager.CounterInfo instance, or None if cancelled
+
+        """
+        catalog = pvc.widget.perfcache.get_counter_catalog(self.agent)
+        counters = [catalog.find(name) for name in TOP_COUNTERS]
+
+        items = [
+            pvc.widget.radiolist.RadioListItem(
+                tag=catalog.name(c),
+                description=c.nameInfo.label,
+                status='on' if index == 0 else 'off'
+            ) for index, c in enumerate(c for c in counters if c is not None)
+        ]
+
+        if not items:
+            self.dialog.msgbox(
+                title=self.title,
+                text='No performance counters available for ranking'
+            )
+            return
+
+        radiolist = pvc.widget.radiolist.RadioList(
+            items=items,
+            dialog=self.dialog,
+            title=self.title,
+            text='Select a performance counter'
         )
 
-        p.wait()
+        code, tag = radiolist.display()
+        if code in (self.dialog.CANCEL, self.dialog.ESC) or not tag:
+            return
+
+        return catalog.find(tag)
+
+    def entities(self, obj_type):
+        """
+        Get the running entities of the given type
+
+        Args:
+            obj_type (pyVmomi.vim.*): Type of the entities
+
+        Returns:
+            A list of InventoryRow instances
+
+        """
+        if obj_type == pyVmomi.vim.VirtualMachine:
+            path, state = 'runtime.powerState', pyVmomi.vim.VirtualMachinePowerState.poweredOn
+        else:
+            path, state = 'runtime.connectionState', pyVmomi.vim.HostSystemConnectionState.connected
+
+        if isinstance(self.obj, pyVmomi.vim.HostSystem):
+            scope = {'objects': self.obj.vm}
+        else:
+            scope = {'container': self.obj}
+
+        store = pvc.widget.common.inventory_store(
+            agent=self.agent,
+            obj_type=obj_type,
+            path_set=['name', path],
+            **scope
+        )
+
+        return [row for row in store if row[path] == state]
+
+    def rank(self, rows, counter):
+        """
+        Rank entities by the average of their counter samples
+
+        Args:
+            rows                               (list): A list of InventoryRow instances
+            counter (vim.PerformanceManager.CounterInfo): The counter to rank by
+
+        Returns:
+            A list of (InventoryRow, value) tuples sorted by descending value
+
+        """
+        interval_id = self.cache.provider_summary(rows[0].obj).refreshRate
+        metric_id = [pyVmomi.vim.PerformanceManager.MetricId(counterId=counter.key, instance='')]
+
+        query_specs = [
+            pyVmomi.vim.PerformanceManager.QuerySpec(
+                entity=row.obj,
+                metricId=metric_id,
+                intervalId=interval_id,
+                maxSample=self.SAMPLES,
+                format='csv'
+            ) for row in rows
+        ]
+
+        results = query_perf(self.agent, query_specs)
+        rows_by_moid = {row.obj._moId: row for row in rows}
+
+        ranking = []
+        for result in results:
+            row = rows_by_moid.get(result.entity._moId)
+            _, series = pvc.widget.series.parse_entity_metric(result)
+            values = [v for _, _, series_values in series for v in series_values if v >= 0]
+            if row is None or not values:
+                continue
+            ranking.append((row, sum(values) / len(values)))
+
+        ranking.sort(key=lambda r: r[1], reverse=True)
+
+        return ranking
+
+    def format_value(self, counter, value):
+        """
+        Format a counter value for display
+
+        NOTE: Values of counters which unit is percentage
+              represent a 1/100th of the percent.
+
+        Args:
+            counter (vim.PerformanceManager.CounterInfo): The counter
+            value                                (float): The value
+
+        """
+        if counter.unitInfo.key == 'percent':
+            return '{:.2f} %'.format(value / 100)
+
+        return '{:.2f} {}'.format(value, counter.unitInfo.label)
+
+
+class PerformanceCollectorWidget(object):
+    # Managed entities which can be watched by the collector
+    ENTITY_TYPES = (
+        pyVmomi.vim.ClusterComputeResource,
+        pyVmomi.vim.HostSystem,
+    )
+
+    def __init__(self, agent, dialog, obj):
+        """
+        Widget to manage the background collection of samples
+
+        The real-time samples of the hosts and virtual machines of
+        a cluster or host are collected in the background by the
+        performance collector of the agent. Real-time graphs of
+        the collected entities are drawn from the collected samples.
+
+        Args:
+            agent         (VConnector): A VConnector instance
+            dialog     (dialog.Dialog): A Dialog instance
+            obj    (vim.ManagedEntity): A Cluster or Host managed entity
+
+        """
+        self.agent = agent
+        self.dialog = dialog
+        self.obj = obj
+        self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
+        self.display()
+
+    def display(self):
+        items = [
+            pvc.widget.menu.MenuItem(
+                tag='Start',
+                description='Start collecting samples',
+                on_select=self.start
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Overview',
+                description='Latest collected samples',
+                on_select=self.overview
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Stop',
+                description='Stop collecting samples',
+                on_select=self.stop
+            ),
+        ]
+
+        menu = pvc.widget.menu.Menu(
+            items=items,
+            dialog=self.dialog,
+            title=self.title,
+            text='Select an item from the menu'
+        )
+
+        menu.display()
+
+    def start(self):
+        collector = pvc.widget.collector.start_performance_collector(self.agent, self.obj)
+        text = 'Collecting samples every {} seconds'.format(collector.interval)
+
+        error = collector.error_message()
+        if error:
+            text = '{}\n\nLast collection failed:\n\n{}\n'.format(text, error)
+
+        self.dialog.msgbox(
+            title=self.title,
+            text=text
+        )
+
+    def stop(self):
+        collector = pvc.widget.collector.get_performance_collector(self.agent)
+        if collector:
+            collector.unwatch(self.obj)
+
+        self.dialog.msgbox(
+            title=self.title,
+            text='Stopped collecting samples'
+        )
+
+    def overview(self):
+        """
+        Display the latest collected samples of the entities
+
+        The overview is refreshed on every tick of the collector.
+
+        """
+        collector = pvc.widget.collector.get_performance_collector(self.agent)
+        if not collector or not collector.watches(self.obj):
+            self.dialog.msgbox(
+                title=self.title,
+                text='Samples are not being collected for entity'
+            )
+            return
+
+        text = (
+            '{table}\n\n'
+            'Overview updates every {interval} seconds.\n'
+            'Press CANCEL in order to exit.'
+        )
+
+        while True:
+            table = self.table(collector)
+            error = collector.error_message()
+            if error:
+                table = 'Last collection failed: {}\n\n{}'.format(error, table)
+            elif not collector.is_alive():
+                table = 'Collector is not running\n\n{}'.format(table)
+            code = self.dialog.pause(
+                title=self.title,
+                text=text.format(table=table, interval=collector.interval),
+                height=min(table.count('\n') + 12, 40),
+                width=max(len(line) for line in table.splitlines()) + 10,
+                seconds=collector.interval
+            )
+            if code == self.dialog.CANCEL:
+                break
+
+    def table(self, collector):
+        """
+        Format the latest collected samples as a table
+
+        Args:
+            collector (pvc.widget.collector.PerformanceCollector): The collector
+
+        Returns:
+            The formatted table
+
+        """
+        counters = list(collector.counters.values())
+        header = ['Entity'] + [pvc.widget.perfcache.CounterCatalog.name(c) for c in counters]
+        rows = []
+        for name, entity in collector.members(self.obj):
+            row = [name]
+            for counter in counters:
+                series = collector.samples.get(entity, counter.key, '')
+                value = series.values.last() if series else None
+                if value is None:
+                    row.append('-')
+                elif counter.unitInfo.key == 'percent':
+                    row.append('{:.2f} %'.format(value * series.scale))
+                else:
+                    row.append('{:.2f} {}'.format(value * series.scale, counter.unitInfo.label))
+            rows.append(row)
+
+        if not rows:
+            return 'Waiting for samples ...'
+
+        widths = [max(len(r[i]) for r in [header] + rows) for i in range(len(header))]
+
+        return '\n'.join(
+            '  '.join(column.ljust(width) for column, width in zip(row, widths))
+            for row in [header] + rows
+        )
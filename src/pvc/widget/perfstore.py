@@ -0,0 +1,354 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Performance Store Module
+
+"""
+
+import os
+import sqlite3
+import collections
+import datetime
+import threading
+
+from array import array
+
+import pyVmomi
+
+import pvc.widget.perfcache
+import pvc.widget.series
+
+__all__ = ['PerfStore', 'get_perf_store', 'fetch_historical']
+
+# Stores of the currently connected agents
+_stores = {}
+_lock = threading.Lock()
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS samples ('
+    '  entity TEXT NOT NULL,'
+    '  counter INTEGER NOT NULL,'
+    '  instance TEXT NOT NULL,'
+    '  interval INTEGER NOT NULL,'
+    '  timestamp INTEGER NOT NULL,'
+    '  value REAL NOT NULL,'
+    '  PRIMARY KEY (entity, counter, instance, interval, timestamp)'
+    ') WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS watermarks ('
+    '  entity TEXT NOT NULL,'
+    '  counter INTEGER NOT NULL,'
+    '  instance TEXT NOT NULL,'
+    '  interval INTEGER NOT NULL,'
+    '  timestamp INTEGER NOT NULL,'
+    '  PRIMARY KEY (entity, counter, instance, interval)'
+    ') WITHOUT ROWID',
+)
+
+# Aggregate functions available for rollups
+ROLLUPS = {
+    'average': 'AVG',
+    'minimum': 'MIN',
+    'maximum': 'MAX',
+}
+
+
+class PerfStore(object):
+    def __init__(self, path):
+        """
+        Persistent store of historical performance samples
+
+        Samples are kept in an SQLite database per entity, counter,
+        instance and interval. Past samples do not change, so for each
+        series the timestamp of its newest sample is kept as well,
+        which lets callers retrieve only the samples newer than it.
+
+        Args:
+            path (str): Path to the database, or ':memory:'
+
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+
+        with self._db:
+            for statement in SCHEMA:
+                self._db.execute(statement)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def watermark(self, entity, counter, instance, interval):
+        """
+        Get the timestamp of the newest stored sample of a series
+
+        Args:
+            entity   (str): Managed object id of the entity
+            counter  (int): Key of the counter
+            instance (str): The counter instance
+            interval (int): Sampling period of the interval in seconds
+
+        Returns:
+            Number of seconds since the epoch, or None if no samples are stored
+
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT timestamp FROM watermarks '
+                'WHERE entity = ? AND counter = ? AND instance = ? AND interval = ?',
+                (entity, counter, instance, interval)
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def insert(self, entity, interval, timestamps, series):
+        """
+        Store samples of an entity
+
+        Args:
+            entity      (str): Managed object id of the entity
+            interval    (int): Sampling period of the interval in seconds
+            timestamps (list): Timestamps of the samples as seconds since the epoch
+            series     (list): A list of (counter key, instance, values) tuples
+                               as returned by parse_entity_metric()
+
+        """
+        if not timestamps:
+            return
+
+        with self._lock, self._db:
+            for counter, instance, values in series:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?)',
+                    ((entity, counter, instance, interval, int(t), v) for t, v in zip(timestamps, values))
+                )
+                self._update_watermark(entity, counter, instance, interval, timestamps[-1])
+
+    def mark(self, entity, counter, instance, interval, timestamp):
+        """
+        Record that a series has no samples up to a given timestamp
+
+        Used for series which the server returned no samples for,
+        e.g. of removed devices, so that they are not retrieved
+        again from the beginning of the interval.
+
+        Args:
+            entity    (str): Managed object id of the entity
+            counter   (int): Key of the counter
+            instance  (str): The counter instance
+            interval  (int): Sampling period of the interval in seconds
+            timestamp (int): Number of seconds since the epoch
+
+        """
+        with self._lock, self._db:
+            self._update_watermark(entity, counter, instance, interval, timestamp)
+
+    def _update_watermark(self, entity, counter, instance, interval, timestamp):
+        self._db.execute(
+            'INSERT INTO watermarks VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (entity, counter, instance, interval) '
+            'DO UPDATE SET timestamp = MAX(timestamp, excluded.timestamp)',
+            (entity, counter, instance, interval, int(timestamp))
+        )
+
+    def samples(self, entity, counter, instance, interval, start=None, end=None):
+        """
+        Get stored samples of a series
+
+        Args:
+            entity   (str): Managed object id of the entity
+            counter  (int): Key of the counter
+            instance (str): The counter instance
+            interval (int): Sampling period of the interval in seconds
+            start    (int): If specified return samples after this timestamp
+            end      (int): If specified return samples up to this timestamp
+
+        Returns:
+            A tuple of arrays of the timestamps and values
+
+        """
+        query, args = self._range(entity, counter, instance, interval, start, end)
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT timestamp, value FROM samples WHERE {} ORDER BY timestamp'.format(query),
+                args
+            ).fetchall()
+
+        return array('d', (r[0] for r in rows)), array('d', (r[1] for r in rows))
+
+    def rollup(self, entity, counter, instance, interval, period, start=None, end=None, rollup='average'):
+        """
+        Get stored samples of a series downsampled to a longer period
+
+        Args:
+            entity   (str): Managed object id of the entity
+            counter  (int): Key of the counter
+            instance (str): The counter instance
+            interval (int): Sampling period of the interval in seconds
+            period   (int): Period of the returned samples in seconds
+            start    (int): If specified return samples after this timestamp
+            end      (int): If specified return samples up to this timestamp
+            rollup   (str): How samples within a period are combined, one of
+                            'average', 'minimum' or 'maximum'
+
+        Returns:
+            A tuple of arrays of the period start timestamps and values
+
+        """
+        query, args = self._range(entity, counter, instance, interval, start, end)
+        period = max(int(period), 1)
+        statement = (
+            'SELECT timestamp / {period} * {period} AS bucket, {func}(value) '
+            'FROM samples WHERE {query} GROUP BY bucket ORDER BY bucket'
+        ).format(period=period, func=ROLLUPS[rollup], query=query)
+
+        with self._lock:
+            rows = self._db.execute(statement, args).fetchall()
+
+        return array('d', (r[0] for r in rows)), array('d', (r[1] for r in rows))
+
+    def prune(self, interval, before):
+        """
+        Remove samples of an interval older than a given timestamp
+
+        Args:
+            interval (int): Sampling period of the interval in seconds
+            before   (int): Number of seconds since the epoch
+
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                'DELETE FROM samples WHERE interval = ? AND timestamp < ?',
+                (interval, int(before))
+            )
+
+    def _range(self, entity, counter, instance, interval, start, end):
+        query = 'entity = ? AND counter = ? AND instance = ? AND interval = ?'
+        args = [entity, counter, instance, interval]
+        if start is not None:
+            query += ' AND timestamp > ?'
+            args.append(int(start))
+        if end is not None:
+            query += ' AND timestamp <= ?'
+            args.append(int(end))
+
+        return query, args
+
+
+def get_perf_store(agent):
+    """
+    Get the performance sample store of an agent
+
+    Stores are kept on disk per vCenter server. If the store
+    cannot be opened on disk, samples are kept in memory.
+
+    Args:
+        agent (VConnector): A VConnector instance
+
+    Returns:
+        A PerfStore instance
+
+    """
+    with _lock:
+        store = _stores.get(agent)
+        if store is not None:
+            return store
+
+        path = pvc.widget.perfcache.cache_path(agent, template='perf-{}.db')
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            store = PerfStore(path)
+        except (OSError, sqlite3.Error):
+            store = PerfStore(':memory:')
+
+        _stores[agent] = store
+
+        return store
+
+
+def fetch_historical(agent, entity, metric_id, interval):
+    """
+    Retrieve the historical samples of an entity which are not stored yet
+
+    Metrics are grouped by their watermark and each group is queried
+    only for the samples newer than its watermark. Metrics which the
+    server returns no samples for are recorded as empty up to the
+    sample before the newest retrieved one, as their newest sample
+    may not be available yet. Nothing is recorded if no samples are
+    returned at all. Samples older than the length of the interval
+    are removed.
+
+    Args:
+        agent                   (VConnector): A VConnector instance
+        entity          (vim.ManagedEntity): A managed entity
+        metric_id                     (list): A list of vim.PerformanceManager.MetricId instances
+        interval (vim.HistoricalInterval): The historical interval
+
+    Returns:
+        A tuple of the store containing the samples and the
+        timestamp of the oldest sample within the interval
+
+    """
+    store = get_perf_store(agent)
+    now = agent.si.CurrentTime()
+    oldest = int((now - datetime.timedelta(seconds=interval.length)).timestamp())
+
+    groups = collections.OrderedDict()
+    for m in metric_id:
+        watermark = store.watermark(entity._moId, m.counterId, m.instance, interval.samplingPeriod)
+        start = None if watermark is None else max(watermark, oldest)
+        groups.setdefault(start, []).append(m)
+
+    query_specs = [
+        pyVmomi.vim.PerformanceManager.QuerySpec(
+            entity=entity,
+            metricId=metrics,
+            intervalId=interval.samplingPeriod,
+            startTime=None if start is None else datetime.datetime.fromtimestamp(start, datetime.timezone.utc),
+            format='csv'
+        ) for start, metrics in groups.items()
+    ]
+
+    newest = None
+    retrieved = set()
+    for data in agent.si.content.perfManager.QueryPerf(querySpec=query_specs):
+        timestamps, series = pvc.widget.series.parse_entity_metric(data)
+        store.insert(entity._moId, interval.samplingPeriod, timestamps, series)
+        if timestamps:
+            newest = max(newest or 0, timestamps[-1])
+            retrieved.update((counter, instance) for counter, instance, _ in series)
+
+    if newest is not None:
+        empty_until = newest - interval.samplingPeriod
+        for m in metric_id:
+            if (m.counterId, m.instance) not in retrieved:
+                store.mark(entity._moId, m.counterId, m.instance, interval.samplingPeriod, empty_until)
+
+    store.prune(interval.samplingPeriod, oldest)
+
+    return store, oldest
@@ -0,0 +1,159 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Agent Pool Module
+
+"""
+
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+import pvc.widget.menu
+
+__all__ = ['AgentPool', 'ChainedItems']
+
+
+class AgentPool(object):
+    def __init__(self, agents=None, max_workers=16):
+        """
+        A pool of agents connected to different vSphere hosts
+
+        Operations against the agents in the pool are executed
+        concurrently, so that an operation against all agents takes
+        about as long as the slowest agent to respond.
+
+        Args:
+            agents      (list): A list of VConnector instances
+            max_workers  (int): Max number of agents to query at once
+
+        """
+        self.agents = list(agents) if agents else []
+        self.max_workers = max_workers
+
+    def __len__(self):
+        return len(self.agents)
+
+    def __iter__(self):
+        return iter(self.agents)
+
+    def add(self, agent):
+        """
+        Add an agent to the pool
+
+        Args:
+            agent (VConnector): A VConnector instance
+
+        """
+        self.agents.append(agent)
+
+    def remove(self, agent):
+        """
+        Remove an agent from the pool
+
+        Args:
+            agent (VConnector): A VConnector instance
+
+        """
+        self.agents.remove(agent)
+
+    def map(self, func, *args, **kwargs):
+        """
+        Call a function for each agent in the pool concurrently
+
+        The agent is passed as the first argument to the function.
+
+        Args:
+            func (callable): The function to call
+            args    (tuple): Additional args to pass to the function
+            kwargs   (dict): Additional keyword args to pass to the function
+
+        Returns:
+            A list of (agent, result, error) tuples in the order of
+            the agents in the pool. If the function raised an
+            exception for an agent then result is None and error
+            is the raised exception, otherwise error is None.
+
+        """
+        if not self.agents:
+            return []
+
+        def call(agent):
+            try:
+                return agent, func(agent, *args, **kwargs), None
+            except Exception as e:
+                return agent, None, e
+
+        workers = min(self.max_workers, len(self.agents))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, self.agents))
+
+
+class ChainedItems(object):
+    """
+    A sequence which chains multiple sequences of items
+
+    Can be used to merge the menu items for the results
+    retrieved from multiple agents without copying them.
+
+    """
+    def __init__(self, sequences):
+        """
+        Args:
+            sequences (list): A list of sequences to chain
+
+        """
+        self.sequences = [s for s in sequences if len(s)]
+        self._offsets = []
+
+        total = 0
+        for s in self.sequences:
+            self._offsets.append(total)
+            total += len(s)
+        self._len = total
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('Chained items index out of range')
+
+        i = bisect_right(self._offsets, index) - 1
+
+        return self.sequences[i][index - self._offsets[i]]
+
+    def __iter__(self):
+        for s in self.sequences:
+            for item in s:
+                yield item
+
+    def tags(self):
+        """
+        Get the tags of the chained items
+
+        """
+        return [tag for s in self.sequences for tag in pvc.widget.menu.item_tags(s)]
@@ -0,0 +1,117 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Property Retrieval Module
+
+"""
+
+import pyVmomi
+
+import pvc.widget.environ
+
+__all__ = ['iter_properties']
+
+# Max number of objects to retrieve per page, can be
+# overriden by the PVC_PAGE_SIZE environment variable
+DEFAULT_PAGE_SIZE = pvc.widget.environ.getint('PVC_PAGE_SIZE', 1000)
+
+
+def iter_properties(agent, view_ref, obj_type, path_set, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Collect properties for managed objects from a view ref in pages
+
+    Properties are retrieved using RetrievePropertiesEx() and
+    ContinueRetrievePropertiesEx(), so that no more than
+    'page_size' objects are being held in memory by the
+    returned results at a time.
+
+    If the generator is closed before all pages have been
+    consumed the remaining results are discarded on the server.
+
+    Args:
+        agent            (VConnector): A VConnector instance
+        view_ref (pyVmomi.vim.view.*): Starting point of inventory navigation
+        obj_type      (pyVmomi.vim.*): Type of managed object
+        path_set               (list): List of properties to retrieve
+        page_size               (int): Max number of objects per page
+
+    Yields:
+        Lists of properties for the managed objects in the format
+        returned by VConnector.collect_properties(), including
+        the managed object refs
+
+    """
+    collector = agent.si.content.propertyCollector
+
+    traversal_spec = pyVmomi.vmodl.query.PropertyCollector.TraversalSpec(
+        name='traverseEntities',
+        path='view',
+        skip=False,
+        type=view_ref.__class__
+    )
+    obj_spec = pyVmomi.vmodl.query.PropertyCollector.ObjectSpec(
+        obj=view_ref,
+        skip=True,
+        selectSet=[traversal_spec]
+    )
+    property_spec = pyVmomi.vmodl.query.PropertyCollector.PropertySpec(
+        type=obj_type,
+        pathSet=path_set
+    )
+    filter_spec = pyVmomi.vmodl.query.PropertyCollector.FilterSpec(
+        objectSet=[obj_spec],
+        propSet=[property_spec]
+    )
+    options = pyVmomi.vmodl.query.PropertyCollector.RetrieveOptions(
+        maxObjects=page_size
+    )
+
+    result = collector.RetrievePropertiesEx(
+        specSet=[filter_spec],
+        options=options
+    )
+
+    while result is not None:
+        token = result.token
+        page = []
+        for obj in result.objects:
+            properties = {prop.name: prop.val for prop in obj.propSet}
+            properties['obj'] = obj.obj
+            page.append(properties)
+
+        # Release the retrieved objects before handing out the page
+        result = None
+
+        try:
+            yield page
+        except GeneratorExit:
+            if token:
+                collector.CancelRetrievePropertiesEx(token=token)
+            raise
+
+        if not token:
+            break
+
+        result = collector.ContinueRetrievePropertiesEx(token=token)
@@ -56,7 +56,7 @@ class RadioList(object):
         Radio list class
 
         Args:
-            items           (list): A list of RadioListItem instances
+            items           (list): A sequence of RadioListItem instances
             dialog (dialog.Dialog): Dialog instance
             kwargs          (dict): Additional args to be passed to dialog(1)
 
@@ -68,7 +68,7 @@ class RadioList(object):
         self.dialog = dialog
         self.kwargs = kwargs
         self.choices = [(item.tag, item.description, item.status) for item in self.items]
-        self._registry = {item.tag: item for item in self.items}
+        self._registry = {tag: index for index, (tag, _, _) in enumerate(self.choices)}
 
     def display(self):
         code, tag = self.dialog.radiolist(
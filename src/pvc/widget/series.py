@@ -0,0 +1,360 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Performance Series Module
+
+"""
+
+import datetime
+import threading
+
+from array import array
+
+import pyVmomi
+
+__all__ = [
+    'RingBuffer', 'Series', 'SampleStore', 'unit_scale',
+    'parse_entity_metric', 'sample_count',
+]
+
+# Number of samples kept per series, which is one hour
+# of real-time samples taken every 20 seconds
+DEFAULT_CAPACITY = 180
+
+
+def unit_scale(counter):
+    """
+    Get the factor by which the values of a counter are scaled
+
+    NOTE: Values of counters which unit is percentage
+          represent a 1/100th of the percent.
+
+    Args:
+        counter (vim.PerformanceManager.CounterInfo): A CounterInfo instance
+
+    """
+    return 0.01 if counter.unitInfo.key == 'percent' else 1.0
+
+
+def parse_timestamp(text):
+    """
+    Parse a timestamp of a performance sample in the CSV format
+
+    Args:
+        text (str): The timestamp, e.g. '2016-01-01T00:00:20Z'
+
+    Returns:
+        Number of seconds since the epoch
+
+    """
+    timestamp = datetime.datetime.fromisoformat(text[:19])
+
+    return timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def parse_entity_metric(data):
+    """
+    Get the samples of a performance query result
+
+    Results in the 'csv' format are parsed directly into arrays,
+    which avoids creating an object for each sample.
+
+    Args:
+        data (vim.PerformanceManager.EntityMetricBase): A result of a performance
+                                                        query in either the
+                                                        'normal' or 'csv' format
+
+    Returns:
+        A tuple of the timestamps as seconds since the epoch and a
+        list of (counter key, instance, values) tuples for each series
+
+    """
+    if isinstance(data, pyVmomi.vim.PerformanceManager.EntityMetricCSV):
+        fields = data.sampleInfoCSV.split(',') if data.sampleInfoCSV else []
+        timestamps = [parse_timestamp(t) for t in fields[1::2]]
+        series = [
+            (s.id.counterId, s.id.instance, array('d', map(float, s.value.split(',')) if s.value else ()))
+            for s in data.value or []
+        ]
+    else:
+        timestamps = [s.timestamp.timestamp() for s in data.sampleInfo or []]
+        series = [
+            (s.id.counterId, s.id.instance, array('d', s.value))
+            for s in data.value or []
+        ]
+
+    return timestamps, series
+
+
+def sample_count(data):
+    """
+    Get the number of samples of a performance query result
+
+    Args:
+        data (vim.PerformanceManager.EntityMetricBase): A result of a performance query
+
+    """
+    if isinstance(data, pyVmomi.vim.PerformanceManager.EntityMetricCSV):
+        return (data.sampleInfoCSV.count(',') + 1) // 2 if data.sampleInfoCSV else 0
+
+    return len(data.sampleInfo or [])
+
+
+class RingBuffer(object):
+    def __init__(self, capacity, typecode='d'):
+        """
+        Fixed capacity buffer of numbers
+
+        The numbers are kept in a preallocated array. Once the
+        buffer is full the oldest numbers are overwritten.
+
+        Args:
+            capacity  (int): Max number of values kept in the buffer
+            typecode  (str): Type code of the array, see the array module
+
+        """
+        self.capacity = capacity
+        self.total = 0
+        self._data = array(typecode, bytes(array(typecode).itemsize * capacity))
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def extend(self, values):
+        """
+        Append values to the buffer
+
+        Args:
+            values (iterable): The values to append
+
+        """
+        values = array(self._data.typecode, values)
+        if len(values) > self.capacity:
+            self.total += len(values) - self.capacity
+            values = values[-self.capacity:]
+
+        start = self.total % self.capacity
+        head = min(len(values), self.capacity - start)
+        self._data[start:start + head] = values[:head]
+        self._data[:len(values) - head] = values[head:]
+        self.total += len(values)
+
+    def since(self, position):
+        """
+        Get the values appended after a given position
+
+        Positions count all values ever appended to the buffer,
+        which lets readers keep track of the values they have read.
+        Values which have been overwritten are not returned.
+
+        Args:
+            position (int): Number of values appended before the returned ones
+
+        Returns:
+            An array of the values
+
+        """
+        position = max(position, self.total - len(self))
+        if position >= self.total:
+            return array(self._data.typecode)
+
+        start = position % self.capacity
+        end = self.total % self.capacity
+        if start < end:
+            return self._data[start:end]
+
+        return self._data[start:] + self._data[:end]
+
+    def values(self):
+        """
+        Get all values in the buffer from the oldest to the newest
+
+        """
+        return self.since(0)
+
+    def last(self):
+        """
+        Get the newest value, or None if the buffer is empty
+
+        """
+        if not self.total:
+            return None
+
+        return self._data[(self.total - 1) % self.capacity]
+
+
+class Series(object):
+    def __init__(self, name, capacity=DEFAULT_CAPACITY, scale=1.0):
+        """
+        Samples of a counter instance
+
+        Timestamps are kept as seconds since the epoch. Values are
+        kept as received; readers multiply them by the scale factor
+        when they are displayed or exported.
+
+        Args:
+            name       (str): Name of the series, i.e. the counter instance
+            capacity   (int): Max number of samples kept
+            scale    (float): Factor by which values are scaled for display
+
+        """
+        self.name = name
+        self.scale = scale
+        self.timestamps = RingBuffer(capacity)
+        self.values = RingBuffer(capacity)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def total(self):
+        return self.values.total
+
+    def extend(self, timestamps, values):
+        """
+        Append samples to the series
+
+        Samples which are not newer than the newest sample
+        of the series are skipped, so that samples retrieved
+        more than once are appended only once.
+
+        Args:
+            timestamps (list): Timestamps of the samples as seconds since the epoch
+            values     (list): Values of the samples
+
+        """
+        with self._lock:
+            newest = self.timestamps.last()
+            skip = 0
+            if newest is not None:
+                while skip < len(timestamps) and timestamps[skip] <= newest:
+                    skip += 1
+
+            self.timestamps.extend(timestamps[skip:])
+            self.values.extend(values[skip:])
+
+    def since(self, position):
+        """
+        Get the samples appended after a given position
+
+        The samples and the position to read from next are taken
+        at once, so that samples appended concurrently by another
+        thread are neither returned twice nor skipped.
+
+        Args:
+            position (int): Number of samples appended before the returned ones
+
+        Returns:
+            A tuple of arrays of the timestamps and values, and the
+            number of samples appended to the series so far
+
+        """
+        with self._lock:
+            return self.timestamps.since(position), self.values.since(position), self.total
+
+
+class SampleStore(object):
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        Store of the series of performance samples
+
+        Series are kept per entity, counter and instance, so that
+        the samples of a counter instance are retrieved only once
+        and can be read by any widget.
+
+        Args:
+            capacity (int): Max number of samples kept per series
+
+        """
+        self.capacity = capacity
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def series(self, entity, counter, instance):
+        """
+        Get a series, creating it if it does not exist
+
+        Args:
+            entity                  (vim.ManagedEntity): A managed entity
+            counter (vim.PerformanceManager.CounterInfo): The counter of the series
+            instance                              (str): The counter instance
+
+        Returns:
+            A Series instance
+
+        """
+        key = (entity._moId, counter.key, instance)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = Series(
+                    name=instance,
+                    capacity=self.capacity,
+                    scale=unit_scale(counter)
+                )
+                self._series[key] = series
+
+            return series
+
+    def get(self, entity, counter_id, instance):
+        """
+        Get a series, or None if it does not exist
+
+        Args:
+            entity (vim.ManagedEntity): A managed entity
+            counter_id           (int): Key of the counter
+            instance             (str): The counter instance
+
+        """
+        with self._lock:
+            return self._series.get((entity._moId, counter_id, instance))
+
+    def add(self, data, counters):
+        """
+        Add the samples of a performance query result
+
+        Args:
+            data (vim.PerformanceManager.EntityMetricBase): A result of a performance
+                                                            query in either the
+                                                            'normal' or 'csv' format
+            counters                              (dict): A mapping of counter keys
+                                                          and CounterInfo instances
+
+        Returns:
+            A list of the Series instances the samples were added to
+
+        """
+        timestamps, values = parse_entity_metric(data)
+        result = []
+        for counter_id, instance, series_values in values:
+            counter = counters.get(counter_id)
+            if counter is None:
+                continue
+            series = self.series(data.entity, counter, instance)
+            series.extend(timestamps, series_values)
+            result.append(series)
+
+        return result
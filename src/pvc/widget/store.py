@@ -0,0 +1,387 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Inventory Store Module
+
+"""
+
+import sys
+
+from array import array
+
+__all__ = ['InventoryStore', 'InventoryRow', 'InventoryItems']
+
+# Properties with a small set of known values, which are stored
+# as small integers instead of one object reference per row.
+# New values seen for these properties are appended to the
+# list of known values of the store.
+ENUM_PROPERTIES = {
+    'overallStatus': ('gray', 'green', 'yellow', 'red'),
+    'runtime.powerState': ('poweredOff', 'poweredOn', 'suspended'),
+    'runtime.connectionState': ('connected', 'disconnected', 'notResponding'),
+    'summary.accessible': (False, True),
+}
+
+# Code used for unset enum properties, properties with more
+# known values are stored as plain values instead
+_UNSET = 255
+
+
+class InventoryRow(object):
+    """
+    A lightweight view of a single row in an inventory store
+
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        """
+        Args:
+            store (InventoryStore): The inventory store
+            index            (int): Index of the row in the store
+
+        """
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, path):
+        return self.store.value(self.index, path)
+
+    def get(self, path, default=None):
+        value = self.store.value(self.index, path)
+        return default if value is None else value
+
+    @property
+    def obj(self):
+        return self.store.objects[self.index]
+
+    @property
+    def tag(self):
+        return self.store.tags()[self.index]
+
+
+class InventoryItems(object):
+    """
+    A sequence of items created on demand from an inventory store
+
+    """
+    __slots__ = ('store', 'factory', 'prefix')
+
+    def __init__(self, store, factory, prefix=''):
+        """
+        Args:
+            store (InventoryStore): The inventory store
+            factory     (callable): A callable which creates an item from
+                                    an InventoryRow instance, e.g. a MenuItem
+            prefix           (str): Prefix of the row tags used as item tags
+
+        """
+        self.store = store
+        self.factory = factory
+        self.prefix = prefix
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        return self.factory(self.store[index])
+
+    def __iter__(self):
+        for row in self.store:
+            yield self.factory(row)
+
+    def tags(self):
+        """
+        Get the tags of the items without creating them
+
+        """
+        if not self.prefix:
+            return self.store.tags()
+
+        return [self.prefix + tag for tag in self.store.tags()]
+
+
+class InventoryStore(object):
+    def __init__(self, path_set):
+        """
+        Columnar store for properties of managed objects
+
+        Each property is kept in a separate column. String values
+        are interned and enumerated properties, e.g. power and
+        connection states are stored as small integers in an array.
+        Rows are materialized as InventoryRow views on demand.
+
+        Args:
+            path_set (list): List of properties kept in the store
+
+        """
+        self.path_set = path_set
+        self.objects = []
+        self._columns = {}
+        self._enums = {}
+        self._index = {}
+        self._tags = None
+        self._tag_index = None
+
+        for path in self.path_set:
+            if path in ENUM_PROPERTIES:
+                self._enums[path] = list(ENUM_PROPERTIES[path])
+                self._columns[path] = array('B')
+            else:
+                self._columns[path] = []
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.objects)
+        if not 0 <= index < len(self.objects):
+            raise IndexError('Inventory store index out of range')
+
+        return InventoryRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.objects)):
+            yield InventoryRow(self, index)
+
+    def _encode(self, path, value):
+        """
+        Encode a value of an enumerated property
+
+        Returns:
+            The code of the value, or None if the property has
+            more known values than can be encoded
+
+        """
+        if value is None:
+            return _UNSET
+
+        values = self._enums[path]
+        try:
+            return values.index(value)
+        except ValueError:
+            if len(values) >= _UNSET:
+                return None
+            values.append(value)
+            return len(values) - 1
+
+    def _decode_column(self, path):
+        """
+        Store the values of an enumerated property as a plain column
+
+        Used when a property turns out to have too many
+        distinct values to be stored as small integers.
+
+        """
+        column = self._columns[path]
+        self._columns[path] = [self.value(index, path) for index in range(len(column))]
+        del self._enums[path]
+
+    def append(self, properties):
+        """
+        Append the properties of a managed object to the store
+
+        Args:
+            properties (dict): Properties of a managed object in the format
+                               returned by VConnector.collect_properties(),
+                               including the managed object ref
+
+        """
+        obj = properties['obj']
+        self._index[obj._moId] = len(self.objects)
+        self._tags = None
+        self._tag_index = None
+        self.objects.append(obj)
+
+        for path, column in self._columns.items():
+            value = properties.get(path)
+            if path in self._enums:
+                code = self._encode(path, value)
+                if code is not None:
+                    column.append(code)
+                    continue
+                self._decode_column(path)
+                column = self._columns[path]
+
+            if isinstance(value, str):
+                column.append(sys.intern(value))
+            else:
+                column.append(value)
+
+    def extend(self, properties):
+        """
+        Append the properties of multiple managed objects to the store
+
+        Args:
+            properties (iterable): Properties of managed objects
+
+        """
+        for p in properties:
+            self.append(p)
+
+    def update(self, properties):
+        """
+        Update the properties of a managed object in the store
+
+        Only the properties present in the given properties are
+        updated. Managed objects not yet in the store are appended.
+
+        Args:
+            properties (dict): Properties of a managed object in the format
+                               returned by VConnector.collect_properties(),
+                               including the managed object ref
+
+        """
+        index = self._index.get(properties['obj']._moId)
+        if index is None:
+            self.append(properties)
+            return
+
+        self._tags = None
+        self._tag_index = None
+
+        for path in self._columns:
+            if path not in properties:
+                continue
+
+            value = properties[path]
+            if path in self._enums:
+                code = self._encode(path, value)
+                if code is not None:
+                    self._columns[path][index] = code
+                    continue
+                self._decode_column(path)
+
+            if isinstance(value, str):
+                value = sys.intern(value)
+            self._columns[path][index] = value
+
+    def value(self, index, path):
+        """
+        Get the value of a property for a row
+
+        Args:
+            index (int): Index of the row
+            path  (str): Name of the property
+
+        Returns:
+            The property value, or None if the property is unset
+
+        """
+        value = self._columns[path][index]
+        if path in self._enums:
+            return None if value == _UNSET else self._enums[path][value]
+
+        return value
+
+    def get(self, moid):
+        """
+        Get a row by the id of its managed object
+
+        Args:
+            moid (str): Managed object id, e.g. 'vm-42'
+
+        Returns:
+            An InventoryRow instance, or None if not found
+
+        """
+        index = self._index.get(moid)
+        if index is None:
+            return None
+
+        return InventoryRow(self, index)
+
+    def tags(self, path='name'):
+        """
+        Get unique tags for the rows of the store
+
+        Tags are the values of the given property. Rows which share
+        the same value, e.g. virtual machines with the same name in
+        different datacenters have their managed object id appended.
+
+        The tags and the index used by find() are built once and
+        kept until new rows are appended to the store.
+
+        Args:
+            path (str): Name of the property to use for tags
+
+        Returns:
+            A list of tags, one for each row
+
+        """
+        if self._tags is not None:
+            return self._tags
+
+        values = [self.value(index, path) for index in range(len(self.objects))]
+        counts = {}
+        for value in values:
+            counts[value] = counts.get(value, 0) + 1
+
+        self._tags = [
+            value if counts[value] == 1 else '{} ({})'.format(value, obj._moId)
+            for value, obj in zip(values, self.objects)
+        ]
+        self._tag_index = {
+            tag: obj._moId for tag, obj in zip(self._tags, self.objects)
+        }
+
+        return self._tags
+
+    def find(self, tag):
+        """
+        Find a row by its tag
+
+        Args:
+            tag (str): A tag as returned by tags()
+
+        Returns:
+            An InventoryRow instance, or None if not found
+
+        """
+        self.tags()
+        moid = self._tag_index.get(tag)
+        if moid is None:
+            return None
+
+        return self.get(moid)
+
+    def items(self, factory, prefix=''):
+        """
+        Create a sequence of items from the store rows on demand
+
+        The items are expected to be tagged with the row tags,
+        optionally prefixed with the given prefix.
+
+        Args:
+            factory (callable): A callable which creates an item from
+                                an InventoryRow instance
+            prefix       (str): Prefix of the row tags used as item tags
+
+        Returns:
+            An InventoryItems instance
+
+        """
+        return InventoryItems(self, factory, prefix)
@@ -0,0 +1,932 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+HTTP Transfer Module
+
+"""
+
+import os
+import gzip
+import time
+import json
+import hashlib
+import collections
+import threading
+import urllib.parse
+import concurrent.futures
+
+import pyVmomi
+import requests
+
+import pvc.widget.environ
+
+__all__ = [
+    'create_session', 'device_url', 'datastore_url', 'run_concurrently', 'compress_block',
+    'TokenBucket', 'FileWriter', 'CompressingWriter', 'FileReader', 'OrderedHasher',
+    'TransferState', 'Download', 'Upload', 'LeaseKeepAlive'
+]
+
+# Max number of concurrent HTTP requests per transfer
+DEFAULT_WORKERS = pvc.widget.environ.getint('PVC_TRANSFER_WORKERS', 4)
+
+# Size of the chunks read from the HTTP responses
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Size of the byte ranges fetched in parallel
+DEFAULT_RANGE_SIZE = 64 * 1024 * 1024
+
+# Max number of bytes received out of order kept in memory for hashing
+DEFAULT_HASH_BUFFER = 64 * 1024 * 1024
+
+# Size of the blocks compressed independently
+DEFAULT_COMPRESS_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Size of the blocks checked for zeros by sparse writers
+SPARSE_BLOCK_SIZE = 64 * 1024
+ZERO_BLOCK = bytes(SPARSE_BLOCK_SIZE)
+
+
+def create_session(agent, pool_size=DEFAULT_WORKERS):
+    """
+    Create an HTTP session for transferring files
+
+    The session keeps a pool of connections to the host, which
+    are reused by all requests made through the session.
+
+    Args:
+        agent (VConnector): A VConnector instance
+        pool_size    (int): Max number of connections kept in the pool
+
+    Returns:
+        A requests.Session instance
+
+    """
+    session = requests.Session()
+    session.verify = False
+
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    # Authenticate the requests with the session of the agent
+    cookie = agent.si._stub.cookie
+    if cookie:
+        session.headers['Cookie'] = cookie.split(';')[0]
+
+    return session
+
+
+def device_url(agent, url):
+    """
+    Get the URL of an HttpNfcLease device
+
+    Device URLs returned by vCenter servers contain '*' in place
+    of the host name, which is replaced with the host of the agent.
+
+    Args:
+        agent (VConnector): A VConnector instance
+        url          (str): The device URL
+
+    """
+    return url.replace('://*/', '://{}/'.format(agent.host), 1)
+
+
+def datastore_url(agent, datacenter, datastore, path):
+    """
+    Get the URL of a file on a datastore
+
+    Files are served by the /folder HTTP endpoint of the host,
+    which supports both downloading and uploading of files.
+
+    Args:
+        agent (VConnector): A VConnector instance
+        datacenter   (str): Inventory path of the datacenter
+        datastore    (str): Name of the datastore
+        path         (str): Path to the file on the datastore
+
+    """
+    return 'https://{}/folder/{}?{}'.format(
+        agent.host,
+        urllib.parse.quote(path),
+        urllib.parse.urlencode({'dcPath': datacenter, 'dsName': datastore})
+    )
+
+
+def run_concurrently(calls, max_workers, on_poll=None, interval=0.5):
+    """
+    Run callables concurrently in a pool of threads
+
+    Callables which have not started yet are cancelled as soon
+    as one of the callables fails.
+
+    Args:
+        calls         (list): A list of callables
+        max_workers    (int): Max number of callables running at once
+        on_poll   (callable): A callable called periodically until all
+                              callables complete
+        interval     (float): Number of seconds between calls to on_poll
+
+    Raises:
+        The first exception raised by a callable
+
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(call) for call in calls}
+        try:
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending,
+                    timeout=interval,
+                    return_when=concurrent.futures.FIRST_EXCEPTION
+                )
+                for future in done:
+                    future.result()
+                if on_poll:
+                    on_poll()
+        except Exception:
+            for future in pending:
+                future.cancel()
+            raise
+
+
+class TokenBucket(object):
+    def __init__(self, rate, burst=None):
+        """
+        Limits the rate of transferred bytes
+
+        A single bucket can be shared by multiple transfers in
+        order to limit their total bandwidth.
+
+        Args:
+            rate  (int): Max number of bytes per second
+            burst (int): Max number of bytes transferred at once
+                         after being idle. Defaults to one second
+                         worth of bytes
+
+        """
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, count):
+        """
+        Take tokens for transferring bytes
+
+        Blocks until the bytes can be transferred without exceeding the rate.
+
+        Args:
+            count (int): Number of bytes being transferred
+
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+            self.timestamp = now
+            self.tokens -= count
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if delay:
+            time.sleep(delay)
+
+
+class FileWriter(object):
+    sequential = False
+
+    def __init__(self, path, offset=0, size=None, sparse=False):
+        """
+        Writes data at given positions of a file
+
+        Data is written with os.pwrite(), so that it is safe
+        to write different parts of the file from multiple threads.
+
+        Sparse writers skip blocks of zeros, which leaves holes in
+        the file instead. Blocks are only skipped in parts of the file
+        known to be empty, i.e. beyond its original size or after it
+        has been truncated.
+
+        Args:
+            path    (str): Path to the file
+            offset  (int): Offset in the file where position zero begins
+            size    (int): If specified data is written only within a region
+                           of this size and the file is never truncated
+            sparse (bool): If True then skip writing blocks of zeros
+
+        """
+        self.path = path
+        self.offset = offset
+        self.size = size
+        self.sparse = sparse
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        # Position from which the file is known to contain only zeros
+        self.empty_from = max(os.fstat(self.fd).st_size - offset, 0)
+
+        # Number of bytes received and actually written
+        self.logical = 0
+        self.physical = 0
+        self._lock = threading.Lock()
+
+    def write(self, position, data):
+        if self.size is not None and position + len(data) > self.size:
+            raise IOError('Data exceeds the size of the region')
+
+        view = memoryview(data)
+        written = 0
+        if not self.sparse or position < self.empty_from:
+            self.pwrite(position, view)
+            written = len(view)
+        else:
+            # Write runs of non-zero blocks, skipping the zero blocks
+            start = None
+            for i in range(0, len(view), SPARSE_BLOCK_SIZE):
+                block = view[i:i+SPARSE_BLOCK_SIZE]
+                if block == ZERO_BLOCK[:len(block)]:
+                    if start is not None:
+                        self.pwrite(position + start, view[start:i])
+                        written += i - start
+                        start = None
+                elif start is None:
+                    start = i
+            if start is not None:
+                self.pwrite(position + start, view[start:])
+                written += len(view) - start
+
+        with self._lock:
+            self.logical += len(view)
+            self.physical += written
+
+    def pwrite(self, position, view):
+        position += self.offset
+        while view:
+            written = os.pwrite(self.fd, view, position)
+            view = view[written:]
+            position += written
+
+    def read(self, position, size):
+        return os.pread(self.fd, size, self.offset + position)
+
+    def truncate(self, size):
+        if self.size is None:
+            os.ftruncate(self.fd, self.offset + size)
+            self.empty_from = min(self.empty_from, size)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def compress_block(data, level):
+    """
+    Compress a block of data into a gzip member
+
+    Args:
+        data (bytes): The data to compress
+        level  (int): Compression level
+
+    Returns:
+        The compressed data
+
+    """
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class CompressingWriter(object):
+    # Files written by the writer cannot be split into byte ranges
+    sequential = True
+
+    def __init__(self, path, executor, offset=0, size=None, algorithms=(),
+                 level=6, block_size=DEFAULT_COMPRESS_BLOCK_SIZE, max_pending=8):
+        """
+        Writes data compressed with gzip into a file
+
+        The data is split into blocks, which are compressed into
+        independent gzip members by a pool of processes. Members are
+        written in order, which results in a valid multi-member gzip
+        file. Data needs to be written sequentially.
+
+        Args:
+            path                 (str): Path to the file
+            executor (concurrent.futures.Executor): Pool compressing the blocks
+            offset               (int): Offset in the file where the data begins
+            size                 (int): If specified the compressed data is written
+                                        only within a region of this size
+            algorithms          (list): Names of hash algorithms used to compute
+                                        digests of the compressed data
+            level                (int): Compression level
+            block_size           (int): Size of the compressed blocks
+            max_pending          (int): Max number of blocks being compressed at once
+
+        """
+        self.path = path
+        self.executor = executor
+        self.offset = offset
+        self.size = size
+        self.algorithms = algorithms
+        self.level = level
+        self.block_size = block_size
+        self.max_pending = max_pending
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.reset()
+
+    def reset(self):
+        self.buffer = bytearray()
+        self.pending = collections.deque()
+        self.hashes = [hashlib.new(name) for name in self.algorithms]
+        self.digests = {}
+        self.logical = 0
+        self.physical = 0
+
+    def write(self, position, data):
+        if position != self.logical:
+            raise IOError('Compressed data needs to be written sequentially')
+
+        self.logical += len(data)
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+
+    def submit(self, block):
+        if len(self.pending) >= self.max_pending:
+            self.write_compressed(self.pending.popleft().result())
+
+        self.pending.append(self.executor.submit(compress_block, block, self.level))
+
+    def write_compressed(self, data):
+        if self.size is not None and self.physical + len(data) > self.size:
+            raise IOError('Data exceeds the size of the region')
+
+        view = memoryview(data)
+        position = self.offset + self.physical
+        while view:
+            written = os.pwrite(self.fd, view, position)
+            view = view[written:]
+            position += written
+
+        for h in self.hashes:
+            h.update(data)
+        self.physical += len(data)
+
+    def read(self, position, size):
+        raise IOError('Compressed data cannot be read back')
+
+    def truncate(self, size):
+        # Restart writing from the beginning, e.g. when a download is restarted
+        if size == 0:
+            for future in self.pending:
+                future.cancel()
+            self.reset()
+            if self.size is None:
+                os.ftruncate(self.fd, self.offset)
+        elif size != self.logical:
+            raise IOError('Compressed data cannot be truncated')
+
+    def flush(self):
+        """
+        Compress and write any remaining data
+
+        """
+        if self.buffer:
+            self.submit(bytes(self.buffer))
+            self.buffer = bytearray()
+
+        while self.pending:
+            self.write_compressed(self.pending.popleft().result())
+
+        if self.size is None:
+            os.ftruncate(self.fd, self.offset + self.physical)
+
+        self.digests = {name: h.hexdigest() for name, h in zip(self.algorithms, self.hashes)}
+
+    def close(self):
+        for future in self.pending:
+            future.cancel()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class FileReader(object):
+    def __init__(self, path, offset=0, size=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Reads a region of a file in chunks
+
+        Used as the body of upload requests. The region can be for
+        example a member of a tar archive, which is read in place.
+
+        Args:
+            path       (str): Path to the file
+            offset     (int): Offset in the file where the region begins
+            size       (int): Size of the region, or None for the rest of the file
+            chunk_size (int): Size of the chunks read from the file
+
+        """
+        self.path = path
+        self.offset = offset
+        self.chunk_size = chunk_size
+        self.fd = os.open(path, os.O_RDONLY)
+        self.size = size if size is not None else os.fstat(self.fd).st_size - offset
+        self.position = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        self.position = 0
+        while self.position < self.size:
+            data = os.pread(
+                self.fd,
+                min(self.chunk_size, self.size - self.position),
+                self.offset + self.position
+            )
+            if not data:
+                raise IOError('Unexpected end of file {}'.format(self.path))
+            self.position += len(data)
+            yield data
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class OrderedHasher(object):
+    def __init__(self, algorithms, reader, max_buffer=DEFAULT_HASH_BUFFER):
+        """
+        Computes digests of data arriving out of order
+
+        Data arriving in order is hashed right away. Data arriving
+        ahead of the hashed position is kept in memory up to
+        'max_buffer' bytes and hashed once the data before it
+        arrives. Data which did not fit in memory is read back from
+        the written file instead, while it is still in the page cache.
+
+        Args:
+            algorithms (list): Names of the hash algorithms, e.g. 'sha1'
+            reader (callable): A callable returning the written data
+                               given its position and size
+            max_buffer  (int): Max number of bytes kept in memory
+
+        """
+        self.algorithms = algorithms
+        self.reader = reader
+        self.max_buffer = max_buffer
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Start hashing again from the beginning
+
+        """
+        self.hashes = [hashlib.new(name) for name in self.algorithms]
+        self.position = 0
+        self.buffered = {}
+        self.buffered_size = 0
+        self.written = {}
+
+    def hash(self, data):
+        for h in self.hashes:
+            h.update(data)
+        self.position += len(data)
+
+    def update(self, position, data):
+        """
+        Update the digests with data written at the given position
+
+        """
+        with self.lock:
+            if position == self.position:
+                self.hash(data)
+                self.drain()
+            elif self.buffered_size + len(data) <= self.max_buffer:
+                self.buffered[position] = data
+                self.buffered_size += len(data)
+            else:
+                self.written[position] = len(data)
+
+    def drain(self):
+        while True:
+            if self.position in self.buffered:
+                data = self.buffered.pop(self.position)
+                self.buffered_size -= len(data)
+                self.hash(data)
+            elif self.position in self.written:
+                self.hash(self.reader(self.position, self.written.pop(self.position)))
+            else:
+                break
+
+    def hexdigests(self, size):
+        """
+        Get the digests of the data
+
+        Data which has not been passed to the hasher, e.g. byte
+        ranges completed before a download was resumed, is read
+        back from the written file.
+
+        Args:
+            size (int): Size of the data
+
+        Returns:
+            A dict of the algorithm names and hex digests
+
+        """
+        with self.lock:
+            self.buffered = {}
+            self.buffered_size = 0
+            self.written = {}
+            while self.position < size:
+                data = self.reader(self.position, min(DEFAULT_CHUNK_SIZE, size - self.position))
+                if not data:
+                    raise IOError('Unexpected end of file while hashing')
+                self.hash(data)
+
+        return {name: h.hexdigest() for name, h in zip(self.algorithms, self.hashes)}
+
+
+class TransferState(object):
+    def __init__(self, path, size):
+        """
+        Completed byte ranges of a transfer
+
+        The state is saved in a sidecar file, so that a transfer
+        can be resumed after a failure by skipping the byte
+        ranges which have already been completed.
+
+        Args:
+            path (str): Path to the state file
+            size (int): Size of the transferred file
+
+        """
+        self.path = path
+        self.size = size
+        self.done = set()
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+        Load the state from the state file
+
+        The state is discarded if it was saved for a file of
+        different size.
+
+        """
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except ValueError:
+            return
+
+        if state.get('size') == self.size:
+            self.done = {tuple(r) for r in state.get('done', [])}
+
+    def is_done(self, start, end):
+        return (start, end) in self.done
+
+    def mark_done(self, start, end):
+        with self.lock:
+            self.done.add((start, end))
+            state = {'size': self.size, 'done': sorted(self.done)}
+
+            tmp_path = '{}.tmp'.format(self.path)
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class Download(object):
+    def __init__(self, session, url, writer, state_path=None, algorithms=(), throttle=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, range_size=DEFAULT_RANGE_SIZE, retries=3):
+        """
+        Download of a file over HTTP
+
+        Files served with a known size and support for byte range
+        requests are split into ranges, which can be fetched in
+        parallel and are resumed after a failure. Other files are
+        streamed with a single request and restarted after a failure.
+
+        Args:
+            session (requests.Session): The HTTP session to use
+            url                  (str): URL of the file
+            writer        (FileWriter): Writer of the downloaded data
+            state_path           (str): Path to the state file used to
+                                        resume byte range downloads
+            algorithms          (list): Names of hash algorithms used to compute
+                                        digests of the file while downloading
+            throttle     (TokenBucket): Limits the download bandwidth
+            chunk_size           (int): Size of the chunks read from responses
+            range_size           (int): Size of the byte ranges
+            retries              (int): Max number of retries of a failed part
+
+        """
+        self.session = session
+        self.url = url
+        self.writer = writer
+        self.state_path = state_path
+        self.chunk_size = chunk_size
+        self.range_size = range_size
+        self.retries = retries
+        self.throttle = throttle
+
+        self.size = None
+        self.state = None
+        self.transferred = 0
+        self.digests = {}
+        self.hasher = None
+        self._lock = threading.Lock()
+
+        if algorithms:
+            self.hasher = OrderedHasher(algorithms=algorithms, reader=writer.read)
+
+    def probe(self):
+        """
+        Find out the size of the file and whether ranges are supported
+
+        Returns:
+            A tuple of the file size, or None if unknown and a
+            boolean indicating whether byte ranges are supported
+
+        """
+        try:
+            r = self.session.head(self.url, allow_redirects=True)
+        except requests.RequestException:
+            return None, False
+
+        if r.status_code != 200:
+            return None, False
+
+        size = r.headers.get('Content-Length')
+        ranged = r.headers.get('Accept-Ranges') == 'bytes'
+
+        return (int(size) if size else None), ranged
+
+    def parts(self):
+        """
+        Split the download into parts
+
+        Returns:
+            A list of (start, end) byte ranges still to be fetched,
+            or a list with a single None part if the file is streamed
+
+        """
+        if self.writer.sequential:
+            return [None]
+
+        size, ranged = self.probe()
+        if not (size and ranged):
+            return [None]
+
+        self.size = size
+
+        if self.state_path:
+            self.state = TransferState(path=self.state_path, size=size)
+            self.state.load()
+
+        # Discard data of a previous download which cannot be resumed
+        if not (self.state and self.state.done):
+            self.writer.truncate(0)
+        self.writer.truncate(size)
+
+        parts = []
+        for start in range(0, size, self.range_size):
+            end = min(start + self.range_size, size)
+            if self.state and self.state.is_done(start, end):
+                self.add_transferred(end - start)
+            else:
+                parts.append((start, end))
+
+        return parts
+
+    def add_transferred(self, count):
+        with self._lock:
+            self.transferred += count
+
+    def fetch(self, part):
+        """
+        Fetch a part of the download, retrying on failures
+
+        A failed byte range is resumed from the last written position,
+        while a failed stream is fetched again from the beginning.
+
+        Args:
+            part (tuple): A (start, end) byte range or None
+
+        """
+        attempt = 0
+        position = None if part is None else part[0]
+
+        while True:
+            try:
+                if part is None:
+                    self.fetch_stream()
+                    return
+
+                for position in self.iter_range(position, part[1]):
+                    pass
+                if position < part[1]:
+                    raise IOError('Byte range ended prematurely')
+                if self.state:
+                    self.state.mark_done(*part)
+                return
+            except (requests.RequestException, IOError):
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+
+    def fetch_stream(self):
+        """
+        Fetch the whole file with a single request
+
+        """
+        position = 0
+        self.writer.truncate(0)
+        if self.hasher:
+            self.hasher.reset()
+
+        try:
+            r = self.session.get(self.url, stream=True)
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=self.chunk_size):
+                if chunk:
+                    self.writer.write(position, chunk)
+                    if self.hasher:
+                        self.hasher.update(position, chunk)
+                    position += len(chunk)
+                    self.add_transferred(len(chunk))
+                    if self.throttle:
+                        self.throttle.consume(len(chunk))
+        except Exception:
+            # The stream will be fetched again from the beginning
+            self.add_transferred(-position)
+            raise
+
+        self.writer.truncate(position)
+        self.size = position
+
+    def iter_range(self, start, end):
+        """
+        Fetch a byte range of the file
+
+        Args:
+            start (int): First byte of the range
+            end   (int): Byte after the end of the range
+
+        Yields:
+            The position up to which the range has been written
+
+        """
+        headers = {'Range': 'bytes={}-{}'.format(start, end - 1)}
+        r = self.session.get(self.url, headers=headers, stream=True)
+        r.raise_for_status()
+
+        if r.status_code != 206:
+            raise IOError('Server ignored the byte range request')
+
+        position = start
+        for chunk in r.iter_content(chunk_size=self.chunk_size):
+            if not chunk:
+                continue
+            chunk = chunk[:end - position]
+            self.writer.write(position, chunk)
+            if self.hasher:
+                self.hasher.update(position, chunk)
+            position += len(chunk)
+            self.add_transferred(len(chunk))
+            if self.throttle:
+                self.throttle.consume(len(chunk))
+            yield position
+
+    def close(self):
+        """
+        Close the download, keeping its state for resuming it later
+
+        """
+        self.writer.close()
+
+    def finish(self):
+        """
+        Finish the download and remove its state file
+
+        """
+        self.writer.flush()
+        if self.hasher:
+            self.digests = self.hasher.hexdigests(self.size)
+        self.close()
+        if self.state:
+            self.state.remove()
+
+
+class Upload(object):
+    def __init__(self, session, url, reader, method='PUT', content_type='application/octet-stream'):
+        """
+        Upload of a file over HTTP
+
+        The file is streamed with a single request.
+
+        Args:
+            session (requests.Session): The HTTP session to use
+            url                  (str): URL to upload the file to
+            reader        (FileReader): Reader of the file
+            method               (str): HTTP method to use
+            content_type         (str): Content type of the file
+
+        """
+        self.session = session
+        self.url = url
+        self.reader = reader
+        self.method = method
+        self.content_type = content_type
+
+    @property
+    def transferred(self):
+        return self.reader.position
+
+    def run(self):
+        headers = {
+            'Content-Type': self.content_type,
+            'Content-Length': str(len(self.reader)),
+        }
+
+        try:
+            r = self.session.request(
+                self.method,
+                self.url,
+                data=self.reader,
+                headers=headers
+            )
+            r.raise_for_status()
+        finally:
+            self.reader.close()
+
+
+class LeaseKeepAlive(threading.Thread):
+    def __init__(self, lease, progress, interval=15):
+        """
+        Lease Keep Alive Thread
+
+        Periodically reports the progress of an HttpNfcLease,
+        which keeps the lease from timing out while files are
+        being transferred.
+
+        Args:
+            lease (vim.HttpNfcLease): The lease to keep alive
+            progress      (callable): A callable returning the percentage
+                                      of completion of the transfer
+            interval           (int): Number of seconds between progress reports
+
+        """
+        super().__init__()
+        self.daemon = True
+        self.time_to_die = threading.Event()
+
+        self.lease = lease
+        self.progress = progress
+        self.interval = interval
+
+    def run(self):
+        while not self.time_to_die.wait(self.interval):
+            try:
+                self.lease.HttpNfcLeaseProgress(percent=self.progress())
+            except pyVmomi.vmodl.MethodFault:
+                return
+
+    def signal_stop(self):
+        self.time_to_die.set()
@@ -29,6 +29,7 @@ Virtual Machine Widgets
 
 import os
 import platform
+import concurrent.futures
 import time
 import tarfile
 
@@ -37,15 +38,18 @@ import humanize
 import requests
 
 import pvc.widget.alarm
+import pvc.widget.checklist
 import pvc.widget.common
 import pvc.widget.device
 import pvc.widget.debug
+import pvc.widget.environ
 import pvc.widget.event
 import pvc.widget.menu
 import pvc.widget.form
 import pvc.widget.gauge
 import pvc.widget.vnc
 import pvc.widget.network
+import pvc.widget.ovf
 import pvc.widget.performance
 import pvc.widget.radiolist
 
@@ -56,8 +60,11 @@ __all__ = [
     'VirtualMachineActionWidget',
     'VirtualMachineConsoleWidget',
     'VirtualMachinePowerWidget',
+    'VirtualMachineBulkPowerWidget',
     'VirtualMachineExportWidget',
+    'VirtualMachineExportQueueWidget',
     'CreateVirtualMachineWidget',
+    'VirtualMachineImportWidget',
     'VirtualMachineHardwareWidget',
     'VirtualMachineAddHardwareWidget',
     'MigrateVirtualMachineWidget',
@@ -68,6 +75,9 @@ __all__ = [
     'VirtualMachineSnapshotViewWidget',
 ]
 
+# Max number of power operations running at a time in bulk mode
+BULK_MAX_CONCURRENT = pvc.widget.environ.getint('PVC_BULK_CONCURRENCY', 32)
+
 
 class VirtualMachineWidget(object):
     def __init__(self, agent, dialog, obj):
@@ -526,8 +536,374 @@ class VirtualMachinePowerWidget(object):
         self.obj.RebootGuest()
 
 
+class VirtualMachineBulkPowerWidget(object):
+    def __init__(self, agent, dialog, obj, store=None):
+        """
+        Widget for power operations on multiple virtual machines
+
+        Args:
+            agent         (VConnector): A VConnector instance
+            dialog     (dialog.Dialog): A Dialog instance
+            obj    (vim.ManagedEntity): A Managed Entity containing the
+                                        virtual machines, e.g. HostSystem
+            store     (InventoryStore): Already retrieved virtual machines
+                                        with their name and power state
+
+        """
+        self.agent = agent
+        self.dialog = dialog
+        self.obj = obj
+        self.store = store
+        self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
+        self.display()
+
+    def display(self):
+        if self.store is None:
+            self.refresh()
+
+        if not self.store:
+            self.dialog.msgbox(
+                title=self.title,
+                text='No virtual machines found for this managed entity'
+            )
+            return
+
+        items = [
+            pvc.widget.menu.MenuItem(
+                tag='Power On',
+                description='Power On Virtual Machines',
+                on_select=self.power_on
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Power Off',
+                description='Power Off Virtual Machines',
+                on_select=self.run_task,
+                on_select_args=(
+                    'Power Off', 'PowerOff',
+                    pyVmomi.vim.VirtualMachinePowerState.poweredOn,
+                    pyVmomi.vim.VirtualMachinePowerState.suspended
+                )
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Suspend',
+                description='Suspend Virtual Machines',
+                on_select=self.run_task,
+                on_select_args=('Suspend', 'Suspend', pyVmomi.vim.VirtualMachinePowerState.poweredOn)
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Reset',
+                description='Reset Virtual Machines',
+                on_select=self.run_task,
+                on_select_args=('Reset', 'Reset', pyVmomi.vim.VirtualMachinePowerState.poweredOn)
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Shutdown',
+                description='Shutdown Guest Systems',
+                on_select=self.run_guest,
+                on_select_args=('Shutdown', 'ShutdownGuest')
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Reboot',
+                description='Reboot Guest Systems',
+                on_select=self.run_guest,
+                on_select_args=('Reboot', 'RebootGuest')
+            ),
+        ]
+
+        menu = pvc.widget.menu.Menu(
+            items=items,
+            dialog=self.dialog,
+            title=self.title,
+            text='Select an action to be performed on multiple virtual machines'
+        )
+
+        menu.display()
+
+    def refresh(self):
+        """
+        Retrieve the virtual machines and their power state
+
+        """
+        self.dialog.infobox(
+            title=self.title,
+            text='Retrieving information ...'
+        )
+
+        if self.store is not None:
+            # Update the store in place, so that menus displaying
+            # the same store show the current power states as well
+            properties = pvc.widget.common.inventory_properties(
+                agent=self.agent,
+                obj_type=pyVmomi.vim.VirtualMachine,
+                path_set=['runtime.powerState'],
+                objects=self.store.objects
+            )
+            for p in properties:
+                self.store.update(p)
+            return
+
+        if hasattr(self.obj, 'vm'):
+            scope = {'objects': self.obj.vm}
+        else:
+            scope = {'container': self.obj}
+
+        self.store = pvc.widget.common.inventory_store(
+            agent=self.agent,
+            obj_type=pyVmomi.vim.VirtualMachine,
+            path_set=['name', 'runtime.powerState'],
+            **scope
+        )
+
+    def select(self, action, rows):
+        """
+        Prompts the user to select the virtual machines
+
+        Args:
+            action (str): Name of the action to be performed
+            rows  (list): A list of InventoryRow instances to select from
+
+        Returns:
+            A list of the selected InventoryRow instances
+
+        """
+        if not rows:
+            self.dialog.msgbox(
+                title=self.title,
+                text='No virtual machines eligible for {}'.format(action)
+            )
+            return []
+
+        items = [
+            pvc.widget.checklist.CheckListItem(tag=row.tag, description=row['runtime.powerState'])
+            for row in rows
+        ]
+
+        checklist = pvc.widget.checklist.CheckList(
+            items=items,
+            dialog=self.dialog,
+            title=self.title,
+            text='Select virtual machine(s) for {}'.format(action)
+        )
+
+        checklist.display()
+        selected = set(checklist.selected())
+
+        if not selected:
+            return []
+
+        code = self.dialog.yesno(
+            title=self.title,
+            text='{} {} virtual machine(s)?'.format(action, len(selected))
+        )
+
+        if code in (self.dialog.ESC, self.dialog.CANCEL):
+            return []
+
+        return [row for row in rows if row.tag in selected]
+
+    def summary(self, action, results):
+        """
+        Display a summary of the results
+
+        Args:
+            action   (str): Name of the performed action
+            results (list): A list of (label, error) tuples
+
+        """
+        failed = [(label, error) for label, error in results if error is not None]
+
+        text = '{}: {} succeeded, {} failed\n'.format(
+            action,
+            len(results) - len(failed),
+            len(failed)
+        )
+        for label, error in failed:
+            text += '\n{}: {}'.format(label, getattr(error, 'msg', None) or error)
+
+        self.dialog.scrollbox(
+            title=self.title,
+            text=text
+        )
+
+        # Power states have changed, get the current ones
+        self.refresh()
+
+    def datacenter(self):
+        """
+        Get the datacenter of the managed entity
+
+        Returns:
+            A vim.Datacenter instance, or None if not found
+
+        """
+        obj = self.obj
+        while obj is not None and not isinstance(obj, pyVmomi.vim.Datacenter):
+            obj = getattr(obj, 'parent', None)
+
+        return obj
+
+    def power_on(self):
+        """
+        Power on virtual machines
+
+        The virtual machines are powered on with a single
+        Datacenter.PowerOnMultiVM_Task() call, which also lets
+        DRS place them when they are part of a cluster.
+
+        """
+        rows = [
+            row for row in self.store
+            if row['runtime.powerState'] != pyVmomi.vim.VirtualMachinePowerState.poweredOn
+        ]
+        selected = self.select('Power On', rows)
+        if not selected:
+            return
+
+        datacenter = self.datacenter()
+        if datacenter is None:
+            self.run_tasks('Power On', selected, 'PowerOn')
+            return
+
+        task = datacenter.PowerOnMultiVM_Task(vm=[row.obj for row in selected])
+        gauge = pvc.widget.gauge.TaskGauge(
+            dialog=self.dialog,
+            task=task,
+            title=self.title,
+            text='Submitting power on request ...'
+        )
+        gauge.display()
+
+        if task.info.state != pyVmomi.vim.TaskInfoState.success:
+            return
+
+        labels = {row.obj._moId: row.tag for row in selected}
+        results = []
+        tasks = []
+        task_labels = []
+
+        for info in task.info.result.notAttempted:
+            results.append((labels.get(info.vm._moId, info.vm._moId), info.fault.localizedMessage or info.fault.fault))
+
+        for info in task.info.result.attempted:
+            label = labels.get(info.vm._moId, info.vm._moId)
+            if info.task is None:
+                results.append((label, 'Waiting for a DRS recommendation to be applied'))
+                continue
+            tasks.append(info.task)
+            task_labels.append(label)
+
+        gauge = pvc.widget.gauge.MultiTaskGauge(
+            dialog=self.dialog,
+            tasks=tasks,
+            labels=task_labels,
+            title=self.title
+        )
+        results = gauge.display() + results
+
+        self.summary('Power On', results)
+
+    def run_task(self, action, method, *power_states):
+        """
+        Perform a task based power operation on virtual machines
+
+        Args:
+            action        (str): Name of the action
+            method        (str): Name of the vim.VirtualMachine method to call
+            power_states (list): Power states the virtual machines may be in
+
+        """
+        rows = [row for row in self.store if row['runtime.powerState'] in power_states]
+        selected = self.select(action, rows)
+        if selected:
+            self.run_tasks(action, selected, method)
+
+    def run_tasks(self, action, rows, method):
+        """
+        Start tasks for the virtual machines and wait for them to complete
+
+        Args:
+            action (str): Name of the action
+            rows  (list): A list of InventoryRow instances
+            method (str): Name of the vim.VirtualMachine method to call
+
+        """
+        gauge = pvc.widget.gauge.MultiTaskGauge(
+            dialog=self.dialog,
+            tasks=[getattr(row.obj, method) for row in rows],
+            labels=[row.tag for row in rows],
+            max_concurrent=BULK_MAX_CONCURRENT,
+            title=self.title
+        )
+        results = gauge.display()
+
+        self.summary(action, results)
+
+    def run_guest(self, action, method):
+        """
+        Perform a guest power operation on virtual machines
+
+        Guest operations require VMware Tools running and complete
+        without a task, so they are called concurrently from a
+        pool of threads.
+
+        Args:
+            action (str): Name of the action
+            method (str): Name of the vim.VirtualMachine method to call
+
+        """
+        rows = [
+            row for row in self.store
+            if row['runtime.powerState'] == pyVmomi.vim.VirtualMachinePowerState.poweredOn
+        ]
+        selected = self.select(action, rows)
+        if not selected:
+            return
+
+        self.dialog.infobox(
+            title=self.title,
+            text='Retrieving information ...'
+        )
+
+        properties = pvc.widget.common.inventory_properties(
+            agent=self.agent,
+            obj_type=pyVmomi.vim.VirtualMachine,
+            path_set=['guest.toolsRunningStatus'],
+            objects=[row.obj for row in selected]
+        )
+        tools = {
+            p['obj']._moId: p.get('guest.toolsRunningStatus')
+            for p in properties
+        }
+
+        results = []
+        pending = []
+        for row in selected:
+            if tools.get(row.obj._moId) != pyVmomi.vim.VirtualMachineToolsRunningStatus.guestToolsRunning:
+                results.append((row.tag, 'VMware Tools is not running'))
+            else:
+                pending.append(row)
+
+        def call(row):
+            try:
+                getattr(row.obj, method)()
+            except pyVmomi.vmodl.MethodFault as e:
+                return e.msg
+            return None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=BULK_MAX_CONCURRENT) as executor:
+            futures = {executor.submit(call, row): row for row in pending}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                self.dialog.infobox(
+                    title=self.title,
+                    text='{} guest systems ... ({}/{})'.format(action, done, len(pending))
+                )
+                results.append((futures[future].tag, future.result()))
+
+        self.summary(action, results)
+
+
 class VirtualMachineExportWidget(object):
-    def __init__(self, agent, dialog, obj, create_ova):
+    def __init__(self, agent, dialog, obj, create_ova, compress=False):
         """
         Virtual Machine Export Widget
 
@@ -537,12 +913,14 @@ class VirtualMachineExportWidget(object):
             obj    (vim.VirtualMachine): A VirtualMachine managed entity
             create_ova           (bool): If True then export VM into a single OVA file
                                          Otherwise create a folder of files (OVF)
+            compress             (bool): If True then compress the disks with gzip
 
         """
         self.agent = agent
         self.dialog = dialog
         self.obj = obj
         self.create_ova = create_ova
+        self.compress = compress
         self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
         self.display()
 
@@ -581,215 +959,243 @@ class VirtualMachineExportWidget(object):
             path (str): Directory to save the OVF/OVA template
 
         """
-        # TODO: Perform a dry-run and see if creating the
-        #       OVF descriptor succeeds and then proceed with
-        #       downloading the actual VMDK files
-
         self.dialog.infobox(
             title=self.title,
             text='Initializing OVF export ...'
         )
 
-        lease = self.obj.ExportVm()
-
-        while True:
-            if lease.state == pyVmomi.vim.HttpNfcLeaseState.initializing:
-                lease.HttpNfcLeaseProgress(percent=0)
-            elif lease.state == pyVmomi.vim.HttpNfcLeaseState.error:
-                self.dialog.msgbox(
-                    title=self.obj.name,
-                    text=lease.error.msg
-                )
-                lease.HttpNfcLeaseAbort()
-                return
-            elif lease.state == pyVmomi.vim.HttpNfcLeaseState.ready:
-                break
-            time.sleep(0.5)
-
-        percent = 0
-        total_transfered_bytes = 0
-        manifest = []
-        ovf_files = []
-        exported_disks = {}
+        export = pvc.widget.ovf.OvfExport(
+            agent=self.agent,
+            obj=self.obj,
+            path=path,
+            create_ova=self.create_ova,
+            compress=self.compress
+        )
 
         self.dialog.gauge_start(
             title='Exporting OVF template - {}'.format(self.obj.name)
         )
 
-        for url in lease.info.deviceUrl:
-            if not url.disk:  # skip non-vmdk disks
-                continue
-
+        def on_progress(percent, transferred):
             self.dialog.gauge_update(
                 percent=percent,
-                text='Exporting {} ...\n'.format(url.targetId),
+                text='Exporting disks ... ({})\n'.format(humanize.naturalsize(transferred, binary=True)),
                 update_text=True
             )
 
-            if manifest:
-                total_transfered_bytes = sum([m.capacity for m in manifest])
-
-            disk_transfered_bytes = 0
-            disk_file = os.path.join(path, '{}-{}'.format(self.obj.name, url.targetId))
-            r = requests.get(url.url, verify=False, stream=True)
-
-            with open(disk_file, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=512*1024):
-                    if chunk:
-                        disk_transfered_bytes += len(chunk)
-                        percent = round(
-                            (total_transfered_bytes + disk_transfered_bytes) / 1024 /
-                            lease.info.totalDiskCapacityInKB * 100
-                        )
-                        self.dialog.gauge_update(percent=percent)
-                        lease.HttpNfcLeaseProgress(percent=percent)
-                        f.write(chunk)
-
-            m = [me for me in lease.HttpNfcLeaseGetManifest() if me.key == url.key].pop()
-            manifest.append(m)
-
-            of = pyVmomi.vim.OvfManager.OvfFile(
-                capacity=m.capacity,
-                deviceId=m.key,
-                path=os.path.basename(disk_file),
-                populatedSize=m.populatedSize,
-                size=disk_transfered_bytes,
-            )
-            ovf_files.append(of)
-
-            exported_disks[url.key] = url.targetId
-            total_transfered_bytes = sum([me.capacity for me in manifest])
-            percent = round(
-                total_transfered_bytes / 1024 / lease.info.totalDiskCapacityInKB * 100
+        try:
+            export.run(on_progress=on_progress)
+        except (pyVmomi.vmodl.MethodFault, requests.RequestException, IOError) as e:
+            self.dialog.gauge_stop()
+            self.dialog.msgbox(
+                title=self.title,
+                text='Export failed:\n\n{}\n'.format(getattr(e, 'msg', None) or e)
             )
-            self.dialog.gauge_update(percent)
-            lease.HttpNfcLeaseProgress(percent=percent)
+            return
 
-        # Create OVF manifest and descriptor files
         self.dialog.gauge_stop()
-        self.create_manifest_file(
-            path=path,
-            manifest=manifest,
-            disks=exported_disks
-        )
-
-        self.create_ovf_descriptor(
-            path=path,
-            ovf_files=ovf_files
-        )
 
-        lease.HttpNfcLeaseComplete()
-
-        if self.create_ova:
-            self.create_ova_file(
-                path=path,
-                disks=exported_disks.values()
+        for warning in export.warnings:
+            self.dialog.msgbox(
+                title=self.title,
+                text=warning
             )
 
+        logical, physical = export.written()
         self.dialog.msgbox(
             title=self.title,
-            text='Export successful. Files saved in:\n\n{}\n'.format(path)
+            text='Export successful. Files saved in:\n\n{}\n\n'
+                 'Downloaded {}, written {}\n'.format(
+                     path,
+                     humanize.naturalsize(logical, binary=True),
+                     humanize.naturalsize(physical, binary=True)
+                 )
         )
 
-    def create_manifest_file(self, path, manifest, disks):
+
+class VirtualMachineExportQueueWidget(object):
+    FORMATS = (
+        ('OVF', 'Folder of files', False, False),
+        ('OVA', 'Single file archive', True, False),
+        ('OVF (gzip)', 'Folder of files with gzip compressed disks', False, True),
+        ('OVA (gzip)', 'Single file archive with gzip compressed disks', True, True),
+    )
+
+    def __init__(self, agent, dialog, obj):
         """
-        Creates the OVF manifest file
+        Widget for exporting multiple virtual machines
+
+        Exports are queued and run in the background, with a limit
+        on the number of exports running at once, per datastore
+        and per host, as well as on the total download bandwidth.
 
         Args:
-            path      (str): Path to the exported disks
-            manifest (list): A list of vim.HttpNfcLease.ManifestEntry instances
-            disks    (dict): A mapping of the disk keys and target ids
+            agent         (VConnector): A VConnector instance
+            dialog     (dialog.Dialog): A Dialog instance
+            obj    (vim.ManagedEntity): A Managed Entity containing the
+                                        virtual machines, e.g. HostSystem
 
         """
+        self.agent = agent
+        self.dialog = dialog
+        self.obj = obj
+        self.title = '{} ({})'.format(self.obj.name, self.obj.__class__.__name__)
+        self.display()
+
+    def display(self):
         self.dialog.infobox(
             title=self.title,
-            text='Creating OVF manifest ...'
+            text='Retrieving information ...'
         )
 
-        with open(os.path.join(path, '{}.mf'.format(self.obj.name)), 'w') as f:
-            for entry in manifest:
-                f.write('SHA1({}-{})= {}\n'.format(
-                    self.obj.name,
-                    disks[entry.key],
-                    entry.sha1)
-                )
+        if hasattr(self.obj, 'vm'):
+            scope = {'objects': self.obj.vm}
+        else:
+            scope = {'container': self.obj}
 
-    def create_ovf_descriptor(self, path, ovf_files):
-        """
-        Creates the OVF descriptor file
+        store = pvc.widget.common.inventory_store(
+            agent=self.agent,
+            obj_type=pyVmomi.vim.VirtualMachine,
+            path_set=['name', 'runtime.powerState', 'runtime.host', 'datastore'],
+            **scope
+        )
 
-        Args:
-            path       (str): Path to the exported disks
-            ovf_files (list): A list of vim.OvfManager.OvfFile instances
+        rows = [
+            row for row in store
+            if row['runtime.powerState'] == pyVmomi.vim.VirtualMachinePowerState.poweredOff
+        ]
 
-        """
-        self.dialog.infobox(
+        if not rows:
+            self.dialog.msgbox(
+                title=self.title,
+                text='No powered off virtual machines found for this managed entity'
+            )
+            return
+
+        items = [
+            pvc.widget.checklist.CheckListItem(tag=row.tag, description=row['runtime.powerState'])
+            for row in rows
+        ]
+
+        checklist = pvc.widget.checklist.CheckList(
+            items=items,
+            dialog=self.dialog,
             title=self.title,
-            text='Creating OVF descriptor ...'
+            text='Select virtual machine(s) to export'
         )
 
-        cdp = pyVmomi.vim.OvfManager.CreateDescriptorParams(
-            ovfFiles=ovf_files
-        )
+        checklist.display()
+        selected = set(checklist.selected())
 
-        dr = self.agent.si.content.ovfManager.CreateDescriptor(
-            obj=self.obj,
-            cdp=cdp
+        if not selected:
+            return
+
+        export_format = self.select_format()
+        if export_format is None:
+            return
+
+        code, path = self.dialog.dselect(
+            title='Directory to save OVF templates',
+            filepath=''
         )
 
-        if dr.warning:
+        if code in (self.dialog.ESC, self.dialog.CANCEL):
             self.dialog.msgbox(
-                title='Warning - {}'.format(self.title),
-                text=str(dr.warning)
+                title=self.title,
+                text='No destination directory specified'
             )
+            return
 
-        if dr.error:
-            self.dialog.msgbox(
-                title='Error - {}'.format(self.title),
-                text=str(dr.error)
-            )
+        _, create_ova, compress = export_format
+        jobs = pvc.widget.ovf.export_jobs(
+            agent=self.agent,
+            rows=[row for row in rows if row.tag in selected],
+            path=path,
+            create_ova=create_ova,
+            compress=compress
+        )
 
-        with open(os.path.join(path, '{}.ovf'.format(self.obj.name)), 'w') as f:
-            f.write(dr.ovfDescriptor)
+        self.run(jobs)
 
-    def create_ova_file(self, path, disks):
+    def select_format(self):
         """
-        Creates a single OVA file of the exported VM
+        Prompts the user for the format of the exported templates
 
-        Args:
-            path   (str): Path to the exported disks
-            disks (list): A list of the downloaded disks
+        Returns:
+            A tuple of the format name, and whether to create OVA
+            files and compress the disks, or None if cancelled
 
         """
-        self.dialog.infobox(
+        items = [
+            pvc.widget.radiolist.RadioListItem(tag=tag, description=description)
+            for tag, description, _, _ in self.FORMATS
+        ]
+
+        radiolist = pvc.widget.radiolist.RadioList(
+            items=items,
+            dialog=self.dialog,
             title=self.title,
-            text='Creating OVA file ...'
+            text='Select format of the exported templates'
         )
 
-        old_cwd = os.getcwd()
-        os.chdir(path)
+        code, tag = radiolist.display()
+
+        if code in (self.dialog.CANCEL, self.dialog.ESC) or not tag:
+            return
+
+        for name, _, create_ova, compress in self.FORMATS:
+            if name == tag:
+                return name, create_ova, compress
+
+    def run(self, jobs):
+        """
+        Run the export jobs and display their progress
+
+        Args:
+            jobs (list): A list of ExportJob instances
+
+        """
+        queue = pvc.widget.ovf.ExportQueue(jobs=jobs)
+        queue.start()
 
-        ova = tarfile.open('{}.ova'.format(self.obj.name), 'w')
+        while not queue.is_done():
+            elements = []
+            for job in jobs:
+                if job.state == pvc.widget.ovf.ExportJob.RUNNING:
+                    elements.append((job.name, -job.progress()))
+                else:
+                    elements.append((job.name, job.state))
 
-        # Add descriptor and manifest files first
-        descriptor = '{}.ovf'.format(self.obj.name)
-        manifest = '{}.mf'.format(self.obj.name)
-        ova.add(descriptor)
-        ova.add(manifest)
+            done = sum(job.progress() for job in jobs)
+            self.dialog.mixedgauge(
+                title=self.title,
+                text='Exporting {} virtual machine(s) ...'.format(len(jobs)),
+                percent=done // len(jobs),
+                elements=elements
+            )
+            time.sleep(1)
 
-        # Now add the VMDK disks
-        for disk in disks:
-            ova.add('{}-{}'.format(self.obj.name, disk))
+        queue.join()
 
-        ova.close()
+        failed = [job for job in jobs if job.state == pvc.widget.ovf.ExportJob.FAILED]
+        text = 'Export: {} succeeded, {} failed\n'.format(
+            len(jobs) - len(failed),
+            len(failed)
+        )
 
-        # Cleanup disks, manifest and descriptor files
-        os.unlink(manifest)
-        os.unlink(descriptor)
-        for disk in disks:
-            os.unlink('{}-{}'.format(self.obj.name, disk))
+        for job in jobs:
+            if job.error is None:
+                text += '\n{}: {}'.format(job.name, job.path)
+            else:
+                text += '\n{}: {}'.format(
+                    job.name,
+                    getattr(job.error, 'msg', None) or job.error
+                )
 
-        os.chdir(old_cwd)
+        self.dialog.scrollbox(
+            title=self.title,
+            text=text
+        )
 
 
 class VirtualMachineConsoleWidget(object):
@@ -923,6 +1329,18 @@ class VirtualMachineTemplateWidget(object):
                 on_select=VirtualMachineExportWidget,
                 on_select_args=(self.agent, self.dialog, self.obj, False)
             ),
+            pvc.widget.menu.MenuItem(
+                tag='Export OVA (gzip)',
+                description='Export as single file with compressed disks',
+                on_select=VirtualMachineExportWidget,
+                on_select_args=(self.agent, self.dialog, self.obj, True, True)
+            ),
+            pvc.widget.menu.MenuItem(
+                tag='Export OVF (gzip)',
+                description='Export as directory of files with compressed disks',
+                on_select=VirtualMachineExportWidget,
+                on_select_args=(self.agent, self.dialog, self.obj, False, True)
+            ),
         ]
 
         menu = pvc.widget.menu.Menu(
@@ -1482,6 +1900,209 @@ class CreateVirtualMachineWidget(object):
         return fields
 
 
+class VirtualMachineImportWidget(CreateVirtualMachineWidget):
+    def __init__(self, agent, dialog, datacenter=None, cluster=None, host=None):
+        """
+        Widget for deploying a Virtual Machine from an OVF/OVA template
+
+        Args:
+            agent                      (VConnector): A VConnector instance
+            dialog                  (dialog.Dialog): A Dialog instance
+            datacenter             (vim.Datacenter): A vim.Datacenter instance
+            cluster    (vim.ClusterComputeResource): A vim.CluterComputeResource instance
+            host                   (vim.HostSystem): A vim.HostSystem instance
+
+        """
+        self.title = 'Deploy OVF Template'
+        super().__init__(agent, dialog, datacenter, cluster, host)
+
+    def display(self):
+        package = self.select_package()
+        if not package:
+            return
+
+        if not self.datacenter:
+            self.datacenter = self.select_datacenter()
+            if not self.datacenter:
+                return
+
+        if not self.cluster:
+            self.cluster = self.select_cluster(folder=self.datacenter)
+            if not self.cluster:
+                return
+
+        if not self.select_host(cluster=self.cluster):
+            return
+
+        target = self.host if self.host else self.cluster
+
+        datastore = self.select_datastore(obj=target)
+        if not datastore:
+            return
+
+        name = self.select_name(package)
+        if not name:
+            return
+
+        network_mapping = self.select_networks(package, target)
+        if network_mapping is None:
+            return
+
+        ovf_import = pvc.widget.ovf.OvfImport(
+            agent=self.agent,
+            package=package,
+            name=name,
+            pool=self.cluster.resourcePool,
+            datastore=datastore,
+            folder=self.datacenter.vmFolder,
+            host=self.host,
+            network_mapping=network_mapping
+        )
+
+        self.dialog.gauge_start(
+            title='{} - {}'.format(self.title, name)
+        )
+
+        start = time.time()
+
+        def on_progress(percent, transferred):
+            rate = transferred / max(time.time() - start, 1)
+            self.dialog.gauge_update(
+                percent=percent,
+                text='Uploading files ... ({}, {}/s)\n'.format(
+                    humanize.naturalsize(transferred, binary=True),
+                    humanize.naturalsize(rate, binary=True)
+                ),
+                update_text=True
+            )
+
+        try:
+            ovf_import.run(on_progress=on_progress)
+        except (pyVmomi.vmodl.MethodFault, requests.RequestException, IOError) as e:
+            self.dialog.gauge_stop()
+            self.dialog.msgbox(
+                title=self.title,
+                text='Deploy failed:\n\n{}\n'.format(getattr(e, 'msg', None) or e)
+            )
+            return
+
+        self.dialog.gauge_stop()
+        elapsed = max(time.time() - start, 1)
+
+        for warning in ovf_import.warnings:
+            self.dialog.msgbox(
+                title=self.title,
+                text=warning
+            )
+
+        self.dialog.msgbox(
+            title=self.title,
+            text='Virtual Machine {} deployed successfully.\n\n'
+                 'Uploaded {} in {} seconds ({}/s)\n'.format(
+                     name,
+                     humanize.naturalsize(ovf_import.transferred(), binary=True),
+                     int(elapsed),
+                     humanize.naturalsize(ovf_import.transferred() / elapsed, binary=True)
+                 )
+        )
+
+    def select_package(self):
+        """
+        Select the OVF/OVA template to deploy
+
+        Returns:
+            A pvc.widget.ovf.OvfPackage instance upon successfully
+            selecting a template, None otherwise
+
+        """
+        code, path = self.dialog.fselect(
+            title='Select OVF descriptor or OVA file',
+            filepath=''
+        )
+
+        if code in (self.dialog.ESC, self.dialog.CANCEL):
+            return
+
+        if not os.path.isfile(path) or not path.lower().endswith(('.ovf', '.ova')):
+            self.dialog.msgbox(
+                title=self.title,
+                text='No OVF descriptor or OVA file selected'
+            )
+            return
+
+        self.dialog.infobox(
+            title=self.title,
+            text='Reading OVF template ...'
+        )
+
+        try:
+            return pvc.widget.ovf.OvfPackage(path)
+        except (IndexError, IOError, tarfile.TarError):
+            self.dialog.msgbox(
+                title=self.title,
+                text='Invalid OVF template {}'.format(path)
+            )
+
+    def select_name(self, package):
+        """
+        Select name of the new Virtual Machine
+
+        Args:
+            package (pvc.widget.ovf.OvfPackage): The OVF template to deploy
+
+        """
+        name, _ = os.path.splitext(package.descriptor_name)
+        code, name = self.dialog.inputbox(
+            title=self.title,
+            text='Name of the new Virtual Machine',
+            init=name
+        )
+
+        if code in (self.dialog.ESC, self.dialog.CANCEL) or not name:
+            return
+
+        return name
+
+    def select_networks(self, package, obj):
+        """
+        Map the networks of the template to networks of the target
+
+        Args:
+            package (pvc.widget.ovf.OvfPackage): The OVF template to deploy
+            obj              (vim.ManagedEntity): Entity containing the networks
+
+        Returns:
+            A dict mapping the OVF network names to vim.Network
+            instances, or None if no network has been selected
+
+        """
+        self.dialog.infobox(
+            title=self.title,
+            text='Retrieving information ...'
+        )
+
+        result = self.agent.si.content.ovfManager.ParseDescriptor(
+            ovfDescriptor=package.descriptor(),
+            pdp=pyVmomi.vim.OvfManager.ParseDescriptorParams()
+        )
+
+        mapping = {}
+        for network in result.network:
+            self.dialog.msgbox(
+                title=self.title,
+                text='Select network for OVF network {}'.format(network.name)
+            )
+            mapping[network.name] = pvc.widget.common.choose_network(
+                agent=self.agent,
+                dialog=self.dialog,
+                obj=obj
+            )
+            if not mapping[network.name]:
+                return
+
+        return mapping
+
+
 class VirtualMachineHardwareWidget(object):
     def __init__(self, agent, dialog, obj):
         """
@@ -0,0 +1,77 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import unittest
+
+from pvc.widget.ovf import export_jobs
+from pvc.widget.store import InventoryStore
+
+
+class ManagedObject(object):
+    def __init__(self, moid, name):
+        self._moId = moid
+        self.name = name
+
+
+class ExportJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.store = InventoryStore(['name', 'runtime.host', 'datastore'])
+        for moid in ('vm-1', 'vm-2', 'vm-3'):
+            name = 'db' if moid == 'vm-3' else 'web'
+            self.store.append({
+                'obj': ManagedObject(moid, name),
+                'name': name,
+                'runtime.host': ManagedObject('host-1', 'esxi01'),
+                'datastore': [ManagedObject('datastore-1', 'ds01')],
+            })
+
+    def test_same_names_use_separate_directories(self):
+        jobs = export_jobs(agent=None, rows=list(self.store), path='/exports')
+        paths = [job.path for job in jobs]
+
+        self.assertEqual(len(set(paths)), 3)
+        self.assertEqual(
+            paths,
+            [
+                os.path.join('/exports', 'web (vm-1)'),
+                os.path.join('/exports', 'web (vm-2)'),
+                os.path.join('/exports', 'db'),
+            ]
+        )
+
+    def test_separators_are_replaced(self):
+        self.store.append({
+            'obj': ManagedObject('vm-4', 'a' + os.sep + 'b'),
+            'name': 'a' + os.sep + 'b',
+        })
+        job = export_jobs(agent=None, rows=[self.store[3]], path='/exports')[0]
+
+        self.assertEqual(job.path, os.path.join('/exports', 'a_b'))
+        self.assertEqual(job.datastores, [])
+        self.assertIsNone(job.host)
+
+
+if __name__ == '__main__':
+    unittest.main()
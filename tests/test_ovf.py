@@ -0,0 +1,147 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import concurrent.futures
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import pyVmomi
+
+from pvc.widget.ovf import OvfExport
+
+
+class Response(object):
+    def __init__(self, data):
+        self.data = data
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i+chunk_size]
+
+
+class Session(object):
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def get(self, url, headers=None, stream=False):
+        return Response(self.responses.pop(0))
+
+
+class OvfManager(object):
+    def __init__(self):
+        self.ovf_files = []
+
+    def CreateDescriptor(self, obj, cdp):
+        self.ovf_files = list(cdp.ovfFiles)
+        return pyVmomi.vim.OvfManager.CreateDescriptorResult(ovfDescriptor='<Envelope/>')
+
+
+class Agent(object):
+    host = 'vcenter'
+
+    def __init__(self):
+        self.si = self
+        self.content = self
+        self.ovfManager = OvfManager()
+
+
+class VirtualMachine(object):
+    name = 'web'
+
+
+class Lease(object):
+    def __init__(self, manifest):
+        self.manifest = manifest
+
+    def HttpNfcLeaseGetManifest(self):
+        return self.manifest
+
+
+class CompressedVerifyTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+        self.data = os.urandom(64 * 1024)
+        self.agent = Agent()
+        self.export = OvfExport(
+            agent=self.agent,
+            obj=VirtualMachine(),
+            path=self.path,
+            compress=True
+        )
+        self.export.executor = concurrent.futures.ThreadPoolExecutor()
+        self.addCleanup(self.export.executor.shutdown)
+        self.export.workers = 1
+        self.export.device_urls = [
+            pyVmomi.vim.HttpNfcLease.DeviceUrl(
+                key='disk-0', targetId='disk-0.vmdk', url='https://esxi/disk-0.vmdk', disk=True
+            )
+        ]
+        self.export.lease = Lease([
+            pyVmomi.vim.HttpNfcLease.ManifestEntry(
+                key='disk-0',
+                sha1=hashlib.sha1(self.data).hexdigest(),
+                size=len(self.data),
+                capacity=len(self.data),
+                populatedSize=len(self.data)
+            )
+        ])
+
+    def test_ovf_disk_is_rewritten(self):
+        # The corrupt copy compresses far better than the actual disk
+        session = Session([bytes(len(self.data)), self.data])
+        self.export.export_ovf(session)
+
+        disk_file = os.path.join(self.path, 'web-disk-0.vmdk')
+        with open(disk_file, 'rb') as f:
+            compressed = f.read()
+
+        self.assertEqual(gzip.decompress(compressed), self.data)
+        self.assertEqual(self.agent.ovfManager.ovf_files[0].size, len(compressed))
+
+        with open(os.path.join(self.path, 'web.mf')) as f:
+            self.assertEqual(
+                f.read(),
+                'SHA1(web-disk-0.vmdk)= {}\n'.format(hashlib.sha1(compressed).hexdigest())
+            )
+
+    def test_ova_fails_clearly(self):
+        self.export.create_ova = True
+        session = Session([bytes(len(self.data)), self.data])
+
+        with self.assertRaisesRegex(IOError, 'OVA archive'):
+            self.export.export_ova(session)
+
+
+if __name__ == '__main__':
+    unittest.main()
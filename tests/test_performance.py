@@ -0,0 +1,89 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from pvc.widget.performance import PerformanceCounterGraphWidget
+from pvc.widget.series import Series
+
+
+class SampleStore(object):
+    def __init__(self, series):
+        self.series = series
+
+    def add(self, data, counters):
+        return self.series
+
+
+class Counter(object):
+    key = 2
+
+
+class SaveSamplesTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'samples')
+
+        self.vmnic0 = Series('vmnic0', scale=0.5)
+        self.vmnic1 = Series('vmnic1', scale=0.5)
+        self.widget = PerformanceCounterGraphWidget.__new__(PerformanceCounterGraphWidget)
+        self.widget.counter = Counter()
+        self.widget.samples = SampleStore([self.vmnic0, self.vmnic1])
+        self.widget.saved = {}
+
+    def lines(self):
+        with open(self.path) as f:
+            return f.read().splitlines()
+
+    def test_series_are_joined_on_timestamps(self):
+        self.vmnic0.extend([20, 40, 60], [2, 4, 6])
+        self.vmnic1.extend([40, 60], [8, 12])
+        self.widget.save_performance_samples(self.path, data=None)
+
+        self.assertEqual(
+            self.lines(),
+            ['1970-01-01 00:00:40+00:00,2.0,4.0', '1970-01-01 00:01:00+00:00,3.0,6.0']
+        )
+
+    def test_lagging_series_is_saved_later(self):
+        self.vmnic0.extend([20, 40], [2, 4])
+        self.vmnic1.extend([20], [6])
+        self.widget.save_performance_samples(self.path, data=None)
+
+        self.vmnic1.extend([40], [8])
+        self.widget.save_performance_samples(self.path, data=None)
+
+        self.assertEqual(
+            self.lines(),
+            ['1970-01-01 00:00:20+00:00,1.0,3.0', '1970-01-01 00:00:40+00:00,2.0,4.0']
+        )
+        self.assertEqual(self.widget.saved, {'vmnic0': 2, 'vmnic1': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
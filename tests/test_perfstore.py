@@ -0,0 +1,155 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import datetime
+import unittest
+
+import pyVmomi
+
+import pvc.widget.perfstore
+from pvc.widget.perfstore import PerfStore, fetch_historical
+
+
+class PerfStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = PerfStore(':memory:')
+        self.addCleanup(self.store.close)
+
+    def test_watermark_of_unknown_series(self):
+        self.assertIsNone(self.store.watermark('vm-1', 2, '', 300))
+
+    def test_insert_updates_watermark(self):
+        self.store.insert('vm-1', 300, [300, 600, 900], [(2, '', [1.0, 2.0, 3.0])])
+
+        self.assertEqual(self.store.watermark('vm-1', 2, '', 300), 900)
+        self.assertIsNone(self.store.watermark('vm-1', 2, '', 1800))
+        self.assertIsNone(self.store.watermark('vm-1', 6, '', 300))
+
+    def test_mark_never_moves_watermark_back(self):
+        self.store.mark('vm-1', 2, '', 300, 900)
+        self.store.mark('vm-1', 2, '', 300, 600)
+        self.assertEqual(self.store.watermark('vm-1', 2, '', 300), 900)
+
+        self.store.mark('vm-1', 2, '', 300, 1200)
+        self.assertEqual(self.store.watermark('vm-1', 2, '', 300), 1200)
+        self.assertEqual(list(self.store.samples('vm-1', 2, '', 300)[0]), [])
+
+    def test_samples_within_range(self):
+        self.store.insert('vm-1', 300, [300, 600, 900, 1200], [(2, '', [1.0, 2.0, 3.0, 4.0])])
+        timestamps, values = self.store.samples('vm-1', 2, '', 300, start=300, end=900)
+
+        self.assertEqual(list(timestamps), [600, 900])
+        self.assertEqual(list(values), [2.0, 3.0])
+
+    def test_rollup(self):
+        self.store.insert('vm-1', 300, [0, 300, 600, 900], [(2, '', [1.0, 3.0, 5.0, 9.0])])
+
+        timestamps, values = self.store.rollup('vm-1', 2, '', 300, period=600)
+        self.assertEqual(list(timestamps), [0, 600])
+        self.assertEqual(list(values), [2.0, 7.0])
+
+        _, values = self.store.rollup('vm-1', 2, '', 300, period=600, rollup='maximum')
+        self.assertEqual(list(values), [3.0, 9.0])
+
+        _, values = self.store.rollup('vm-1', 2, '', 300, period=600, rollup='minimum')
+        self.assertEqual(list(values), [1.0, 5.0])
+
+    def test_prune(self):
+        self.store.insert('vm-1', 300, [300, 600, 900], [(2, '', [1.0, 2.0, 3.0])])
+        self.store.insert('vm-1', 1800, [1800], [(2, '', [2.0])])
+        self.store.prune(300, 900)
+
+        self.assertEqual(list(self.store.samples('vm-1', 2, '', 300)[0]), [900])
+        self.assertEqual(list(self.store.samples('vm-1', 2, '', 1800)[0]), [1800])
+        self.assertEqual(self.store.watermark('vm-1', 2, '', 300), 900)
+
+
+class PerformanceManager(object):
+    def __init__(self, results):
+        self.results = results
+        self.query_specs = []
+
+    def QueryPerf(self, querySpec):
+        self.query_specs.append(querySpec)
+        return self.results
+
+
+class Agent(object):
+    def __init__(self, now, results):
+        self.si = self
+        self.content = self
+        self.now = now
+        self.perfManager = PerformanceManager(results)
+
+    def CurrentTime(self):
+        return self.now
+
+
+class FetchHistoricalTest(unittest.TestCase):
+    def setUp(self):
+        self.now = datetime.datetime(2016, 1, 1, 1, 0, tzinfo=datetime.timezone.utc)
+        self.entity = pyVmomi.vim.VirtualMachine('vm-1')
+        self.interval = pyVmomi.vim.HistoricalInterval(samplingPeriod=300, length=86400)
+        self.metric_id = [
+            pyVmomi.vim.PerformanceManager.MetricId(counterId=2, instance=''),
+            pyVmomi.vim.PerformanceManager.MetricId(counterId=6, instance=''),
+        ]
+
+    def fetch(self, results):
+        agent = Agent(self.now, results)
+        store = PerfStore(':memory:')
+        self.addCleanup(store.close)
+        pvc.widget.perfstore._stores[agent] = store
+        self.addCleanup(pvc.widget.perfstore._stores.pop, agent)
+
+        fetch_historical(agent, self.entity, self.metric_id, self.interval)
+
+        return store
+
+    def test_no_samples_returned(self):
+        store = self.fetch([])
+
+        self.assertIsNone(store.watermark('vm-1', 2, '', 300))
+        self.assertIsNone(store.watermark('vm-1', 6, '', 300))
+
+    def test_empty_metric_is_marked_before_newest_sample(self):
+        data = pyVmomi.vim.PerformanceManager.EntityMetricCSV(
+            entity=self.entity,
+            sampleInfoCSV='300,2016-01-01T00:50:00Z,300,2016-01-01T00:55:00Z',
+            value=[
+                pyVmomi.vim.PerformanceManager.MetricSeriesCSV(
+                    id=self.metric_id[0],
+                    value='1,2'
+                )
+            ]
+        )
+        store = self.fetch([data])
+        newest = int(self.now.timestamp()) - 300
+
+        self.assertEqual(store.watermark('vm-1', 2, '', 300), newest)
+        self.assertEqual(store.watermark('vm-1', 6, '', 300), newest - 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# Copyright (c) 2015 Marin Atanasov Nikolov <dnaeon@gmail.com>
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer
+#    in this position and unchanged.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR(S) ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR(S) BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from pvc.widget.series import RingBuffer, Series
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_extend_within_capacity(self):
+        buf = RingBuffer(capacity=4)
+        buf.extend([1, 2, 3])
+
+        self.assertEqual(len(buf), 3)
+        self.assertEqual(buf.total, 3)
+        self.assertEqual(list(buf.values()), [1, 2, 3])
+        self.assertEqual(buf.last(), 3)
+
+    def test_extend_wraps_around(self):
+        buf = RingBuffer(capacity=4)
+        buf.extend([1, 2, 3])
+        buf.extend([4, 5, 6])
+
+        self.assertEqual(len(buf), 4)
+        self.assertEqual(buf.total, 6)
+        self.assertEqual(list(buf.values()), [3, 4, 5, 6])
+        self.assertEqual(buf.last(), 6)
+
+    def test_extend_fills_buffer_exactly(self):
+        buf = RingBuffer(capacity=4)
+        buf.extend([1, 2])
+        buf.extend([3, 4])
+
+        self.assertEqual(list(buf.values()), [1, 2, 3, 4])
+        self.assertEqual(list(buf.since(3)), [4])
+        self.assertEqual(list(buf.since(4)), [])
+
+    def test_extend_more_than_capacity(self):
+        buf = RingBuffer(capacity=4)
+        buf.extend([1])
+        buf.extend(range(2, 12))
+
+        self.assertEqual(buf.total, 11)
+        self.assertEqual(list(buf.values()), [8, 9, 10, 11])
+
+    def test_since_across_wrap_around(self):
+        buf = RingBuffer(capacity=4)
+        buf.extend([1, 2, 3])
+        buf.extend([4, 5])
+
+        self.assertEqual(list(buf.since(2)), [3, 4, 5])
+        self.assertEqual(list(buf.since(4)), [5])
+        self.assertEqual(list(buf.since(5)), [])
+
+    def test_since_overwritten_position(self):
+        buf = RingBuffer(capacity=4)
+        buf.extend(range(1, 11))
+
+        self.assertEqual(list(buf.since(0)), [7, 8, 9, 10])
+        self.assertEqual(list(buf.since(5)), [7, 8, 9, 10])
+
+    def test_empty(self):
+        buf = RingBuffer(capacity=4)
+
+        self.assertEqual(len(buf), 0)
+        self.assertIsNone(buf.last())
+        self.assertEqual(list(buf.values()), [])
+
+
+class SeriesTest(unittest.TestCase):
+    def test_extend_skips_known_samples(self):
+        series = Series(name='', capacity=10)
+        series.extend([20, 40, 60], [1, 2, 3])
+        series.extend([40, 60, 80, 100], [2, 3, 4, 5])
+
+        timestamps, values, total = series.since(0)
+        self.assertEqual(list(timestamps), [20, 40, 60, 80, 100])
+        self.assertEqual(list(values), [1, 2, 3, 4, 5])
+        self.assertEqual(total, 5)
+
+    def test_extend_only_known_samples(self):
+        series = Series(name='', capacity=10)
+        series.extend([20, 40], [1, 2])
+        series.extend([20, 40], [1, 2])
+
+        self.assertEqual(series.total, 2)
+
+    def test_since_returns_next_position(self):
+        series = Series(name='', capacity=3)
+        series.extend([20, 40], [1, 2])
+        _, _, position = series.since(0)
+        series.extend([60, 80], [3, 4])
+
+        timestamps, values, position = series.since(position)
+        self.assertEqual(list(timestamps), [60, 80])
+        self.assertEqual(list(values), [3, 4])
+        self.assertEqual(position, 4)
+
+    def test_values_are_not_scaled(self):
+        series = Series(name='', capacity=3, scale=0.01)
+        series.extend([20], [5000])
+
+        self.assertEqual(series.values.last(), 5000)
+
+
+if __name__ == '__main__':
+    unittest.main()